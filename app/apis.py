@@ -1,19 +1,31 @@
+from app.namespace.categorization_rule import categorization_rule_api
+from app.namespace.diagnostics import diagnostics_api
 from app.namespace.index import index_api
+from app.namespace.metrics import metrics_api
 from app.namespace.statistics_by_category import statistics_by_category_api
 from app.namespace.statistics_by_date import statistics_by_date_api
+from app.namespace.statistics_batch import statistics_batch_api
 from app.namespace.statistics_by_source import statistics_by_source_api
+from app.namespace.statistics_pivot import statistics_pivot_api
 from app.namespace.trans_category import transaction_category_api
 from app.namespace.trans_source import transaction_source_api
 from app.namespace.trans_type import transaction_type_api
+from app.namespace.transaction_import import transaction_import_api
 from app.namespace.transactions import transaction_api
 
 
 def init_api(api):
     api.add_namespace(index_api)
     api.add_namespace(transaction_api)
+    api.add_namespace(transaction_import_api)
     api.add_namespace(transaction_category_api)
     api.add_namespace(transaction_type_api)
     api.add_namespace(transaction_source_api)
+    api.add_namespace(categorization_rule_api)
     api.add_namespace(statistics_by_category_api)
     api.add_namespace(statistics_by_date_api)
-    api.add_namespace(statistics_by_source_api)
\ No newline at end of file
+    api.add_namespace(statistics_by_source_api)
+    api.add_namespace(statistics_pivot_api)
+    api.add_namespace(statistics_batch_api)
+    api.add_namespace(diagnostics_api)
+    api.add_namespace(metrics_api)
\ No newline at end of file
@@ -0,0 +1,328 @@
+"""
+Endpoint benchmark: loads a synthetic ledger (see synthetic_ledger.py) into a local database and
+times every resource of app/namespace through the Flask test client, i.e. the application and
+database cost without a WSGI server or network in between. Reports throughput, p50/p95/p99
+latency and peak RSS as JSON, and compares the run against a stored baseline.
+
+    python -m app.benchmarks.endpoint_benchmark --rows 10k --save-baseline baseline-10k.json
+    python -m app.benchmarks.endpoint_benchmark --rows 10k --baseline baseline-10k.json --fail-on-regression
+    python -m app.benchmarks.endpoint_benchmark --rows 1m --postgres
+
+The database is a fresh SQLite file by default, a throwaway Postgres cluster started with the
+initdb and pg_ctl found on PATH with --postgres, or --database-url (reused when it already holds
+transactions).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.benchmarks.synthetic_ledger import SIZES, generate, load, parse_size
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+Case = namedtuple('Case', ['name', 'request', 'rows'])
+
+WRITE_BATCH = 1000
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB, or None where getrusage is unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def throwaway_postgres():
+    """Runs a temporary Postgres cluster listening on a Unix socket only, yields its URL and deletes it afterwards."""
+    initdb, pg_ctl = shutil.which('initdb'), shutil.which('pg_ctl')
+    if not initdb or not pg_ctl:
+        raise RuntimeError("--postgres needs initdb and pg_ctl on PATH")
+    directory = tempfile.mkdtemp(prefix='benchmark-pg-')
+    data = os.path.join(directory, 'data')
+    port = _free_port()
+    subprocess.run([initdb, '-D', data, '-U', 'postgres', '--auth=trust', '-E', 'UTF8'], check=True,
+                   capture_output=True)
+    subprocess.run([pg_ctl, '-D', data, '-l', os.path.join(directory, 'server.log'), '-w', 'start',
+                    '-o', f"-p {port} -k {directory} -c listen_addresses=''"], check=True, capture_output=True)
+    try:
+        yield f"postgresql://postgres@/postgres?host={directory}&port={port}"
+    finally:
+        subprocess.run([pg_ctl, '-D', data, '-m', 'fast', '-w', 'stop'], capture_output=True)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def benchmark_app(database_url, statistics_source=None, response_cache=False):
+    """
+    Creates the application on the given database. SQLite gets the 'public' schema of the models
+    attached as a second database file next to the main one.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import make_url
+
+    from app.config import BaseConfig, envs, get_engine_options
+    from app.extension import db
+    from app.server import create_app
+
+    url = make_url(database_url)
+    sqlite = url.get_backend_name() == 'sqlite'
+
+    class BenchmarkConfig(BaseConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"check_same_thread": False, "timeout": 30}} if sqlite \
+            else get_engine_options()
+        RESPONSE_CACHE_ENABLED = response_cache
+        STATISTICS_SOURCE = statistics_source or BaseConfig.STATISTICS_SOURCE
+
+    envs['benchmark'] = BenchmarkConfig
+    # Keep stdout for the JSON results
+    with redirect_stdout(sys.stderr):
+        app = create_app('benchmark')
+    if sqlite:
+        public = f"{url.database}-public"
+
+        def attach_public(dbapi_connection, connection_record):
+            dbapi_connection.execute(f"ATTACH DATABASE '{public}' AS public")
+
+        with app.app_context():
+            event.listen(db.engine, 'connect', attach_public)
+    return app
+
+
+def _api_payload(row):
+    """Turns a generated insert row into the JSON payload the transaction endpoints accept."""
+    return {'transaction_date': row['transaction_date'].strftime('%m/%d/%Y'),
+            'description': row['description'],
+            'notes': row['notes'],
+            'category_level1': row['category_level1'],
+            'category_level2': row['category_level2'],
+            'type_name': row['type_name'],
+            'amount': row['amount'],
+            'source': row['source']}
+
+
+def _csv_statement(payloads):
+    out = io.StringIO()
+    fields = list(payloads[0])
+    out.write(','.join(fields) + '\n')
+    for payload in payloads:
+        out.write(','.join('' if payload[f] is None else str(payload[f]) for f in fields) + '\n')
+    return out.getvalue().encode()
+
+
+def cases(client, transaction_ids, iterations):
+    """Lists the timed requests of every resource in app/namespace: reads first, then writes."""
+    rng = random.Random(0)
+    year_ago = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+    first_page = client.get('/transaction?limit=100')
+    next_page = f"/transaction?limit=100&cursor={first_page.headers.get('X-Next-Cursor', '')}"
+    payload_rows = [_api_payload(row) for chunk in generate((iterations + 1) * WRITE_BATCH * 4, seed=1)
+                    for row in chunk]
+    batches = iter([payload_rows[i:i + WRITE_BATCH] for i in range(0, len(payload_rows), WRITE_BATCH)])
+    created = []
+    posted = []
+
+    def bulk_post(i):
+        batch = next(batches)
+        posted.append(batch)
+        response = client.post('/transaction/bulk', json=batch)
+        created.extend(response.get_json().get('transaction_ids', []))
+        return response
+
+    def dedupe_post(i):
+        # Half of the batch overlaps an earlier import and is skipped
+        half = WRITE_BATCH // 2
+        batch = posted[i % len(posted)][:half] + next(batches)[:half]
+        response = client.post('/transaction/bulk?dedupe=true', json=batch)
+        created.extend(response.get_json().get('transaction_ids', []))
+        return response
+
+    def statement_import(i):
+        return client.post('/transaction_import', content_type='multipart/form-data',
+                           data={'format': 'csv', 'file': (io.BytesIO(_csv_statement(next(batches))), 'bench.csv')})
+
+    def get(path):
+        return lambda i: client.get(path)
+
+    return [
+        Case('GET /transaction?limit=100', get('/transaction?limit=100'), 100),
+        Case('GET /transaction?limit=100&cursor', get(next_page), 100),
+        Case('GET /transaction?period=1Mo', get('/transaction?period=1Mo'), None),
+        Case('GET /transaction/stream?period=1Mo', get('/transaction/stream?period=1Mo'), None),
+        Case('GET /transaction/<id>', lambda i: client.get(f'/transaction/{rng.choice(transaction_ids)}'), 1),
+        Case('GET /transaction/search', get('/transaction/search?q=merchant 4'), 50),
+        Case('GET /transaction/search?mode=prefix', get('/transaction/search?q=merchant 12&mode=prefix'), 50),
+        Case('GET /transaction/search?mode=fuzzy', get('/transaction/search?q=merchnt 17&mode=fuzzy'), 50),
+        Case('GET /transaction_category', get('/transaction_category/'), None),
+        Case('GET /transaction_type', get('/transaction_type'), None),
+        Case('GET /transaction_source', get('/transaction_source'), None),
+        Case('GET /statistics_by_date?by=month', get('/statistics_by_date?by=month'), None),
+        Case('GET /statistics_by_date?by=day&startDate', get(f'/statistics_by_date?by=day&startDate={year_ago}'),
+             None),
+        Case('GET /statistics_by_category', get('/statistics_by_category'), None),
+        Case('GET /statistics_by_source', get('/statistics_by_source'), None),
+        Case('GET /statistics_pivot', get('/statistics_pivot?dimensions=date,category_level1,source&by=quarter'),
+             None),
+        Case('POST /statistics_batch',
+             lambda i: client.post('/statistics_batch', json={'queries': [
+                 {'statistics': 'by_date', 'params': {'by': 'month'}},
+                 {'statistics': 'by_category', 'params': {'startDate': year_ago}},
+                 {'statistics': 'by_source'}]}), None),
+        Case('POST /transaction', lambda i: client.post('/transaction', json=next(batches)[:10]), 10),
+        Case('POST /transaction/bulk', bulk_post, WRITE_BATCH),
+        Case('POST /transaction/bulk?dedupe=true', dedupe_post, WRITE_BATCH),
+        Case('POST /transaction_import', statement_import, WRITE_BATCH),
+        Case('PUT /transaction/<id>',
+             lambda i: client.put(f'/transaction/{rng.choice(transaction_ids)}', json={'amount': rng.randint(1, 500)}),
+             1),
+        Case('DELETE /transaction/<id>', lambda i: client.delete(f'/transaction/{created.pop()}'), 1),
+    ]
+
+
+def time_case(case, iterations):
+    """Runs one warm-up and the timed iterations of a case and summarizes their latencies."""
+    warmup = case.request(-1)
+    if warmup.status_code >= 400:
+        return {'error': f"HTTP {warmup.status_code}: {warmup.get_data(as_text=True)[:200]}"}
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        request_started = time.perf_counter()
+        response = case.request(i)
+        response.get_data()
+        latencies.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+    p50, p95, p99 = (float(p) * 1000 for p in np.percentile(latencies, [50, 95, 99]))
+    result = {'iterations': iterations,
+              'requests_per_second': round(iterations / elapsed, 2),
+              'p50_ms': round(p50, 3),
+              'p95_ms': round(p95, 3),
+              'p99_ms': round(p99, 3),
+              'max_ms': round(max(latencies) * 1000, 3),
+              'response_bytes': len(warmup.get_data()),
+              'peak_rss_mb': peak_rss_mb()}
+    if case.rows:
+        result['rows_per_second'] = round(iterations * case.rows / elapsed)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares the endpoints of two runs. An endpoint regresses when its p95 latency grew, or its
+    throughput dropped, by more than the tolerance fraction.
+    """
+    comparison, regressions = {}, []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous or 'error' in current or 'error' in previous:
+            continue
+        entry = {'p50_ratio': round(current['p50_ms'] / previous['p50_ms'], 3),
+                 'p95_ratio': round(current['p95_ms'] / previous['p95_ms'], 3),
+                 'throughput_ratio': round(current['requests_per_second'] / previous['requests_per_second'], 3)}
+        entry['regressed'] = entry['p95_ratio'] > 1 + tolerance or entry['throughput_ratio'] < 1 / (1 + tolerance)
+        if entry['regressed']:
+            regressions.append(name)
+        comparison[name] = entry
+    return {'tolerance': tolerance,
+            'baseline_generated_at': baseline.get('generated_at'),
+            'regressions': regressions,
+            'endpoints': comparison}
+
+
+def run(database_url, rows, iterations, statistics_source=None, response_cache=False):
+    from app.db.models.models import TransactionModel
+    from app.extension import db
+
+    app = benchmark_app(database_url, statistics_source, response_cache)
+    with app.app_context():
+        db.create_all()
+        existing = db.session.query(TransactionModel).count()
+        loaded = None if existing else load(db.session, rows)
+        transaction_ids = [i for i, in db.session.query(TransactionModel.transaction_id)
+                           .order_by(TransactionModel.transaction_id).limit(100000)]
+        db.session.remove()
+        dialect = db.engine.dialect.name
+
+    client = app.test_client()
+    endpoints = {case.name: time_case(case, iterations) for case in cases(client, transaction_ids, iterations)}
+    return {'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'database': dialect,
+            'rows': existing or rows,
+            'reused_database': bool(existing),
+            'statistics_source': app.config['STATISTICS_SOURCE'],
+            'response_cache': response_cache,
+            'python': platform.python_version(),
+            'load': loaded,
+            'endpoints': endpoints,
+            'peak_rss_mb': peak_rss_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every endpoint on a synthetic ledger.")
+    parser.add_argument('--rows', type=parse_size, default='10k', help=f"Row count or one of {list(SIZES)}")
+    parser.add_argument('--iterations', type=int, default=20)
+    database = parser.add_mutually_exclusive_group()
+    database.add_argument('--database-url', help="Use this database; reused as is when it holds transactions")
+    database.add_argument('--postgres', action='store_true', help="Start a throwaway local Postgres cluster")
+    parser.add_argument('--statistics-source', choices=['rollup', 'transactions', 'columnar'])
+    parser.add_argument('--response-cache', action='store_true', help="Keep the statistics response cache on")
+    parser.add_argument('--output', help="Also write the results to this file")
+    parser.add_argument('--baseline', help="Compare against the results stored in this file")
+    parser.add_argument('--save-baseline', help="Store the results in this file as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    with (throwaway_postgres() if args.postgres else _sqlite_url(args.database_url)) as database_url:
+        results = run(database_url, args.rows, args.iterations, args.statistics_source, args.response_cache)
+    if args.baseline:
+        with open(args.baseline) as f:
+            results['comparison'] = compare(results, json.load(f), args.tolerance)
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    if args.fail_on_regression and results.get('comparison', {}).get('regressions'):
+        sys.exit(1)
+
+
+@contextmanager
+def _sqlite_url(database_url):
+    """Yields the given URL, or that of a fresh SQLite file deleted afterwards."""
+    if database_url:
+        yield database_url
+        return
+    directory = tempfile.mkdtemp(prefix='benchmark-sqlite-')
+    try:
+        yield f"sqlite:///{os.path.join(directory, 'ledger.db')}"
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
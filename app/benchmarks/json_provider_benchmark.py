@@ -0,0 +1,73 @@
+"""
+Micro-benchmark of response serialization: the stdlib encoder with NpEncoder (the provider used so far)
+against dumps_bytes (orjson when installed), on responses of --rows rows.
+
+    python -m app.benchmarks.json_provider_benchmark --rows 100000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from app.lib import json_processor
+from app.lib.json_processor import NpEncoder, dumps_bytes
+
+
+def transaction_rows(count):
+    """Rows shaped like TransactionModel.serialize: Decimal amounts and datetime audit columns."""
+    start = datetime(2015, 1, 1)
+    return [{'transaction_id': i,
+             'transaction_date': (start + timedelta(days=i % 3650)).date(),
+             'description': f'Merchant {i % 997}',
+             'notes': None,
+             'category_level1': 'Living',
+             'category_level2': f'Category {i % 40}',
+             'type_name': 'Sale',
+             'amount': Decimal(i % 10000) / 100,
+             'source': f'Card {i % 5}',
+             'modified_at': start + timedelta(seconds=i)} for i in range(count)]
+
+
+def numpy_rows(count):
+    """Rows shaped like the pandas-built statistics responses: NumPy scalars everywhere."""
+    amounts = np.random.default_rng(0).random(count) * 100
+    return [{'category': f'Category {i % 40}', 'amount': amounts[i], 'count': np.int64(i)} for i in range(count)]
+
+
+def _time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(func())
+        best = min(best, time.perf_counter() - started)
+    return best, size
+
+
+def run(rows, repeat):
+    cases = {
+        'transaction rows': (lambda p=transaction_rows(rows): json.dumps(p, cls=NpEncoder).encode(),
+                             lambda p=transaction_rows(rows): dumps_bytes(p)),
+        'numpy rows': (lambda p=numpy_rows(rows): json.dumps(p, cls=NpEncoder).encode(),
+                       lambda p=numpy_rows(rows): dumps_bytes(p)),
+    }
+    results = {'rows': rows, 'orjson': json_processor.orjson is not None, 'cases': {}}
+    for name, (baseline, candidate) in cases.items():
+        baseline_seconds, baseline_size = _time(baseline, repeat)
+        candidate_seconds, candidate_size = _time(candidate, repeat)
+        results['cases'][name] = {'stdlib_seconds': round(baseline_seconds, 4),
+                                  'fast_seconds': round(candidate_seconds, 4),
+                                  'speedup': round(baseline_seconds / candidate_seconds, 1),
+                                  'stdlib_bytes': baseline_size,
+                                  'fast_bytes': candidate_size}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare JSON serialization paths on large responses.")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
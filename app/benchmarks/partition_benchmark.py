@@ -0,0 +1,129 @@
+"""
+Partition benchmark: loads a multi-year synthetic ledger into Postgres, runs the date-bounded
+queries of the read endpoints under EXPLAIN ANALYZE, converts the transactions table to range
+partitions (see app/db/partitioning.py) and runs them again. Reports per query the median execution
+time and the partitions the plan scans before and after, as JSON.
+
+    python -m app.benchmarks.partition_benchmark --postgres --rows 1m --years 8
+    python -m app.benchmarks.partition_benchmark --database-url postgresql://... --interval month
+
+--database-url must point at a database whose transactions table is not partitioned yet; it is
+converted in place.
+"""
+import argparse
+import json
+import platform
+import statistics
+from datetime import datetime, timedelta
+
+from app.benchmarks.endpoint_benchmark import benchmark_app, throwaway_postgres
+from app.benchmarks.synthetic_ledger import SIZES, load, parse_size
+
+
+def pruning_queries(session):
+    """endpoint_queries plus statistics over one month and one quarter a few years back."""
+    from app.controller.statistics_controller import aggregate_query
+    from app.db.query_plans import endpoint_queries
+
+    queries = endpoint_queries(session)
+    past = datetime.now() - timedelta(days=3 * 365)
+    first = datetime(past.year, past.month, 1)
+    month = (first, (first + timedelta(days=32)).replace(day=1))
+    quarter = (month[0], (month[0] + timedelta(days=92)).replace(day=1))
+    for name, (start, end) in [('1 month', month), ('1 quarter', quarter)]:
+        queries[f"GET /statistics_by_category ({name}, 3 years ago)"] = aggregate_query(
+            session, ['category_level2'], start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'),
+            source='transactions')
+    return queries
+
+
+def _scanned_relations(plan):
+    """The tables and partitions a plan node and its children read."""
+    relations = {plan['Relation Name']} if 'Relation Name' in plan else set()
+    for child in plan.get('Plans', []):
+        relations |= _scanned_relations(child)
+    return relations
+
+
+def measure(session, repeat):
+    """Median execution time in ms and scanned relations of every pruning query."""
+    from app.db.query_plans import explain_analyze
+
+    results = {}
+    for name, query in pruning_queries(session).items():
+        plans = [explain_analyze(session, query) for _ in range(repeat)]
+        results[name] = {'execution_ms': round(statistics.median(p['Execution Time'] for p in plans), 3),
+                         'relations_scanned': sorted(_scanned_relations(plans[-1]['Plan']))}
+    session.rollback()
+    return results
+
+
+def run(database_url, rows, years, interval, repeat):
+    from sqlalchemy import text
+
+    from app.db.models.models import TransactionModel
+    from app.db.partitioning import convert_to_partitioned, is_partitioned
+    from app.extension import db
+
+    app = benchmark_app(database_url)
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            raise RuntimeError("Partitioning needs Postgres: pass --postgres or a postgresql:// --database-url")
+        db.create_all()
+        with db.engine.connect() as connection:
+            if is_partitioned(connection):
+                raise RuntimeError("The transactions table is already partitioned")
+        existing = db.session.query(TransactionModel).count()
+        loaded = None if existing else load(db.session, rows, years=years)
+        db.session.execute(text("ANALYZE public.transactions"))
+        db.session.commit()
+
+        before = measure(db.session, repeat)
+        db.session.remove()
+        with db.engine.connect() as connection:
+            partitions = convert_to_partitioned(connection, interval)
+        after = measure(db.session, repeat)
+        db.session.remove()
+
+    queries = {name: {'before': before[name],
+                      'after': after[name],
+                      'speedup': round(before[name]['execution_ms'] / after[name]['execution_ms'], 2)
+                      if after[name]['execution_ms'] else None}
+               for name in before}
+    return {'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'rows': existing or rows,
+            'years': None if existing else years,
+            'interval': interval,
+            'partitions': len(partitions),
+            'python': platform.python_version(),
+            'load': loaded,
+            'queries': queries}
+
+
+def main():
+    from app.db.partitioning import PARTITION_INTERVALS
+
+    parser = argparse.ArgumentParser(description="Compare date-bounded queries before and after partitioning.")
+    parser.add_argument('--rows', type=parse_size, default='1m', help=f"Row count or one of {list(SIZES)}")
+    parser.add_argument('--years', type=int, default=8, help="Years of history in the synthetic ledger")
+    parser.add_argument('--interval', choices=PARTITION_INTERVALS, default='year')
+    parser.add_argument('--repeat', type=int, default=5, help="EXPLAIN ANALYZE runs per query")
+    database = parser.add_mutually_exclusive_group(required=True)
+    database.add_argument('--database-url', help="Postgres database to load (when empty) and convert")
+    database.add_argument('--postgres', action='store_true', help="Start a throwaway local Postgres cluster")
+    parser.add_argument('--output', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.postgres:
+        with throwaway_postgres() as database_url:
+            results = run(database_url, args.rows, args.years, args.interval, args.repeat)
+    else:
+        results = run(args.database_url, args.rows, args.years, args.interval, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Startup benchmark: how long a fresh interpreter takes to import the application (and optionally to
+run create_app), where that time goes per top-level package according to -X importtime, and
+whether the heavy analytics dependencies were loaded. Exits with status 1 when the median startup
+exceeds --target-ms, so it can guard worker boot time in CI.
+
+    python -m app.benchmarks.startup_benchmark --target-ms 1000
+    python -m app.benchmarks.startup_benchmark --module app.scripts.manage_db --environment development
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+# Imported only by the code paths that need them, never at startup
+HEAVY_MODULES = ['pandas', 'numpy']
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+created = None
+if {environment!r}:
+    from app.server import create_app
+    create_app({environment!r})
+    created = time.perf_counter()
+print(json.dumps({{"import_seconds": imported - started,
+                  "create_app_seconds": created - imported if created else None,
+                  "heavy_modules": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _probe(module, environment, importtime=False):
+    """Runs one cold start in a new interpreter and returns its measurements and -X importtime report."""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + \
+              ['-c', _PROBE.format(module=module, environment=environment, heavy=HEAVY_MODULES)]
+    result = subprocess.run(command, capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'))
+    if result.returncode:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def summarize_importtime(report, top=15):
+    """Adds up the self time of every imported module per top-level package, slowest first, in milliseconds."""
+    per_package = defaultdict(int)
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        per_package[name.strip().split('.')[0]] += int(self_us)
+    ranked = sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{'package': package, 'self_ms': round(us / 1000, 1)} for package, us in ranked]
+
+
+def run(module, environment, repeat, target_ms):
+    runs = [_probe(module, environment)[0] for _ in range(repeat)]
+    _, report = _probe(module, environment, importtime=True)
+    startup = [r['import_seconds'] + (r['create_app_seconds'] or 0) for r in runs]
+    median_ms = round(statistics.median(startup) * 1000, 1)
+    return {'module': module,
+            'environment': environment,
+            'runs': repeat,
+            'import_ms': {'median': round(statistics.median(r['import_seconds'] for r in runs) * 1000, 1),
+                          'min': round(min(r['import_seconds'] for r in runs) * 1000, 1)},
+            'create_app_ms': round(statistics.median(r['create_app_seconds'] for r in runs) * 1000, 1)
+            if environment else None,
+            'startup_ms': median_ms,
+            'target_ms': target_ms,
+            'within_target': target_ms is None or median_ms <= target_ms,
+            'heavy_modules_loaded': runs[-1]['heavy_modules'],
+            'packages': summarize_importtime(report)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure cold start time of the application.")
+    parser.add_argument('--module', default='app.server', help="Module a worker or script imports first")
+    parser.add_argument('--environment', default=None, help="Also time create_app() with this config")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, default=None)
+    args = parser.parse_args()
+    results = run(args.module, args.environment, args.repeat, args.target_ms)
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if results['within_target'] else 1)
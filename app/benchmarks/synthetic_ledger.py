@@ -0,0 +1,134 @@
+"""
+Synthetic ledgers for benchmarks: transactions with Zipf-skewed merchants and categories, a few
+dominant sources, mostly 'Sale' types and log-normal amounts spread over several years, generated
+in chunks with NumPy and loaded with multi-row INSERTs.
+
+    python -m app.benchmarks.synthetic_ledger --rows 1m --database-url sqlite:////tmp/ledger.db
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, insert
+
+from app.constant.system_constants import SYSTEM_USER_NAME
+from app.lib.fingerprint import transaction_fingerprint
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+CHUNK_SIZE = 50_000
+
+CATEGORIES = {
+    'Living': ['Groceries', 'Rent', 'Utilities', 'Phone', 'Internet', 'Insurance'],
+    'Food': ['Restaurants', 'Coffee', 'Fast Food', 'Delivery', 'Bars'],
+    'Transport': ['Gas', 'Parking', 'Transit', 'Ride Share', 'Car Service', 'Tolls'],
+    'Shopping': ['Clothing', 'Electronics', 'Home', 'Books', 'Gifts', 'Online'],
+    'Leisure': ['Movies', 'Music', 'Games', 'Sports', 'Travel', 'Hotels'],
+    'Health': ['Pharmacy', 'Doctor', 'Dentist', 'Fitness'],
+    'Finance': ['Fees', 'Interest', 'Transfers'],
+    'Other': ['Charity', 'Education', 'Pets', 'Miscellaneous'],
+}
+SOURCES = ['Visa', 'Amex', 'Mastercard', 'Checking', 'Savings', 'PayPal']
+SOURCE_WEIGHTS = [0.42, 0.24, 0.14, 0.12, 0.05, 0.03]
+TYPES = ['Sale', 'Return', 'Payment', 'Fee']
+TYPE_WEIGHTS = [0.9, 0.04, 0.05, 0.01]
+MERCHANTS = 5000
+
+
+def parse_size(value):
+    """Accepts a preset name from SIZES or a plain row count."""
+    return SIZES[value.lower()] if value.lower() in SIZES else int(value)
+
+
+def _zipf_weights(count, exponent):
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def generate(rows, seed=0, years=5, end=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields lists of at most chunk_size insert-ready transaction rows, the same for a given seed.
+    Dates are spread over the given number of years up to end (today by default).
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=365 * years)
+    level2 = [(level1, name) for level1, names in CATEGORIES.items() for name in names]
+    category_weights = _zipf_weights(len(level2), 1.1)
+    merchant_weights = _zipf_weights(MERCHANTS, 1.2)
+    now = datetime.now()
+    audit = {'created_at': now, 'created_by': SYSTEM_USER_NAME, 'modified_at': now, 'modified_by': SYSTEM_USER_NAME}
+
+    for offset in range(0, rows, chunk_size):
+        size = min(chunk_size, rows - offset)
+        days = rng.integers(0, 365 * years, size)
+        categories = rng.choice(len(level2), size, p=category_weights)
+        merchants = rng.choice(MERCHANTS, size, p=merchant_weights)
+        sources = rng.choice(len(SOURCES), size, p=SOURCE_WEIGHTS)
+        types = rng.choice(len(TYPES), size, p=TYPE_WEIGHTS)
+        amounts = np.round(rng.lognormal(3.2, 1.0, size), 2)
+        amounts[types == TYPES.index('Return')] *= -1
+        notes = rng.random(size) < 0.1
+        chunk = [dict(audit,
+                      transaction_date=start + timedelta(days=int(day)),
+                      description=f'Merchant {merchant}',
+                      notes='Reimbursable' if note else None,
+                      category_level1=level2[category][0],
+                      category_level2=level2[category][1],
+                      type_name=TYPES[type_index],
+                      amount=float(amount),
+                      source=SOURCES[source])
+                 for day, category, merchant, source, type_index, amount, note
+                 in zip(days, categories, merchants, sources, types, amounts, notes)]
+        for row in chunk:
+            row['fingerprint'] = transaction_fingerprint(row['transaction_date'], row['amount'], row['description'],
+                                                         row['source'])
+        yield chunk
+
+
+def load(session, rows, seed=0, years=5):
+    """
+    Loads a synthetic ledger into an empty database: the lookup values, the transactions in
+    CHUNK_SIZE multi-row INSERTs, then the rollup in one rebuild. Returns the load timings.
+    """
+    from app.controller.change_controller import record_changes
+    from app.controller.rollup_controller import rebuild_rollup
+    from app.db.models.models import TransactionModel, TransactionCategoryModel, TransactionSourceModel, \
+        TransactionTypeModel
+    from app.lib.data_version import TRANSACTIONS, CATEGORIES as CATEGORY_TABLE, TYPES as TYPE_TABLE, \
+        SOURCES as SOURCE_TABLE
+
+    started = time.perf_counter()
+    names = set(CATEGORIES) | {name for names in CATEGORIES.values() for name in names}
+    session.add_all(TransactionCategoryModel(category=name) for name in sorted(names))
+    session.add_all(TransactionSourceModel(source=name) for name in SOURCES)
+    session.add_all(TransactionTypeModel(type_name=name) for name in TYPES)
+    session.flush()
+    for chunk in generate(rows, seed, years):
+        session.execute(insert(TransactionModel.__table__), chunk)
+    inserted = time.perf_counter()
+    rollup_rows = rebuild_rollup(session)
+    record_changes(session, TRANSACTIONS, CATEGORY_TABLE, TYPE_TABLE, SOURCE_TABLE)
+    session.commit()
+    finished = time.perf_counter()
+    return {'rows': session.query(func.count(TransactionModel.transaction_id)).scalar(),
+            'insert_seconds': round(inserted - started, 3),
+            'rows_per_second': round(rows / (inserted - started)),
+            'rollup_rows': rollup_rows,
+            'rollup_seconds': round(finished - inserted, 3)}
+
+
+if __name__ == '__main__':
+    from app.benchmarks.endpoint_benchmark import benchmark_app
+
+    parser = argparse.ArgumentParser(description="Load a synthetic ledger into an empty database.")
+    parser.add_argument('--rows', type=parse_size, default='10k', help=f"Row count or one of {list(SIZES)}")
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    app = benchmark_app(args.database_url)
+    with app.app_context():
+        from app.extension import db
+        db.create_all()
+        print(json.dumps(load(db.session, args.rows, args.seed), indent=2))
@@ -2,6 +2,8 @@ import os
 
 from sqlalchemy.pool import NullPool
 
+from app.utils.db_pool import InstrumentedQueuePool
+
 
 def get_db_uri():
     username = os.environ.get("DB_USERNAME")
@@ -12,16 +14,110 @@ def get_db_uri():
     return f"postgresql://{username}:{password}@{DB_HOST}:{DB_PORT}/{database}"
 
 
+def get_engine_options():
+    """
+    Builds the engine options from the environment. DB_POOL_MODE=queue (the default) keeps a
+    pool of DB_POOL_SIZE connections per process, plus up to DB_POOL_MAX_OVERFLOW extra ones;
+    DB_POOL_MODE=null opens a new connection for every request.
+    """
+    if os.environ.get("DB_POOL_MODE", "queue") == "null":
+        return {"pool_reset_on_return": "rollback", "poolclass": NullPool}
+    return {
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true",
+        "pool_reset_on_return": "rollback",
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_POOL_MAX_OVERFLOW", 10)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+    }
+
+
+def get_replica_binds():
+    """
+    The 'replica' bind when DB_REPLICA_URI is set. It takes the primary's engine options; on Postgres
+    its connections are also read-only, so a misrouted write fails instead of diverging the replica.
+    """
+    uri = os.environ.get("DB_REPLICA_URI")
+    if not uri:
+        return {}
+    options = {"url": uri}
+    if uri.startswith("postgresql"):
+        options["connect_args"] = {"options": "-c default_transaction_read_only=on"}
+    return {"replica": options}
+
+
+def _flag(value):
+    return value.lower() == "true"
+
+
+class EnvSetting:
+    """
+    A config attribute read from the environment variable of the same name on every access, i.e.
+    when create_app() loads the config, not when this module is imported.
+    """
+
+    def __init__(self, default, parse=str):
+        self.default = default
+        self.parse = parse
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        value = os.environ.get(self.name)
+        return self.default if value is None else self.parse(value)
+
+
 class BaseConfig:
     DEBUG = False
     TESTING = False
     SQLALCEHMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_DATABASE_URI = get_db_uri()
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        "pool_pre_ping": True,
-        "pool_reset_on_return": "rollback",
-        "poolclass": NullPool
-    }
+
+    # Every setting taken from the environment is read when create_app() loads the config, not when
+    # this module is imported, so the environment (e.g. a .env file) can still be set up after the import
+    @property
+    def SQLALCHEMY_DATABASE_URI(self):
+        return get_db_uri()
+
+    @property
+    def SQLALCHEMY_ENGINE_OPTIONS(self):
+        return get_engine_options()
+
+    @property
+    def SQLALCHEMY_BINDS(self):
+        return get_replica_binds()
+
+    # With a replica, reads of GET requests fall back to the primary while it lags by more than this, and
+    # every client that wrote reads from the primary for DB_REPLICA_STICKY_SECONDS (keep it >= the max lag)
+    DB_REPLICA_MAX_LAG_SECONDS = EnvSetting(5.0, float)
+    DB_REPLICA_LAG_CHECK_SECONDS = EnvSetting(1.0, float)
+    DB_REPLICA_STICKY_SECONDS = EnvSetting(10.0, float)
+
+    # 'rollup' reads statistics from the daily_spending_rollup table, 'transactions' scans the raw table,
+    # 'columnar' keeps a NumPy snapshot of the transactions in every worker and aggregates in memory
+    STATISTICS_SOURCE = EnvSetting("rollup")
+    # Statistics responses are cached until the next committed transaction write, checked against the
+    # table_version counters in the database. A Redis URL shares the entries between workers
+    RESPONSE_CACHE_ENABLED = EnvSetting(True, _flag)
+    RESPONSE_CACHE_SIZE = EnvSetting(256, int)
+    RESPONSE_CACHE_REDIS_URL = EnvSetting(None)
+    RESPONSE_CACHE_TTL = EnvSetting(3600, int)
+    # Threads shared by all /statistics_batch requests of a worker. Each running query holds a pooled
+    # connection, so keep it below DB_POOL_SIZE to leave connections for other requests
+    STATISTICS_BATCH_WORKERS = EnvSetting(4, int)
+    STATISTICS_BATCH_MAX_QUERIES = EnvSetting(20, int)
+    # Per-endpoint request metrics served at /metrics; Server-Timing adds each request's own to its response
+    METRICS_ENABLED = EnvSetting(True, _flag)
+    SERVER_TIMING_ENABLED = EnvSetting(False, _flag)
+    # Statements slower than this are logged with their parameters and endpoint; a negative value turns
+    # the log off. On Postgres a sampled fraction of the slow SELECTs also gets EXPLAIN (ANALYZE, BUFFERS)
+    SLOW_QUERY_THRESHOLD_MS = EnvSetting(500.0, float)
+    SLOW_QUERY_EXPLAIN_RATE = EnvSetting(0.0, float)
+    SLOW_QUERY_LOG_PARAMETERS = EnvSetting(True, _flag)
+    SLOW_QUERY_LOG_FILE = EnvSetting(None)
+    SLOW_QUERY_LOG_MAX_BYTES = EnvSetting(10 * 1024 * 1024, int)
+    SLOW_QUERY_LOG_BACKUP_COUNT = EnvSetting(5, int)
 
 
 class DevelopmentConfig(BaseConfig):
@@ -0,0 +1,78 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+
+from app.extension import db
+from app.lib.exception import ClientException
+from app.utils.db_routing import use_route
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers):
+    """Returns the process-wide batch thread pool, created on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="statistics-batch")
+    return _executor
+
+
+def _reset_executor():
+    """Drops the parent's pool in a forked child, whose copy has no running threads."""
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_executor)
+
+
+def _run_query(app, query, params, route):
+    """
+    Runs one statistics query function with the given query parameters in an app context of its
+    own, so it gets its own scoped session, reading where route says; the session is removed and
+    its connection returned to the pool when the context is popped.
+    """
+    started = time.perf_counter()
+    args = MultiDict({name: str(value) for name, value in params.items()})
+    with app.app_context():
+        session = db.session()
+        use_route(session, route)
+        try:
+            status, body = HTTPStatus.OK, query(session, args)
+        except ClientException as e:
+            status, body = HTTPStatus.BAD_REQUEST, {"message": e.value}
+        except HTTPException as e:
+            status, body = e.code, getattr(e, "data", None) or {"message": e.description}
+        except Exception as e:
+            logger.error(f"Batched statistics query {query.__name__} failed: {e}")
+            status, body = HTTPStatus.INTERNAL_SERVER_ERROR, {"message": str(e)}
+        finally:
+            # Statistics only read
+            session.rollback()
+    return int(status), body, round((time.perf_counter() - started) * 1000, 3)
+
+
+def run_batch(app, queries, max_workers, route):
+    """
+    Runs (query function, params) statistics queries concurrently on the bounded batch thread pool
+    and returns their (status, body, elapsed_ms) in the order given. A query function takes a
+    session and the query parameters as a MultiDict, as GET request arguments, and returns the
+    response body. The wall time is close to the slowest query rather than the sum, as long as the
+    pool has a thread for each. Every query reads from the given route, the caller's.
+    """
+    executor = _get_executor(max_workers)
+    futures = [executor.submit(_run_query, app, query, params, route) for query, params in queries]
+    return [future.result() for future in futures]
@@ -0,0 +1,81 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.db.models.models import TableVersionModel, TransactionChangeModel
+from app.lib.data_version import TRANSACTIONS, mark_changed
+
+logger = logging.getLogger(__name__)
+
+# Transaction change log entries are kept for this many versions of the transactions write counter;
+# a snapshot further behind reloads everything
+CHANGE_LOG_VERSIONS = 10000
+
+
+def _bump_table_version(session, name, now):
+    return session.execute(update(TableVersionModel)
+                           .where(TableVersionModel.table_name == name)
+                           .values(version=TableVersionModel.version + 1, modified_at=now)).rowcount
+
+
+def record_changes(session, *names):
+    """
+    Records that the session's current DB transaction writes the named tables. Their persistent
+    write counters are bumped inside that transaction, so they commit or roll back with the data,
+    and their in-process cache versions are bumped once it commits.
+    """
+    now = datetime.now()
+    for name in names:
+        if _bump_table_version(session, name, now):
+            continue
+        try:
+            with session.begin_nested():
+                session.add(TableVersionModel(table_name=name, version=1, modified_at=now))
+        except IntegrityError:
+            # Another transaction created the counter first
+            _bump_table_version(session, name, now)
+    mark_changed(session, *names)
+
+
+def table_versions(session, names):
+    """Returns the committed write counters of the named tables with a single query, 0 for unwritten ones."""
+    versions = dict(session.query(TableVersionModel.table_name, TableVersionModel.version)
+                    .filter(TableVersionModel.table_name.in_(names)))
+    return tuple(versions.get(name, 0) for name in names)
+
+
+def record_transaction_changes(session, transaction_ids):
+    """
+    Records a write to the given transactions (inserted, updated or deleted): bumps the transactions
+    write counter like record_changes and logs the IDs under the new version, in the same DB
+    transaction. Writers to the counter are serialized by its row lock, so every version up to a
+    committed one is committed, and the log of the versions after a snapshot's is complete.
+    """
+    record_changes(session, TRANSACTIONS)
+    version = session.execute(select(TableVersionModel.version)
+                              .where(TableVersionModel.table_name == TRANSACTIONS)).scalar_one()
+    session.execute(insert(TransactionChangeModel),
+                    [{'version': version, 'transaction_id': i} for i in transaction_ids]
+                    or [{'version': version, 'transaction_id': None}])
+    session.execute(delete(TransactionChangeModel)
+                    .where(TransactionChangeModel.version <= version - CHANGE_LOG_VERSIONS))
+
+
+def transaction_changes(session, since, until):
+    """
+    Returns the IDs of the transactions the versions after since up to until wrote, or None when
+    the change log cannot show every one of them: a version bumped by record_changes alone (a
+    maintenance script) or already pruned.
+    """
+    if since is None or until < since:
+        return None
+    rows = session.execute(select(TransactionChangeModel.version, TransactionChangeModel.transaction_id)
+                           .where(TransactionChangeModel.version > since, TransactionChangeModel.version <= until))
+    versions, transaction_ids = set(), set()
+    for version, transaction_id in rows:
+        versions.add(version)
+        if transaction_id is not None:
+            transaction_ids.add(transaction_id)
+    return transaction_ids if len(versions) == until - since else None
@@ -0,0 +1,190 @@
+import numpy as np
+
+from app.controller.transaction_snapshot import TransactionSnapshot
+
+ENCODED_COLUMNS = ['type_name', 'category_level1', 'category_level2', 'source']
+MISSING_CODE = -1
+
+
+class _Dictionary:
+    """Dictionary encoding of one string column. Codes are stable for the life of the process; None is MISSING_CODE."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, values):
+        codes = self.codes
+        out = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if value is None:
+                out[i] = MISSING_CODE
+                continue
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(self.values)
+                self.values.append(value)
+            out[i] = code
+        return out
+
+    def decode(self, code):
+        return None if code == MISSING_CODE else self.values[code]
+
+    def nbytes(self):
+        return sum(len(v) for v in self.values) + 100 * len(self.values)
+
+
+def _empty_columns():
+    columns = {'transaction_id': np.empty(0, dtype=np.int64),
+               'day': np.empty(0, dtype=np.int32),
+               'cents': np.empty(0, dtype=np.int64)}
+    columns.update({name: np.empty(0, dtype=np.int32) for name in ENCODED_COLUMNS})
+    return columns
+
+
+class ColumnarStore(TransactionSnapshot):
+    """
+    Per-process columnar snapshot of the transactions table for the 'columnar' statistics source.
+
+    Each transaction is one slot in parallel NumPy arrays sorted by transaction_id: the day as
+    days since 1970-01-01, the amount as integer cents and dictionary codes for the type,
+    categories and source. Group-bys are answered with bincount and reduceat over those arrays.
+    It is kept current from the transaction change log, see TransactionSnapshot.
+    """
+    NAME = 'Columnar store'
+    COLUMNS = ['transaction_date', 'amount', *ENCODED_COLUMNS]
+
+    def __init__(self):
+        self.dictionaries = {name: _Dictionary() for name in ENCODED_COLUMNS}
+        super().__init__()
+
+    def _reset(self):
+        self.columns = _empty_columns()
+
+    def _remove(self, transaction_ids):
+        # Readers keep using the arrays they already hold, so the remaining slots are copied
+        keep = ~np.isin(self.columns['transaction_id'], np.fromiter(transaction_ids, dtype=np.int64))
+        self.columns = {name: column[keep] for name, column in self.columns.items()}
+
+    def _upsert(self, rows):
+        ids, dates, amounts, *encoded = zip(*rows)
+        batch = {'transaction_id': np.array(ids, dtype=np.int64),
+                 'day': np.array(dates, dtype='datetime64[D]').astype(np.int32),
+                 'cents': np.array([round(a * 100) for a in amounts], dtype=np.int64)}
+        for name, values in zip(ENCODED_COLUMNS, encoded):
+            batch[name] = self.dictionaries[name].encode(values)
+
+        current = self.columns
+        positions = np.searchsorted(current['transaction_id'], batch['transaction_id'])
+        in_range = positions < len(current['transaction_id'])
+        existing = np.zeros(len(positions), dtype=bool)
+        existing[in_range] = current['transaction_id'][positions[in_range]] == batch['transaction_id'][in_range]
+        # Readers keep using the arrays they already hold, so updated slots are written into copies
+        columns = {}
+        for name, column in current.items():
+            if existing.any():
+                column = column.copy()
+                column[positions[existing]] = batch[name][existing]
+            columns[name] = np.concatenate([column, batch[name][~existing]])
+        if not np.all(np.diff(columns['transaction_id']) > 0):
+            order = np.argsort(columns['transaction_id'], kind='stable')
+            columns = {name: column[order] for name, column in columns.items()}
+        self.columns = columns
+
+    def _day(self, value):
+        return np.datetime64(value, 'D').astype(np.int64)
+
+    def _code(self, name, value):
+        return self.dictionaries[name].codes.get(value, MISSING_CODE - 1)
+
+    def _bucket_keys(self, days, by):
+        if by == 'day':
+            return days
+        months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        if by == 'month':
+            return months
+        if by == 'quarter':
+            return months - months % 3
+        return months - months % 12
+
+    def _bucket_start(self, key, by):
+        unit = 'D' if by == 'day' else 'M'
+        return np.datetime64(int(key), unit).astype('datetime64[D]').item()
+
+    def group_by(self, dimensions, start_date=None, end_date=None, category=None, by=None, type_name="Sale"):
+        """
+        Returns one (dimension values..., total, count, min, max) row per group, ordered by the
+        dimension values, matching the rows of the SQL statistics sources. 'date' groups by the
+        first day of its 'by' bucket; date bounds are exclusive YYYY-MM-DD strings.
+        """
+        columns = self.columns
+        mask = np.ones(len(columns['transaction_id']), dtype=bool)
+        if type_name:
+            mask &= columns['type_name'] == self._code('type_name', type_name)
+        if start_date:
+            mask &= columns['day'] > self._day(start_date)
+        if end_date:
+            mask &= columns['day'] < self._day(end_date)
+        if category:
+            mask &= columns['category_level2'] == self._code('category_level2', category)
+        cents = columns['cents'][mask]
+        if not len(cents):
+            return []
+
+        # Dictionary codes and date buckets are small dense integers: offset to 0..n-1 and combined
+        # into a single group number, without sorting the keys
+        offsets, inverses, shape = [], [], []
+        for dimension in dimensions:
+            keys = self._bucket_keys(columns['day'][mask], by) if dimension == 'date' else columns[dimension][mask]
+            low = int(keys.min())
+            offsets.append(low)
+            inverses.append(keys - low)
+            shape.append(int(keys.max()) - low + 1)
+        if inverses:
+            group = np.ravel_multi_index(inverses, shape)
+        else:
+            group, shape = np.zeros(len(cents), dtype=np.int64), [1]
+        if np.prod(shape, dtype=np.float64) > len(cents):
+            # Sparse combination of many dimensions: number only the groups that occur
+            used, group = np.unique(group, return_inverse=True)
+        else:
+            used = None
+
+        totals = np.bincount(group, weights=cents)
+        counts = np.bincount(group)
+        present = np.flatnonzero(counts)
+        order = np.argsort(group, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(counts[present])[:-1]])
+        minimums = np.minimum.reduceat(cents[order], starts)
+        maximums = np.maximum.reduceat(cents[order], starts)
+
+        rows = []
+        for i, g in enumerate(present):
+            index = np.unravel_index(g if used is None else used[g], shape)
+            values = []
+            for dimension, low, position in zip(dimensions, offsets, index):
+                key = low + int(position)
+                values.append(self._bucket_start(key, by) if dimension == 'date'
+                              else self.dictionaries[dimension].decode(key))
+            rows.append((*values, totals[g] / 100, int(counts[g]), minimums[i] / 100, maximums[i] / 100))
+        # None (a NULL dimension) sorts last, as NULLs do in an ascending ORDER BY on Postgres
+        rows.sort(key=lambda row: tuple((v is None, v) for v in row[:len(dimensions)]))
+        return rows
+
+    def stats(self):
+        """Snapshot size, memory use per million rows and the cost of the last refresh."""
+        rows = len(self.columns['transaction_id'])
+        array_bytes = sum(column.nbytes for column in self.columns.values())
+        dictionary_bytes = sum(d.nbytes() for d in self.dictionaries.values())
+        return {"rows": rows,
+                "array_bytes": array_bytes,
+                "dictionary_bytes": dictionary_bytes,
+                "bytes_per_million_rows": round(array_bytes / rows * 1000000) if rows else None,
+                "dictionary_sizes": {name: len(d.values) for name, d in self.dictionaries.items()},
+                "version": self.version[0] if self.version else None,
+                "refreshes": self.refreshes,
+                "full_loads": self.full_loads,
+                "last_refresh": self.last_refresh}
+
+
+columnar_store = ColumnarStore()
@@ -0,0 +1,104 @@
+import csv
+import logging
+import time
+from itertools import islice
+
+from app.controller.transaction_controller import prepare_bulk_rows, insert_bulk_rows
+
+logger = logging.getLogger(__name__)
+
+# Only the first errors are returned to the client, all of them are counted
+MAX_REPORTED_ERRORS = 100
+
+
+def _chunks(records, chunk_size):
+    iterator = iter(records)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def _readable(records, unreadable):
+    """
+    Yields the records of a statement parser until the statement cannot be decoded or parsed any
+    further, then stops after appending the position following the last record read and the error
+    to unreadable.
+    """
+    iterator = iter(records)
+    position = 0
+    while True:
+        try:
+            position, record = next(iterator)
+        except StopIteration:
+            return
+        except (ValueError, csv.Error) as e:
+            unreadable.append((position + 1, e))
+            return
+        yield position, record
+
+
+def import_statement(session, records, chunk_size, defaults=None, date_format='%m/%d/%Y', dedupe=False):
+    """
+    Loads (position, transaction dict) records from a statement parser through the bulk insert path,
+    committing every chunk_size rows so memory stays bounded by one chunk. Empty fields fall back to
+    'defaults'. Rows with an invalid date or amount, and chunks the database rejects, are reported
+    as per-row errors while the rest of the statement is still imported. With dedupe, rows already
+    stored are skipped and counted, and the ones that differ from the stored row are reported as
+    conflicts. Stored transactions that earlier chunks matched or inserted are not matched again,
+    so the outcome does not depend on chunk_size. A statement that cannot be decoded or parsed
+    past some row (e.g. a byte that is not UTF-8) is imported up to there, and the summary reports
+    the error at that row and complete=False.
+    """
+    defaults = {k: v for k, v in (defaults or {}).items() if v}
+    summary = {"rows": 0, "inserted": 0, "failed": 0, "errors": [], "complete": True}
+    unreadable = []
+    # IDs of the stored transactions the committed chunks matched or inserted, see deduplicate_rows
+    claimed = set()
+    if dedupe:
+        summary.update({"skipped": 0, "conflicting": 0, "conflicts": []})
+
+    def report(position, message):
+        summary["failed"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"row": position, "error": message})
+
+    started = time.perf_counter()
+    for chunk in _chunks(_readable(records, unreadable), chunk_size):
+        positions = [position for position, _ in chunk]
+        payload = [dict(defaults, **{k: v for k, v in record.items() if v not in (None, '')})
+                   for _, record in chunk]
+        summary["rows"] += len(chunk)
+
+        rows, invalid = prepare_bulk_rows(payload, date_format)
+        for index in invalid:
+            report(positions[index], f"Invalid or missing transaction_date ({date_format}) or amount.")
+        try:
+            result = insert_bulk_rows(session, rows, dedupe, claimed)
+            session.commit()
+            summary["inserted"] += len(result.transaction_ids)
+            if dedupe:
+                claimed.update(result.transaction_ids, result.matched_ids)
+                summary["skipped"] += result.skipped
+                summary["conflicting"] += len(result.conflicts)
+                invalid_indexes = set(invalid)
+                valid_positions = [p for i, p in enumerate(positions) if i not in invalid_indexes]
+                for index, transaction_id in result.conflicts:
+                    if len(summary["conflicts"]) < MAX_REPORTED_ERRORS:
+                        summary["conflicts"].append({"row": valid_positions[index], "transaction_id": transaction_id})
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Statement chunk starting at row {positions[0]} failed: {e}")
+            valid = sorted(set(range(len(chunk))) - set(invalid))
+            for index in valid:
+                report(positions[index], f"Chunk rejected by the database: {e}")
+
+    for position, e in unreadable:
+        logger.error(f"Statement unreadable from row {position}: {e}")
+        summary["complete"] = False
+        report(position, f"The statement cannot be read from this row on: {e}")
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["rows_per_second"] = round(summary["rows"] / elapsed) if elapsed else 0
+    logger.info(f"Imported {summary['inserted']} of {summary['rows']} statement row(s) "
+                f"at {summary['rows_per_second']} rows/s")
+    return summary
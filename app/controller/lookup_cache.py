@@ -0,0 +1,79 @@
+import logging
+import threading
+from collections import namedtuple
+
+from app.controller.change_controller import table_versions
+from app.db.models.models import TransactionCategoryModel, TransactionTypeModel, TransactionSourceModel
+from app.lib.data_version import CATEGORIES, TYPES, SOURCES, pending_changes
+
+logger = logging.getLogger(__name__)
+
+# The lookup tables and their key column, by data set name
+LOOKUP_TABLES = {CATEGORIES: (TransactionCategoryModel, 'category'),
+                 TYPES: (TransactionTypeModel, 'type_name'),
+                 SOURCES: (TransactionSourceModel, 'source')}
+
+_Snapshot = namedtuple('_Snapshot', ['version', 'rows', 'keys'])
+
+
+class LookupCache:
+    """
+    Per-process copy of the category, type and source tables, which are tiny and rarely written.
+
+    Every access reads the three tables' write counters with one primary-key lookup, so a write in
+    any worker (record_changes bumps the counter in the writing DB transaction) makes the next
+    access here reload that table. A session that has uncommitted writes to a lookup table reads
+    it from the database instead and leaves the cache alone, so rows that may still roll back are
+    never cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self.loads = 0
+        self.hits = 0
+
+    def _load(self, session, name, version):
+        model, key = LOOKUP_TABLES[name]
+        rows = [{key: getattr(r, key), 'description': r.description}
+                for r in session.query(model).order_by(getattr(model, key))]
+        return _Snapshot(version, rows, frozenset(row[key] for row in rows))
+
+    def _refresh(self, session, names):
+        """Returns the current snapshots of the named tables, reloading those whose counter moved."""
+        versions = dict(zip(names, table_versions(session, names)))
+        pending = pending_changes(session)
+        snapshots = {}
+        for name in names:
+            if name in pending:
+                snapshots[name] = self._load(session, name, None)
+                continue
+            snapshot = self._snapshots.get(name)
+            if snapshot is None or snapshot.version != versions[name]:
+                with self._lock:
+                    snapshot = self._snapshots.get(name)
+                    if snapshot is None or snapshot.version != versions[name]:
+                        snapshot = self._snapshots[name] = self._load(session, name, versions[name])
+                        self.loads += 1
+                        logger.info(f"Loaded {len(snapshot.rows)} {name} lookup value(s)")
+            else:
+                self.hits += 1
+            snapshots[name] = snapshot
+        return snapshots
+
+    def rows(self, session, name):
+        """All rows of one lookup table as {<key>: ..., 'description': ...} dicts ordered by key. Do not modify."""
+        return self._refresh(session, [name])[name].rows
+
+    def keys(self, session, names=tuple(LOOKUP_TABLES)):
+        """Maps each of the named lookup tables to the set of its key values."""
+        return {name: snapshot.keys for name, snapshot in self._refresh(session, list(names)).items()}
+
+    def stats(self):
+        return {"tables": {name: {"rows": len(snapshot.rows), "version": snapshot.version}
+                           for name, snapshot in self._snapshots.items()},
+                "loads": self.loads,
+                "hits": self.hits}
+
+
+lookup_cache = LookupCache()
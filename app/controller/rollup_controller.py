@@ -0,0 +1,108 @@
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import Date, and_, cast, func, insert, or_, select
+
+from app.db.models.models import DailySpendingRollupModel, TransactionModel, ROLLUP_NULL_KEY
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEYS = ['type_name', 'category_level1', 'category_level2', 'source']
+# Above this many disjoint day ranges a refresh recomputes the single span covering them all
+MAX_REFRESH_RANGES = 50
+# Concurrent refreshes of the same day are serialized on Postgres with transaction-level advisory
+# locks keyed (ROLLUP_LOCK_CLASS, day % ROLLUP_LOCK_SLOTS): few enough locks per transaction to stay
+# within max_locks_per_transaction however many days a write touches
+ROLLUP_LOCK_CLASS = 0x5250
+ROLLUP_LOCK_SLOTS = 32
+
+
+def transaction_day(value):
+    """Returns the calendar day of a transaction_date value, or None."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _midnight(day):
+    return datetime(day.year, day.month, day.day)
+
+
+def _day_expression(session):
+    """SQL expression for the calendar day of transaction_date on the bound dialect."""
+    if session.get_bind().dialect.name == 'sqlite':
+        return func.date(TransactionModel.transaction_date)
+    return cast(TransactionModel.transaction_date, Date)
+
+
+def _day_ranges(days):
+    """Merges a set of days into sorted [start, end) ranges of consecutive days."""
+    ranges = []
+    for day in sorted(days):
+        if ranges and ranges[-1][1] == day:
+            ranges[-1][1] = day + timedelta(days=1)
+        else:
+            ranges.append([day, day + timedelta(days=1)])
+    return ranges
+
+
+def _insert_aggregates(session, where=None):
+    """INSERT ... SELECT the daily aggregates of transactions matching 'where' into the rollup table."""
+    day = _day_expression(session)
+    keys = [func.coalesce(getattr(TransactionModel, k), ROLLUP_NULL_KEY) for k in ROLLUP_KEYS]
+    select = (session.query(day, *keys,
+                            func.sum(TransactionModel.amount),
+                            func.count(TransactionModel.amount),
+                            func.min(TransactionModel.amount),
+                            func.max(TransactionModel.amount))
+              .group_by(day, *keys))
+    if where is not None:
+        select = select.filter(where)
+    columns = ['day', *ROLLUP_KEYS, 'total_amount', 'transaction_count', 'min_amount', 'max_amount']
+    session.execute(insert(DailySpendingRollupModel).from_select(columns, select.statement))
+
+
+def _lock_days(session, days):
+    """
+    Blocks until no other DB transaction is refreshing any of the days, until this one ends.
+    Without it two writers of the same day both delete its rows, neither seeing the other's
+    uncommitted inserts, and the second INSERT violates the rollup primary key. Once the lock is
+    granted the DELETE and INSERT ... SELECT statements see the other writer's committed rows.
+    """
+    if session.get_bind().dialect.name != 'postgresql':
+        # SQLite serializes writing transactions by itself
+        return
+    for slot in sorted({day.toordinal() % ROLLUP_LOCK_SLOTS for day in days}):
+        session.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_CLASS, slot)))
+
+
+def refresh_rollup(session, days):
+    """
+    Recomputes the rollup rows of the given days from the transactions table.
+    Pending changes are flushed first and the work runs in the caller's DB transaction,
+    so the rollup commits or rolls back together with the transaction rows.
+    """
+    days = {transaction_day(d) for d in days} - {None}
+    if not days:
+        return
+    session.flush()
+    _lock_days(session, days)
+    ranges = _day_ranges(days)
+    if len(ranges) > MAX_REFRESH_RANGES:
+        ranges = [[ranges[0][0], ranges[-1][1]]]
+    session.query(DailySpendingRollupModel).filter(
+        or_(*[and_(DailySpendingRollupModel.day >= start, DailySpendingRollupModel.day < end)
+              for start, end in ranges])).delete(synchronize_session=False)
+    _insert_aggregates(session, or_(*[and_(TransactionModel.transaction_date >= _midnight(start),
+                                           TransactionModel.transaction_date < _midnight(end))
+                                      for start, end in ranges]))
+    logger.info(f"Refreshed spending rollup for {len(days)} day(s)")
+
+
+def rebuild_rollup(session):
+    """Discards and rebuilds the whole rollup table from the transactions table."""
+    session.query(DailySpendingRollupModel).delete(synchronize_session=False)
+    _insert_aggregates(session)
+    return session.query(func.count()).select_from(DailySpendingRollupModel).scalar()
@@ -0,0 +1,265 @@
+import logging
+import re
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import select, update
+
+from app.constant.system_constants import SYSTEM_USER_NAME
+from app.controller.change_controller import table_versions
+from app.db.models.models import CategorizationRuleModel, TransactionModel
+from app.lib.data_version import RULES
+
+logger = logging.getLogger(__name__)
+
+RERUN_CHUNK_SIZE = 10000
+
+_BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+
+# Detached copy of a rule, so compiled rules outlive the session that loaded them
+Rule = namedtuple('Rule', ['rule_id', 'priority', 'description_pattern', 'match_type', 'min_amount', 'max_amount',
+                           'source', 'category_level1', 'category_level2'])
+
+
+class _Automaton:
+    """Aho-Corasick automaton over lowercase keywords: one pass over a text finds every keyword in it."""
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for value, keyword in keywords:
+            node = 0
+            for char in keyword:
+                if char not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[node][char] = len(self._goto) - 1
+                node = self._goto[node][char]
+            self._out[node] += (value,)
+        # Breadth-first, so the fail target of every node is final before its children are linked
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def find(self, text):
+        """Returns the values of the keywords occurring in the lowercase text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class RuleMatcher:
+    """
+    All enabled categorization rules compiled for matching many transactions. Substring patterns
+    share one Aho-Corasick automaton, and regex patterns are gated by one combined regex, so a
+    description is scanned once for the substrings and once for the regexes; only when the
+    combined regex matches are the individual regexes run to find out which ones did.
+    """
+
+    def __init__(self, rules):
+        self.rules = sorted((Rule(*(getattr(rule, f) for f in Rule._fields)) for rule in rules),
+                            key=lambda r: (r.priority, r.rule_id))
+        self._always = set()
+        self._regexes = []
+        keywords = []
+        for index, rule in enumerate(self.rules):
+            if not rule.description_pattern:
+                self._always.add(index)
+            elif rule.match_type == 'regex':
+                self._regexes.append((index, re.compile(rule.description_pattern, re.IGNORECASE)))
+            else:
+                keywords.append((index, rule.description_pattern.lower()))
+        self._automaton = _Automaton(keywords)
+        self._any_regex = self._combine([regex.pattern for _, regex in self._regexes])
+
+    @staticmethod
+    def _combine(patterns):
+        """
+        One regex matching wherever any of the patterns does. Non-capturing alternatives keep the
+        literal prefix optimizations of the regex engine. Group numbers and names clash once the
+        patterns are combined though, so with backreferences or a repeated group name there is no
+        combined regex and the patterns are run one by one.
+        """
+        if not patterns or any(_BACKREFERENCE.search(pattern) for pattern in patterns):
+            return None
+        try:
+            return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+        except re.error:
+            return None
+
+    def __len__(self):
+        return len(self.rules)
+
+    @staticmethod
+    def _conditions_hold(rule, amount, source):
+        if rule.source and rule.source != source:
+            return False
+        if rule.min_amount is not None and (amount is None or Decimal(str(amount)) < rule.min_amount):
+            return False
+        if rule.max_amount is not None and (amount is None or Decimal(str(amount)) > rule.max_amount):
+            return False
+        return True
+
+    def match(self, description, amount=None, source=None):
+        """Returns the first rule, by priority, that applies to the transaction, or None."""
+        description = description or ''
+        best = None
+        for index in sorted(self._automaton.find(description.lower()) | self._always):
+            if self._conditions_hold(self.rules[index], amount, source):
+                best = index
+                break
+        if self._regexes and (self._any_regex is None or self._any_regex.search(description)):
+            for index, regex in self._regexes:
+                if best is not None and index > best:
+                    break
+                if regex.search(description) and self._conditions_hold(self.rules[index], amount, source):
+                    best = index
+                    break
+        return self.rules[best] if best is not None else None
+
+    def categorize(self, rows, overwrite=False):
+        """
+        Sets category_level1 and category_level2 of the row dicts a rule applies to. Rows that
+        already have a category are left alone unless overwrite is set. Returns the rows changed.
+        """
+        changed = 0
+        for row in rows:
+            if not overwrite and (row.get('category_level1') or row.get('category_level2')):
+                continue
+            rule = self.match(row.get('description'), row.get('amount'), row.get('source'))
+            if rule is None:
+                continue
+            if (row.get('category_level1'), row.get('category_level2')) != (rule.category_level1,
+                                                                          rule.category_level2):
+                row['category_level1'] = rule.category_level1
+                row['category_level2'] = rule.category_level2
+                changed += 1
+        return changed
+
+
+class _MatcherCache:
+    """The compiled rules of this process, recompiled when the rules' write counter moves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.matcher = RuleMatcher([])
+
+    def get(self, session):
+        version = table_versions(session, [RULES])
+        if version != self.version:
+            with self._lock:
+                if version != self.version:
+                    rules = session.query(CategorizationRuleModel).filter(CategorizationRuleModel.enabled).all()
+                    self.matcher = RuleMatcher(rules)
+                    self.version = version
+                    logger.info(f"Compiled {len(rules)} categorization rule(s)")
+        return self.matcher
+
+
+matcher_cache = _MatcherCache()
+
+
+def validate_rule(data):
+    """Raises ValueError when a rule payload cannot be compiled or can never match."""
+    if data.get('match_type', 'substring') not in ('substring', 'regex'):
+        raise ValueError("'match_type' can be 'substring' or 'regex'.")
+    if data.get('match_type') == 'regex' and data.get('description_pattern'):
+        try:
+            re.compile(data['description_pattern'])
+        except re.error as e:
+            raise ValueError(f"Invalid regex '{data['description_pattern']}': {e}") from e
+    if not data.get('category_level1') and not data.get('category_level2'):
+        raise ValueError("A rule must set 'category_level1' or 'category_level2'.")
+    if data.get('min_amount') is not None and data.get('max_amount') is not None \
+            and data['min_amount'] > data['max_amount']:
+        raise ValueError("'min_amount' must not exceed 'max_amount'.")
+
+
+def apply_rules(session, rows, overwrite=False):
+    """Categorizes new transaction rows (dicts) with the current rules. Returns the number of rows categorized."""
+    matcher = matcher_cache.get(session)
+    if not len(matcher) or not rows:
+        return 0
+    started = time.perf_counter()
+    changed = matcher.categorize(rows, overwrite)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Categorized {changed} of {len(rows)} transaction(s) with {len(matcher)} rule(s) in "
+                f"{elapsed:.3f}s ({len(rows) / elapsed if elapsed else 0:.0f} rows/s)")
+    return changed
+
+
+def rerun_rules(session, filters=None, overwrite=False, dry_run=False):
+    """
+    Applies the current rules to existing transactions, optionally restricted by bulk operation
+    filters, reading them in keyset chunks of RERUN_CHUNK_SIZE. The changed rows are written with
+    one UPDATE per chunk and resulting category pair. Returns scan and update counts and rows/s.
+    """
+    from app.controller.transaction_controller import transaction_filter, transactions_written
+
+    matcher = matcher_cache.get(session)
+    conditions = transaction_filter(filters) if filters else []
+    model = TransactionModel
+    started = time.perf_counter()
+    scanned = changed = 0
+    days, written = set(), []
+    last_id = 0
+    now = datetime.now()
+    while True:
+        chunk = session.execute(
+            select(model.transaction_id, model.transaction_date, model.description, model.amount, model.source,
+                   model.category_level1, model.category_level2)
+            .where(*conditions, model.transaction_id > last_id)
+            .order_by(model.transaction_id).limit(RERUN_CHUNK_SIZE)).mappings().all()
+        if not chunk:
+            break
+        last_id = chunk[-1]['transaction_id']
+        scanned += len(chunk)
+        rows = [dict(row) for row in chunk]
+        if not len(matcher) or not matcher.categorize(rows, overwrite):
+            continue
+        updates = {}
+        for before, after in zip(chunk, rows):
+            if (before['category_level1'], before['category_level2']) != (after['category_level1'],
+                                                                          after['category_level2']):
+                updates.setdefault((after['category_level1'], after['category_level2']), []).append(
+                    after['transaction_id'])
+                days.add(after['transaction_date'])
+        for (category_level1, category_level2), ids in updates.items():
+            changed += len(ids)
+            if not dry_run:
+                written.extend(ids)
+                session.execute(update(model).where(model.transaction_id.in_(ids))
+                                .values(category_level1=category_level1, category_level2=category_level2,
+                                        modified_at=now, modified_by=SYSTEM_USER_NAME)
+                                .execution_options(synchronize_session=False))
+    if written:
+        transactions_written(session, days, written)
+    elapsed = time.perf_counter() - started
+    result = {'rules': len(matcher),
+              'scanned': scanned,
+              'changed': changed,
+              'dry_run': dry_run,
+              'seconds': round(elapsed, 3),
+              'rows_per_second': round(scanned / elapsed) if elapsed else None}
+    logger.info(f"Re-ran categorization rules: {result}")
+    return result
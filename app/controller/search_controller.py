@@ -0,0 +1,95 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import and_, func, literal, or_
+
+from app.db.models.models import TransactionModel
+
+SEARCH_MODES = ['prefix', 'substring', 'fuzzy']
+SEARCH_FILTER_FIELDS = ['start_date', 'end_date', 'category_level1', 'category_level2', 'source', 'type_name']
+
+_WORD = re.compile(r'\w+')
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _text_condition(query, mode):
+    """
+    The pg_trgm indexable condition of a search over the description and notes: a case-insensitive
+    LIKE for substrings, a word-start regex per query word for prefixes and word_similarity (<%)
+    above pg_trgm.word_similarity_threshold for fuzzy matches.
+    """
+    columns = [TransactionModel.description, TransactionModel.notes]
+    if mode == 'substring':
+        pattern = f"%{_escape_like(query.strip())}%"
+        return or_(*(column.ilike(pattern, escape='\\') for column in columns))
+    if mode == 'prefix':
+        return and_(*(or_(*(column.op('~*')(r'\m' + re.escape(word)) for column in columns))
+                      for word in _WORD.findall(query)))
+    return or_(*(literal(query).op('<%')(column) for column in columns))
+
+
+def _search_postgres(session, query, mode, filters, limit, offset):
+    from app.controller.transaction_controller import transaction_filter
+
+    model = TransactionModel
+    score = func.greatest(*(func.word_similarity(query, func.coalesce(column, ''))
+                            for column in [model.description, model.notes])).label('score')
+    rows = session.query(model, score, func.count().over().label('total')) \
+        .filter(_text_condition(query, mode), *(transaction_filter(filters) if filters else [])) \
+        .order_by(score.desc(), model.transaction_date.desc(), model.transaction_id.desc()) \
+        .offset(offset).limit(limit).all()
+    total = rows[0].total if rows else (_count_beyond_page(session, query, mode, filters) if offset else 0)
+    return total, [(transaction, float(score)) for transaction, score, _ in rows]
+
+
+def _count_beyond_page(session, query, mode, filters):
+    """The match count when the requested page is past the last match, so the window count is unavailable."""
+    from app.controller.transaction_controller import transaction_filter
+
+    return session.query(func.count(TransactionModel.transaction_id)) \
+        .filter(_text_condition(query, mode), *(transaction_filter(filters) if filters else [])).scalar()
+
+
+def _search_index(session, query, mode, filters, limit, offset):
+    # The in-process index is only built on databases without pg_trgm
+    from app.controller.search_index import search_index
+
+    total, page = search_index.refresh(session).search(query, mode, filters, limit, offset)
+    if not page:
+        return total, []
+    transactions = {t.transaction_id: t for t in session.query(TransactionModel).filter(
+        TransactionModel.transaction_id.in_([transaction_id for transaction_id, _ in page]))}
+    return total, [(transactions[transaction_id], score) for transaction_id, score in page
+                   if transaction_id in transactions]
+
+
+def search_transactions(session, query, mode='substring', filters=None, limit=50, offset=0):
+    """
+    Finds the transactions whose description or notes match the query, by word prefix, substring
+    or trigram similarity, optionally restricted by date range (YYYY-MM-DD, inclusive), categories,
+    source and type. On Postgres the trigram GIN indexes answer the query; elsewhere the per-process
+    inverted index of app.controller.search_index does.
+    Returns the total number of matches and the (TransactionModel, score) pairs of the requested
+    page, best match first and then newest first.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"'mode' can be one of {SEARCH_MODES}.")
+    if not query or not query.strip():
+        raise ValueError("'q' cannot be blank.")
+    if mode != 'substring' and not _WORD.search(query):
+        raise ValueError(f"'q' must contain a letter or digit in {mode} mode.")
+    filters = {k: v for k, v in (filters or {}).items() if v not in (None, '')}
+    unknown = set(filters) - set(SEARCH_FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown filter(s) {sorted(unknown)}. They can be {SEARCH_FILTER_FIELDS}.")
+    for name in ['start_date', 'end_date']:
+        if name in filters:
+            try:
+                datetime.strptime(filters[name], '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"'{name}' must be a YYYY-MM-DD date.") from None
+    search = _search_postgres if session.get_bind().dialect.name == 'postgresql' else _search_index
+    return search(session, query, mode, filters, limit, offset)
@@ -0,0 +1,170 @@
+import heapq
+import re
+from bisect import bisect_left
+from datetime import date
+
+from app.controller.transaction_snapshot import TransactionSnapshot
+
+# Smallest trigram similarity of a word and a query word for a fuzzy match
+FUZZY_THRESHOLD = 0.45
+FILTER_COLUMNS = ['category_level1', 'category_level2', 'source', 'type_name']
+
+_WORD = re.compile(r'\w+')
+
+
+def words(text):
+    return _WORD.findall(text.lower()) if text else []
+
+
+def trigrams(word):
+    """The trigrams of a word padded like pg_trgm does: two spaces before, one after."""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Trigram similarity of two words: shared trigrams over distinct trigrams, as pg_trgm's similarity()."""
+    a, b = trigrams(a), trigrams(b)
+    return len(a & b) / len(a | b)
+
+
+class _Document:
+    __slots__ = ('day', 'text', 'words', 'category_level1', 'category_level2', 'source', 'type_name')
+
+    def __init__(self, transaction_date, description, notes, category_level1, category_level2, source, type_name):
+        self.day = transaction_date.toordinal()
+        self.text = '\n'.join(t for t in (description, notes) if t).lower()
+        self.words = frozenset(words(self.text))
+        self.category_level1 = category_level1
+        self.category_level2 = category_level2
+        self.source = source
+        self.type_name = type_name
+
+
+class TextSearchIndex(TransactionSnapshot):
+    """
+    Per-process inverted index over the description and notes of the transactions, for databases
+    without trigram indexes (SQLite in development and tests).
+
+    Every word maps to the IDs of the transactions containing it, and every trigram of a word to
+    the words containing it. A query word is first resolved against the vocabulary, by binary search
+    over the sorted words for prefixes and through the word trigrams for substrings and fuzzy
+    matches, and only the postings of the matching words are read.
+
+    It is kept current from the transaction change log like the columnar statistics store, see
+    TransactionSnapshot.
+    """
+    NAME = 'Text search index'
+    COLUMNS = ['transaction_date', 'description', 'notes', *FILTER_COLUMNS]
+
+    def _reset(self):
+        self.documents = {}
+        self.postings = {}
+        self.word_trigrams = {}
+        self._vocabulary = None
+
+    def _upsert(self, rows):
+        for transaction_id, *values in rows:
+            self._index(transaction_id, _Document(*values))
+
+    def _remove(self, transaction_ids):
+        for transaction_id in transaction_ids:
+            document = self.documents.pop(transaction_id, None)
+            if document is not None:
+                for word in document.words:
+                    self.postings[word].discard(transaction_id)
+
+    def _index(self, transaction_id, document):
+        previous = self.documents.get(transaction_id)
+        if previous is not None:
+            for word in previous.words - document.words:
+                self.postings[word].discard(transaction_id)
+        for word in document.words if previous is None else document.words - previous.words:
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = set()
+                for trigram in trigrams(word):
+                    self.word_trigrams.setdefault(trigram, set()).add(word)
+                self._vocabulary = None
+            posting.add(transaction_id)
+        self.documents[transaction_id] = document
+
+    def _matching_words(self, query_word, mode):
+        """Maps the indexed words matching one query word to their similarity with it."""
+        if mode == 'prefix':
+            if self._vocabulary is None:
+                self._vocabulary = sorted(self.postings)
+            vocabulary = self._vocabulary
+            matches = []
+            for i in range(bisect_left(vocabulary, query_word), len(vocabulary)):
+                if not vocabulary[i].startswith(query_word):
+                    break
+                matches.append(vocabulary[i])
+        elif mode == 'substring':
+            inner = [query_word[i:i + 3] for i in range(len(query_word) - 2)]
+            if inner:
+                candidates = set.intersection(*(self.word_trigrams.get(t, set()) for t in inner))
+            else:
+                candidates = self.postings
+            matches = [word for word in candidates if query_word in word]
+        else:
+            candidates = set().union(*(self.word_trigrams.get(t, ()) for t in trigrams(query_word)))
+            matches = [word for word in candidates if similarity(query_word, word) >= FUZZY_THRESHOLD]
+        return {word: similarity(query_word, word) for word in matches if self.postings[word]}
+
+    def search(self, query, mode, filters, limit, offset):
+        """
+        Returns the total number of transactions matching every word of the query and, of those,
+        the (transaction_id, score) pairs of the requested page: best score first, then newest.
+        The score is the mean over the query words of the trigram similarity of the closest
+        matching word. In substring mode the whole query must also occur in the description or notes.
+        """
+        query_words = words(query)
+        if not query_words:
+            return 0, []
+        # Only the word lookups and copies of their postings need the lock, which refresh() holds
+        # while indexing; the scoring and filtering below run on the copies
+        with self._lock:
+            matches = [[(score, set(self.postings[word])) for word, score in self._matching_words(w, mode).items()]
+                       for w in query_words]
+            documents = self.documents
+
+        scores = None
+        for word_matches in matches:
+            word_scores = {}
+            for score, posting in word_matches:
+                for transaction_id in posting:
+                    if score > word_scores.get(transaction_id, -1):
+                        word_scores[transaction_id] = score
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {i: s + word_scores[i] for i, s in scores.items() if i in word_scores}
+            if not scores:
+                return 0, []
+
+        phrase = query.lower().strip() if mode == 'substring' else None
+        start = date.fromisoformat(filters['start_date']).toordinal() if filters.get('start_date') else None
+        end = date.fromisoformat(filters['end_date']).toordinal() if filters.get('end_date') else None
+        equals = [(name, filters[name]) for name in FILTER_COLUMNS if filters.get(name)]
+        ranked = []
+        for transaction_id, score in scores.items():
+            document = documents[transaction_id]
+            if (start is not None and document.day < start) or (end is not None and document.day > end) \
+                    or any(getattr(document, name) != value for name, value in equals) \
+                    or (phrase is not None and phrase not in document.text):
+                continue
+            ranked.append((-score, -document.day, -transaction_id))
+        page = [(-i, -s / len(query_words)) for s, _, i in heapq.nsmallest(offset + limit, ranked)[offset:]]
+        return len(ranked), page
+
+    def stats(self):
+        return {"documents": len(self.documents),
+                "words": len(self.postings),
+                "word_trigrams": len(self.word_trigrams),
+                "refreshes": self.refreshes,
+                "full_loads": self.full_loads,
+                "last_refresh": self.last_refresh}
+
+
+search_index = TextSearchIndex()
@@ -0,0 +1,234 @@
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import combinations
+
+from flask import current_app
+from sqlalchemy import Integer, String, cast, func, literal
+
+from app.db.models.models import DailySpendingRollupModel, TransactionModel, ROLLUP_NULL_KEY
+
+logger = logging.getLogger(__name__)
+
+DATE_BUCKETS = ['year', 'month', 'day', 'quarter']
+DIMENSIONS = ['category_level1', 'category_level2', 'source', 'type_name']
+STATISTICS_SOURCES = ['rollup', 'transactions', 'columnar']
+GROUPING_MODES = ['rollup', 'cube', 'none']
+
+
+def _to_number(value):
+    """Converts a SQL aggregate (Decimal, float, int or None) into a JSON friendly number."""
+    if value is None:
+        return None
+    return float(value)
+
+
+def _to_amount(value):
+    """
+    Like _to_number, for a sum of amounts: amounts have two decimals, so the float error a
+    floating point sum (SQLite, the columnar store) picks up is rounded away.
+    """
+    if value is None:
+        return None
+    return round(float(value), 2)
+
+
+def _sum_amounts(amounts):
+    """Adds up amounts as Decimals and converts the result once, so many group totals add up exactly."""
+    return float(sum((Decimal(str(amount)) for amount in amounts), Decimal(0)))
+
+
+def _date_bucket(session, column, by):
+    """
+    Returns a SQL expression truncating a date column to the first day of its 'by' bucket.
+    Postgres uses date_trunc, SQLite uses date() modifiers to get the same bucket start.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        return func.date_trunc(by, column)
+    if by == 'year':
+        return func.date(column, 'start of year')
+    if by == 'month':
+        return func.date(column, 'start of month')
+    if by == 'quarter':
+        months_into_quarter = (cast(func.strftime('%m', column), Integer) - 1) % 3
+        return func.date(column, 'start of month',
+                         literal('-') + cast(months_into_quarter, String) + literal(' months'))
+    return func.date(column)
+
+
+def _bucket_label(bucket, by):
+    """Formats a bucket start the same way the statistics_by_date endpoint always has."""
+    if isinstance(bucket, str):
+        bucket = date.fromisoformat(bucket[:10])
+    if by == 'year':
+        return str(bucket.year)
+    if by == 'month':
+        return f"{bucket.year}-{bucket.month}"
+    if by == 'quarter':
+        return f"{bucket.year}-{(bucket.month - 1) // 3 + 1}Q"
+    return bucket.strftime('%Y-%m-%d')
+
+
+def _statistics_source(source):
+    """
+    Describes where the statistics are read from: the raw 'transactions' table, or the
+    pre-aggregated daily 'rollup' table which is kept current by every transaction write.
+    """
+    if source == 'rollup':
+        rollup = DailySpendingRollupModel
+        return {"date": rollup.day,
+                "parse_date": lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+                "columns": rollup,
+                "dimension": lambda d: func.nullif(getattr(rollup, d), ROLLUP_NULL_KEY),
+                "measures": [func.sum(rollup.total_amount),
+                             func.sum(rollup.transaction_count),
+                             func.min(rollup.min_amount),
+                             func.max(rollup.max_amount)]}
+    if source == 'transactions':
+        return {"date": TransactionModel.transaction_date,
+                "parse_date": lambda value: datetime.strptime(value, '%Y-%m-%d'),
+                "columns": TransactionModel,
+                "dimension": lambda d: getattr(TransactionModel, d),
+                "measures": [func.sum(TransactionModel.amount),
+                             func.count(TransactionModel.amount),
+                             func.min(TransactionModel.amount),
+                             func.max(TransactionModel.amount)]}
+    raise ValueError(f"Unknown statistics source '{source}'. It can be one of {STATISTICS_SOURCES}.")
+
+
+def _dimension_column(session, stats_source, dimension, by=None):
+    """Maps a group-by dimension name onto the SQL expression it groups by."""
+    if dimension == 'date':
+        return _date_bucket(session, stats_source["date"], by)
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Unknown statistics dimension '{dimension}'. It can be one of {DIMENSIONS + ['date']}.")
+    return stats_source["dimension"](dimension)
+
+
+def _apply_filters(query, stats_source, start_date, end_date, category, type_name):
+    """Applies the filters shared by every statistics endpoint. Date bounds are exclusive YYYY-MM-DD strings."""
+    columns = stats_source["columns"]
+    if type_name:
+        query = query.filter(columns.type_name == type_name)
+    if start_date:
+        query = query.filter(stats_source["date"] > stats_source["parse_date"](start_date))
+    if end_date:
+        query = query.filter(stats_source["date"] < stats_source["parse_date"](end_date))
+    if category:
+        query = query.filter(columns.category_level2 == category)
+    return query
+
+
+def summarize(groups):
+    """Combines per-group aggregates into the total/count/max/min summary. Empty input yields zero totals."""
+    return {"total": _sum_amounts(g["total"] for g in groups),
+            "count": sum(g["count"] for g in groups),
+            "max": max((g["max"] for g in groups if g["max"] is not None), default=None),
+            "min": min((g["min"] for g in groups if g["min"] is not None), default=None)}
+
+
+def aggregate_query(session, dimensions, start_date=None, end_date=None, category=None, by=None,
+                    type_name="Sale", source=None):
+    """
+    Builds the GROUP BY query behind aggregate(): one row per group holding the dimension values
+    followed by the sum, count, min and max of the amounts.
+    """
+    stats_source = _statistics_source(source or current_app.config.get("STATISTICS_SOURCE", "transactions"))
+    keys = [_dimension_column(session, stats_source, d, by).label(d) for d in dimensions]
+    query = session.query(*keys, *stats_source["measures"])
+    query = _apply_filters(query, stats_source, start_date, end_date, category, type_name)
+    # NULLS LAST is Postgres' default; spelled out so SQLite orders the groups the same way
+    return query.group_by(*keys).order_by(*[key.asc().nulls_last() for key in keys])
+
+
+def aggregate(session, dimensions, start_date=None, end_date=None, category=None, by=None, type_name="Sale",
+              source=None):
+    """
+    Groups transactions by the given dimensions and computes sum, count, min and max in the database.
+    No ORM objects are loaded: one row per group is fetched and returned as a plain dict keyed by
+    dimension name, alongside the overall summary of all matching transactions.
+
+    Dimensions are any of DIMENSIONS, or 'date' combined with a 'by' bucket from DATE_BUCKETS.
+    The source defaults to the STATISTICS_SOURCE setting of the current app; 'columnar' answers
+    from this process's in-memory snapshot of the transactions instead of a GROUP BY.
+    """
+    source = source or current_app.config.get("STATISTICS_SOURCE", "transactions")
+    if source == 'columnar':
+        # Imported on first use so that NumPy is only loaded by workers serving the columnar source
+        from app.controller.columnar_store import columnar_store
+        query = columnar_store.refresh(session).group_by(dimensions, start_date, end_date, category, by, type_name)
+    else:
+        query = aggregate_query(session, dimensions, start_date, end_date, category, by, type_name, source)
+
+    width = len(dimensions)
+    groups = []
+    for row in query:
+        group = {d: row[i] for i, d in enumerate(dimensions)}
+        if 'date' in group:
+            group['date'] = _bucket_label(group['date'], by)
+        group.update({"total": _to_amount(row[width]),
+                      "count": row[width + 1],
+                      "min": _to_number(row[width + 2]),
+                      "max": _to_number(row[width + 3])})
+        groups.append(group)
+    return dict(summarize(groups), groups=groups)
+
+
+def aggregate_by_date(session, by, start_date=None, end_date=None):
+    """
+    Aggregates 'Sale' transactions into year, quarter, month or day buckets with a single GROUP BY.
+    Only one row per bucket leaves the database, so the cost follows the number of buckets
+    rather than the number of transactions.
+    """
+    return aggregate(session, ['date'], start_date, end_date, by=by)
+
+
+def grouping_sets(dimensions, mode):
+    """
+    Lists the dimension subsets to subtotal over, finest first. 'rollup' drops trailing dimensions
+    one at a time like GROUP BY ROLLUP, 'cube' takes every subset like GROUP BY CUBE and 'none'
+    only keeps the full grouping.
+    """
+    if mode == 'rollup':
+        return [tuple(dimensions[:n]) for n in range(len(dimensions), -1, -1)]
+    if mode == 'cube':
+        return [subset for n in range(len(dimensions), -1, -1) for subset in combinations(dimensions, n)]
+    if mode == 'none':
+        return [tuple(dimensions)]
+    raise ValueError(f"Unknown grouping '{mode}'. It can be one of {GROUPING_MODES}.")
+
+
+def pivot(session, dimensions, start_date=None, end_date=None, category=None, by=None, type_name="Sale",
+          grouping='rollup'):
+    """
+    Cross-tabulates transactions over any combination of dimensions, with subtotals for the
+    grouping sets of the given mode. Only the finest grouping is aggregated by the statistics
+    source; every coarser subtotal is merged from those groups, so the data is read once whatever
+    the number of grouping sets, on every source and dialect.
+
+    Each cell holds all dimensions, None for the ones rolled up, and 'grouping', the dimensions it
+    is grouped by. The summary is the grand total.
+    """
+    sets = grouping_sets(dimensions, grouping)
+    finest = aggregate(session, dimensions, start_date, end_date, category, by, type_name)["groups"]
+
+    cells = []
+    for grouped in sets:
+        merged = {}
+        for group in finest:
+            key = tuple(group[d] for d in grouped)
+            cell = merged.get(key)
+            if cell is None:
+                merged[key] = dict({d: group[d] if d in grouped else None for d in dimensions},
+                                   grouping=list(grouped), total=group["total"], count=group["count"],
+                                   min=group["min"], max=group["max"])
+                continue
+            cell["total"] += group["total"]
+            cell["count"] += group["count"]
+            cell["min"] = min(cell["min"], group["min"])
+            cell["max"] = max(cell["max"], group["max"])
+        for cell in merged.values():
+            # Amounts have two decimals; undo the float error of adding up many group totals
+            cell["total"] = _to_amount(cell["total"])
+        cells.extend(merged.values())
+    return dict(summarize(finest), cells=cells)
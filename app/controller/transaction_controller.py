@@ -1,16 +1,67 @@
+import base64
+import json
 import logging
-from datetime import datetime
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, update
 
 from app.constant.system_constants import SYSTEM_USER_NAME
-from app.db.models.models import TransactionModel
+from app.controller.change_controller import record_changes, record_transaction_changes
+from app.controller.lookup_cache import lookup_cache
+from app.controller.rollup_controller import refresh_rollup
+from app.controller.rule_controller import apply_rules
+from app.db.models.models import TransactionModel, TransactionCategoryModel, TransactionTypeModel, \
+    TransactionSourceModel
+from app.lib.data_version import CATEGORIES, TYPES, SOURCES
+from app.lib.fingerprint import transaction_fingerprint
 
 logger = logging.getLogger(__name__)
 
+BULK_INPUT_FIELDS = ['transaction_date', 'description', 'notes', 'category_level1', 'category_level2',
+                     'type_name', 'amount', 'source']
+# Bulk input fields that must be strings when given
+BULK_TEXT_FIELDS = ['description', 'notes', 'category_level1', 'category_level2', 'type_name', 'source']
+
+# Fields a filtered bulk update may set, and the filters selecting the rows of bulk updates and deletes
+BULK_UPDATE_FIELDS = ['description', 'notes', 'category_level1', 'category_level2', 'type_name', 'source']
+BULK_FILTER_FIELDS = ['start_date', 'end_date', 'description_like', 'source', 'category_level1',
+                      'category_level2', 'type_name']
+
+# Fields besides the fingerprinted ones that must also agree for an imported row to be a plain duplicate
+DEDUPE_COMPARED_FIELDS = ['notes', 'category_level1', 'category_level2', 'type_name']
+# Fingerprints per lookup statement, within the bound parameter limits of every supported database
+FINGERPRINT_LOOKUP_CHUNK = 10000
+
+BulkInsertResult = namedtuple('BulkInsertResult', ['transaction_ids', 'skipped', 'conflicts', 'matched_ids'],
+                              defaults=[()])
+
+PERIOD_DAYS = {
+    '1Mo': 30, '3Mo': 90, '6Mo': 180, '1Yr': 365, '3Yr': 1095, '5Yr': 1825
+}
+
+
+def parse_transaction_date(value):
+    """Parses a transaction date given in the API's MM/DD/YYYY format."""
+    return datetime.strptime(value, '%m/%d/%Y')
+
+
+def transactions_written(session, days, transaction_ids):
+    """
+    Bookkeeping shared by every write to the transactions table: refreshes the rollup of the
+    affected days, bumps the transactions version that cached responses and ETags depend on and
+    logs the written transaction IDs for the per-process snapshots.
+    """
+    refresh_rollup(session, days)
+    record_transaction_changes(session, transaction_ids)
+
 
 def add_transaction(session, transaction_data):
     """
     Creates a new transaction record from the given data and adds it to the session.
     It sanitizes foreign key fields by converting empty strings to None.
+    Returns the new, not yet flushed, TransactionModel.
     """
     # Sanitize foreign key fields to ensure empty strings become NULL in the database
     category_level1 = transaction_data.get('category_level1') or None
@@ -21,7 +72,7 @@ def add_transaction(session, transaction_data):
     # Create the new transaction
     logger.info(f"Adding transaction to session: {transaction_data.get('description')}")
     new_trans = TransactionModel(
-        transaction_date=datetime.strptime(transaction_data['transaction_date'], '%m/%d/%Y'),
+        transaction_date=parse_transaction_date(transaction_data['transaction_date']),
         description=transaction_data.get('description'),
         notes=transaction_data.get('notes'),
         category_level1=category_level1,
@@ -34,4 +85,314 @@ def add_transaction(session, transaction_data):
         modified_at=datetime.now(),
         modified_by=SYSTEM_USER_NAME
     )
-    session.add(new_trans)
\ No newline at end of file
+    session.add(new_trans)
+    return new_trans
+
+
+def ensure_lookup_values(session, transaction_data):
+    """
+    Adds to the session every category, type and source referenced by the given transactions
+    that does not exist yet, so the foreign keys of the new transactions resolve. Existing values
+    come from the per-process lookup cache, so only genuinely new values touch these tables.
+    """
+    # 1. Collect all unique, non-empty foreign key values from the payload
+    categories = set(d.get('category_level1') for d in transaction_data if d.get('category_level1'))
+    categories.update(d.get('category_level2') for d in transaction_data if d.get('category_level2'))
+    types = set(d.get('type_name') for d in transaction_data if d.get('type_name'))
+    sources = set(d.get('source') for d in transaction_data if d.get('source'))
+
+    # 2. Find which ones already exist, from this worker's copy of the lookup tables
+    existing = lookup_cache.keys(session)
+    existing_categories, existing_types, existing_sources = existing[CATEGORIES], existing[TYPES], existing[SOURCES]
+
+    # 3. Determine which ones are new and add them to the session
+    new_categories = [TransactionCategoryModel(category=c) for c in categories if c not in existing_categories]
+    new_types = [TransactionTypeModel(type_name=t) for t in types if t not in existing_types]
+    new_sources = [TransactionSourceModel(source=s) for s in sources if s not in existing_sources]
+
+    if new_categories:
+        logger.info(f"Creating new categories: {[c.category for c in new_categories]}")
+        session.add_all(new_categories)
+        record_changes(session, CATEGORIES)
+    if new_types:
+        logger.info(f"Creating new types: {[t.type_name for t in new_types]}")
+        session.add_all(new_types)
+        record_changes(session, TYPES)
+    if new_sources:
+        logger.info(f"Creating new sources: {[s.source for s in new_sources]}")
+        session.add_all(new_sources)
+        record_changes(session, SOURCES)
+
+
+def prepare_bulk_rows(transaction_data, date_format='%m/%d/%Y'):
+    """
+    Validates and converts a list of transaction payloads into insert-ready rows in one vectorized
+    pass: dates are parsed and amounts coerced column-wise, and empty foreign keys become NULL.
+    Returns the rows of the valid payloads and the positions of the ones with an invalid or
+    missing date or amount, or a text field that is not a string.
+    """
+    # pandas takes most of a second to import, so only bulk writes pay for it
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(transaction_data, columns=BULK_INPUT_FIELDS)
+    dates = pd.to_datetime(frame['transaction_date'], format=date_format, errors='coerce')
+    amounts = pd.to_numeric(frame['amount'], errors='coerce')
+    valid = dates.notna() & amounts.notna()
+    for name in BULK_TEXT_FIELDS:
+        valid &= frame[name].isna() | frame[name].map(lambda value: isinstance(value, str)).astype(bool)
+    invalid = frame.index[~valid].tolist()
+    if invalid:
+        frame, dates, amounts = frame[valid], dates[valid], amounts[valid]
+
+    columns = {'transaction_date': dates.values.astype('datetime64[us]').tolist(),
+               'amount': amounts.round(2).tolist()}
+    for name in BULK_TEXT_FIELDS:
+        values = frame[name].astype(object)
+        columns[name] = values.where(values.notna() & (values != ''), None).tolist()
+
+    now = datetime.now()
+    audit = {'created_at': now, 'created_by': SYSTEM_USER_NAME, 'modified_at': now, 'modified_by': SYSTEM_USER_NAME}
+    return [dict(zip(columns, values), **audit) for values in zip(*columns.values())], invalid
+
+
+def deduplicate_rows(session, rows, claimed=frozenset(), matched=None):
+    """
+    Separates the rows (dicts with a 'fingerprint') that are already stored from the new ones, with
+    one indexed lookup of all the batch's fingerprints. Fingerprints are matched as multisets: each
+    stored transaction absorbs at most one row of the batch, so a statement listing the same
+    purchase twice inserts both the first time and neither when imported again. An absorbed row
+    that also agrees on DEDUPE_COMPARED_FIELDS is skipped; one that disagrees is a conflict and is
+    not inserted either.
+    A batch split into several calls gets the same result as one call when every call passes as
+    'claimed' the IDs of the stored transactions the earlier calls matched (collected in 'matched')
+    or inserted; those absorb no further row.
+    Returns the new rows, the number of skipped rows and one (row index, stored transaction ID)
+    pair per conflict.
+    """
+    fingerprints = sorted({row['fingerprint'] for row in rows})
+    columns = [TransactionModel.fingerprint, TransactionModel.transaction_id,
+               *[getattr(TransactionModel, name) for name in DEDUPE_COMPARED_FIELDS]]
+    stored = {}
+    for i in range(0, len(fingerprints), FINGERPRINT_LOOKUP_CHUNK):
+        chunk = fingerprints[i:i + FINGERPRINT_LOOKUP_CHUNK]
+        for fingerprint, transaction_id, *values in session.execute(
+                select(*columns).where(TransactionModel.fingerprint.in_(chunk))
+                .order_by(TransactionModel.transaction_id)):
+            if transaction_id not in claimed:
+                stored.setdefault(fingerprint, []).append((transaction_id, tuple(values)))
+
+    new_rows, skipped, conflicts = [], 0, []
+    for index, row in enumerate(rows):
+        candidates = stored.get(row['fingerprint'])
+        if not candidates:
+            new_rows.append(row)
+            continue
+        values = tuple(row.get(name) or None for name in DEDUPE_COMPARED_FIELDS)
+        same = next((i for i, (_, stored_values) in enumerate(candidates) if stored_values == values), None)
+        if same is not None:
+            transaction_id = candidates.pop(same)[0]
+            skipped += 1
+        else:
+            transaction_id = candidates.pop(0)[0]
+            conflicts.append((index, transaction_id))
+        if matched is not None:
+            matched.append(transaction_id)
+    return new_rows, skipped, conflicts
+
+
+def insert_bulk_rows(session, rows, dedupe=False, claimed=frozenset()):
+    """
+    Inserts rows built by prepare_bulk_rows with multi-row INSERT ... RETURNING statements instead of
+    one ORM object per row, categorizing uncategorized rows with the categorization rules, creating
+    missing lookup values and refreshing the rollup of the affected days. With dedupe the rows
+    already stored are left out as described in deduplicate_rows, which gets 'claimed'.
+    Returns a BulkInsertResult with the generated transaction IDs in ascending order and the IDs of
+    the stored transactions deduplicated rows matched.
+    """
+    if not rows:
+        return BulkInsertResult([], 0, [])
+    started = time.perf_counter()
+    for row in rows:
+        row['fingerprint'] = transaction_fingerprint(row['transaction_date'], row['amount'], row['description'],
+                                                     row['source'])
+    apply_rules(session, rows)
+    skipped, conflicts, matched_ids = 0, [], []
+    if dedupe:
+        rows, skipped, conflicts = deduplicate_rows(session, rows, claimed, matched_ids)
+    transaction_ids = []
+    if rows:
+        ensure_lookup_values(session, rows)
+        session.flush()
+        statement = insert(TransactionModel.__table__).returning(TransactionModel.transaction_id)
+        transaction_ids = sorted(session.execute(statement, rows).scalars())
+        transactions_written(session, {row['transaction_date'] for row in rows}, transaction_ids)
+
+    elapsed = time.perf_counter() - started
+    total = len(rows) + skipped + len(conflicts)
+    logger.info(f"Bulk inserted {len(rows)} of {total} transaction(s) in {elapsed:.3f}s "
+                f"({total / elapsed:.0f} rows/s)" + (f", {skipped} duplicate(s) skipped and "
+                                                     f"{len(conflicts)} conflict(s)" if dedupe else ""))
+    return BulkInsertResult(transaction_ids, skipped, conflicts, matched_ids)
+
+
+def bulk_add_transactions(session, transaction_data, dedupe=False):
+    """
+    Validates and inserts a batch of transaction payloads as a whole, leaving out the ones already
+    stored with dedupe. Raises ValueError listing the offending row positions, without inserting
+    anything, when any date, amount or text field is invalid. Returns a BulkInsertResult.
+    """
+    rows, invalid = prepare_bulk_rows(transaction_data)
+    if invalid:
+        raise ValueError(f"Invalid or missing transaction_date (MM/DD/YYYY) or amount, or a text field "
+                         f"that is not a string, in row(s) {invalid[:20]}"
+                         + (f" and {len(invalid) - 20} more" if len(invalid) > 20 else ""))
+    return insert_bulk_rows(session, rows, dedupe)
+
+
+def transaction_filter(filters):
+    """
+    Translates bulk operation filters into SQL conditions: start_date and end_date (YYYY-MM-DD,
+    both days included), description_like (a case-insensitive LIKE pattern, % and _ wildcards)
+    and exact source, category_level1, category_level2 and type_name values. Raises ValueError on
+    unknown or missing filters, so that a bulk operation never applies to the whole table by accident.
+    """
+    unknown = set(filters) - set(BULK_FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown filter(s) {sorted(unknown)}. They can be {BULK_FILTER_FIELDS}.")
+    filters = {k: v for k, v in filters.items() if v not in (None, '')}
+    if not filters:
+        raise ValueError(f"At least one filter of {BULK_FILTER_FIELDS} is required.")
+    conditions = []
+    try:
+        if 'start_date' in filters:
+            conditions.append(TransactionModel.transaction_date >= datetime.strptime(filters['start_date'], '%Y-%m-%d'))
+        if 'end_date' in filters:
+            end = datetime.strptime(filters['end_date'], '%Y-%m-%d') + timedelta(days=1)
+            conditions.append(TransactionModel.transaction_date < end)
+    except ValueError as e:
+        raise ValueError(f"Invalid date filter, expected YYYY-MM-DD: {e}") from e
+    if 'description_like' in filters:
+        conditions.append(TransactionModel.description.ilike(filters['description_like']))
+    for name in ['source', 'category_level1', 'category_level2', 'type_name']:
+        if name in filters:
+            conditions.append(getattr(TransactionModel, name) == filters[name])
+    return conditions
+
+
+def _count_matching(session, conditions):
+    return session.execute(select(func.count(TransactionModel.transaction_id)).where(*conditions)).scalar()
+
+
+def bulk_update_transactions(session, filters, changes, dry_run=False):
+    """
+    Applies the same field changes to every transaction matching the filters with a single
+    UPDATE ... RETURNING, stamping modified_at/modified_by, then refreshes the rollup of the days
+    the rows fall on and, when the description or source changed, the rows' fingerprints. With
+    dry_run only the matching rows are counted. Returns the number of rows matched and, unless
+    dry_run, their IDs.
+    """
+    conditions = transaction_filter(filters)
+    unknown = set(changes) - set(BULK_UPDATE_FIELDS)
+    if not changes or unknown:
+        raise ValueError(f"'changes' must set one or more of {BULK_UPDATE_FIELDS}.")
+    if dry_run:
+        return {'matched': _count_matching(session, conditions), 'dry_run': True}
+
+    changes = {k: v if v != '' else None for k, v in changes.items()}
+    ensure_lookup_values(session, [changes])
+    session.flush()
+    started = time.perf_counter()
+    statement = (update(TransactionModel).where(*conditions)
+                 .values(**changes, modified_at=datetime.now(), modified_by=SYSTEM_USER_NAME)
+                 .returning(TransactionModel.transaction_id, TransactionModel.transaction_date,
+                            TransactionModel.amount, TransactionModel.description, TransactionModel.source)
+                 .execution_options(synchronize_session=False))
+    rows = session.execute(statement).all()
+    if rows and {'description', 'source'} & set(changes):
+        _refresh_fingerprints(session, rows)
+    if rows:
+        transactions_written(session, {row.transaction_date for row in rows}, [row.transaction_id for row in rows])
+    logger.info(f"Bulk updated {len(rows)} transaction(s) in {time.perf_counter() - started:.3f}s")
+    return {'matched': len(rows), 'dry_run': False, 'transaction_ids': sorted(row.transaction_id for row in rows)}
+
+
+def _refresh_fingerprints(session, rows):
+    """Stores the fingerprints of (transaction_id, transaction_date, amount, description, source) rows at once."""
+    session.execute(update(TransactionModel.__table__)
+                    .where(TransactionModel.transaction_id == bindparam('b_transaction_id'))
+                    .values(fingerprint=bindparam('b_fingerprint')),
+                    [{'b_transaction_id': transaction_id, 'b_fingerprint': transaction_fingerprint(*values)}
+                     for transaction_id, *values in rows])
+
+
+def bulk_delete_transactions(session, filters, dry_run=False):
+    """
+    Deletes every transaction matching the filters with a single DELETE ... RETURNING and refreshes
+    the rollup of their days. With dry_run only the matching rows are counted.
+    """
+    conditions = transaction_filter(filters)
+    if dry_run:
+        return {'matched': _count_matching(session, conditions), 'dry_run': True}
+
+    started = time.perf_counter()
+    statement = (delete(TransactionModel).where(*conditions)
+                 .returning(TransactionModel.transaction_id, TransactionModel.transaction_date)
+                 .execution_options(synchronize_session=False))
+    rows = session.execute(statement).all()
+    if rows:
+        transactions_written(session, {transaction_date for _, transaction_date in rows}, [i for i, _ in rows])
+    logger.info(f"Bulk deleted {len(rows)} transaction(s) in {time.perf_counter() - started:.3f}s")
+    return {'matched': len(rows), 'dry_run': False, 'transaction_ids': sorted(i for i, _ in rows)}
+
+
+def period_start(period):
+    """
+    The start of the given period ('1Mo', '3Mo', '1Yr', ...): midnight of the first of its last
+    PERIOD_DAYS days, today included. None for 'All' and unknown periods.
+    """
+    days = PERIOD_DAYS.get(period)
+    if not days:
+        return None
+    return datetime.combine(date.today() - timedelta(days=days - 1), datetime.min.time())
+
+
+def filter_by_period(query, period):
+    """Restricts a transaction query to the given period ('1Mo', '3Mo', '1Yr', ...). Unknown periods mean 'All'."""
+    start_date = period_start(period)
+    if start_date:
+        query = query.filter(TransactionModel.transaction_date >= start_date)
+    return query
+
+
+def encode_cursor(transaction_date, transaction_id):
+    """Builds the opaque pagination cursor pointing just after the given (transaction_date, transaction_id)."""
+    position = json.dumps([transaction_date.isoformat(), transaction_id])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Reverses encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        transaction_date, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(transaction_date), int(transaction_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor '{cursor}'") from e
+
+
+def keyset_page(query, limit, cursor=None):
+    """
+    Returns one page of transactions ordered by (transaction_date, transaction_id) descending, and
+    the cursor of the next page or None. Pages are located with a keyset predicate rather than an
+    OFFSET, so fetching a page costs the same no matter how deep into the history it is.
+    """
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        query = query.filter(or_(TransactionModel.transaction_date < after_date,
+                                 and_(TransactionModel.transaction_date == after_date,
+                                      TransactionModel.transaction_id < after_id)))
+    rows = query.order_by(TransactionModel.transaction_date.desc(),
+                          TransactionModel.transaction_id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.transaction_date, last.transaction_id)
@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+
+from app.controller.change_controller import table_versions, transaction_changes
+from app.db.models.models import TransactionModel
+from app.lib.data_version import TRANSACTIONS
+
+logger = logging.getLogger(__name__)
+
+FETCH_BATCH_SIZE = 10000
+
+
+class TransactionSnapshot:
+    """
+    Base of the per-process copies of the transactions table, kept current from the transaction
+    change log.
+
+    refresh() first compares the transactions write counter: while it is unchanged no rows are
+    read. Otherwise the transactions the change log lists for the versions in between are read
+    again, and the ones no longer found are removed. When the log cannot account for every version
+    (written by a maintenance script, or pruned) everything is reloaded.
+
+    Subclasses name the TransactionModel columns they keep, after transaction_id, in COLUMNS, and
+    implement _reset(), _upsert(rows) and _remove(transaction_ids).
+    """
+    NAME = 'Transaction snapshot'
+    COLUMNS = []
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        self.version = None
+        self.refreshes = 0
+        self.full_loads = 0
+        self.last_refresh = None
+
+    def refresh(self, session):
+        """Brings the snapshot up to date with the committed transactions and returns it."""
+        version = table_versions(session, [TRANSACTIONS])
+        if version == self.version:
+            return self
+        with self._lock:
+            if version != self.version:
+                self._refresh(session, version)
+        return self
+
+    def _refresh(self, session, version):
+        started = time.perf_counter()
+        changed = transaction_changes(session, None if self.version is None else self.version[0], version[0])
+        full = changed is None
+        if full:
+            self._reset()
+            fetched = self._fetch(session)
+        else:
+            found = set()
+            fetched = self._fetch(session, changed, found)
+            if changed - found:
+                self._remove(changed - found)
+        self.version = version
+        self.refreshes += 1
+        self.full_loads += full
+        self.last_refresh = {"full": full,
+                             "rows_fetched": fetched,
+                             "seconds": round(time.perf_counter() - started, 6)}
+        logger.info("%s %s refresh: %d rows fetched in %.3fs", self.NAME, "full" if full else "incremental",
+                    fetched, self.last_refresh["seconds"])
+
+    def _fetch(self, session, transaction_ids=None, found=None):
+        """
+        Upserts the given transactions (all of them for None), adding the IDs read to found, and
+        returns the row count.
+        """
+        model = TransactionModel
+        query = session.query(model.transaction_id, *[getattr(model, name) for name in self.COLUMNS])
+        if transaction_ids is None:
+            queries = [query]
+        else:
+            ids = sorted(transaction_ids)
+            queries = [query.filter(model.transaction_id.in_(ids[i:i + FETCH_BATCH_SIZE]))
+                       for i in range(0, len(ids), FETCH_BATCH_SIZE)]
+        fetched = 0
+        for statement in queries:
+            result = session.execute(statement.statement.execution_options(yield_per=FETCH_BATCH_SIZE))
+            for batch in result.partitions():
+                self._upsert(batch)
+                if found is not None:
+                    found.update(row[0] for row in batch)
+                fetched += len(batch)
+        return fetched
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _upsert(self, rows):
+        raise NotImplementedError
+
+    def _remove(self, transaction_ids):
+        raise NotImplementedError
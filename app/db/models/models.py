@@ -1,5 +1,8 @@
+from sqlalchemy import DDL, event
+
 from app.extension import db
 from app.lib.datetime_utils import dump_date, dump_datetime
+from app.lib.fingerprint import transaction_fingerprint
 
 
 class TransactionCategoryModel(db.Model):
@@ -15,6 +18,11 @@ class TransactionSourceModel(db.Model):
     source = db.Column(db.String(50), primary_key=True, nullable=False, unique=True)
     description = db.Column(db.String(200), nullable=True)
 
+    @property
+    def serialize(self):
+        """Return object data in easily serializable format"""
+        return {'source': self.source, 'description': self.description}
+
 
 class TransactionTypeModel(db.Model):
     __tablename__ = 'type_name'
@@ -22,10 +30,31 @@ class TransactionTypeModel(db.Model):
     type_name = db.Column(db.String(50), primary_key=True, nullable=False, unique=True)
     description = db.Column(db.String(200), nullable=True)
 
+    @property
+    def serialize(self):
+        """Return object data in easily serializable format"""
+        return {'type_name': self.type_name, 'description': self.description}
+
 
 class TransactionModel(db.Model):
     __tablename__ = 'transactions'
-    __table_args__ = {"schema": "public"}
+    __table_args__ = (
+        # Statistics filter on type_name and a date range and only read the amount
+        db.Index('ix_transactions_type_name_date', 'type_name', 'transaction_date', postgresql_include=['amount']),
+        # Transaction lists and keyset pages are ordered by (transaction_date, transaction_id)
+        db.Index('ix_transactions_date_id', 'transaction_date', 'transaction_id'),
+        db.Index('ix_transactions_category_level1', 'category_level1'),
+        db.Index('ix_transactions_category_level2', 'category_level2'),
+        db.Index('ix_transactions_source', 'source'),
+        # Duplicate detection of imports looks up a batch of fingerprints at once
+        db.Index('ix_transactions_fingerprint', 'fingerprint'),
+        # Text search: pg_trgm indexes serve ILIKE, word-start regex and word_similarity (<%) matches
+        db.Index('ix_transactions_description_trgm', 'description', postgresql_using='gin',
+                 postgresql_ops={'description': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_transactions_notes_trgm', 'notes', postgresql_using='gin',
+                 postgresql_ops={'notes': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        {"schema": "public"},
+    )
     transaction_id = db.Column(db.Integer, primary_key=True, nullable=False, autoincrement=True)
     transaction_date = db.Column(db.DateTime, nullable=False)
     description = db.Column(db.String(200), nullable=True)
@@ -35,6 +64,8 @@ class TransactionModel(db.Model):
     type_name = db.Column(db.String(50), db.ForeignKey('public.type_name.type_name'), nullable=True)
     amount = db.Column(db.Numeric(10, 2), nullable=False)
     source = db.Column(db.String(50), db.ForeignKey('public.source.source'), nullable=True)
+    # transaction_fingerprint() of the date, amount, description and source
+    fingerprint = db.Column(db.String(32), nullable=True)
 
     category1_rel = db.relationship('TransactionCategoryModel', foreign_keys=[category_level1], backref='transactions_level1')
     category2_rel = db.relationship('TransactionCategoryModel', foreign_keys=[category_level2], backref='transactions_level2')
@@ -74,3 +105,116 @@ class TransactionModel(db.Model):
             'modified_at': dump_datetime(self.modified_at),
             'modified_by': self.modified_by
         }
+
+
+def _set_fingerprint(mapper, connection, target):
+    target.fingerprint = transaction_fingerprint(target.transaction_date, target.amount, target.description,
+                                                 target.source)
+
+
+# Transactions written through the ORM keep their fingerprint current; Core statements set it themselves
+event.listen(TransactionModel, 'before_insert', _set_fingerprint)
+event.listen(TransactionModel, 'before_update', _set_fingerprint)
+
+# The trigram indexes of the transactions table need the pg_trgm extension
+event.listen(TransactionModel.__table__, 'before_create',
+             DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+
+RULE_MATCH_TYPES = ['substring', 'regex']
+
+
+class CategorizationRuleModel(db.Model):
+    """
+    Assigns categories to transactions whose description contains a substring or matches a regex
+    (case-insensitively), optionally restricted to an amount range and a source. Lower priorities
+    are tried first; the first rule whose every condition holds wins.
+    """
+    __tablename__ = 'categorization_rule'
+    __table_args__ = {"schema": "public"}
+    rule_id = db.Column(db.Integer, primary_key=True, nullable=False, autoincrement=True)
+    priority = db.Column(db.Integer, nullable=False, default=100)
+    description_pattern = db.Column(db.String(200), nullable=True)
+    match_type = db.Column(db.String(10), nullable=False, default='substring')
+    min_amount = db.Column(db.Numeric(10, 2), nullable=True)
+    max_amount = db.Column(db.Numeric(10, 2), nullable=True)
+    source = db.Column(db.String(50), db.ForeignKey('public.source.source'), nullable=True)
+    category_level1 = db.Column(db.String(50), db.ForeignKey('public.category.category'), nullable=True)
+    category_level2 = db.Column(db.String(50), db.ForeignKey('public.category.category'), nullable=True)
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    created_by = db.Column(db.String(50), nullable=False)
+    modified_at = db.Column(db.DateTime, nullable=False)
+    modified_by = db.Column(db.String(50), nullable=False)
+
+    def __repr__(self):
+        return f"<CategorizationRuleModel(rule_id={self.rule_id}, description_pattern='{self.description_pattern}')>"
+
+    @property
+    def serialize(self):
+        """Return object data in easily serializable format"""
+        return {
+            'rule_id': self.rule_id,
+            'priority': self.priority,
+            'description_pattern': self.description_pattern,
+            'match_type': self.match_type,
+            'min_amount': self.min_amount,
+            'max_amount': self.max_amount,
+            'source': self.source,
+            'category_level1': self.category_level1,
+            'category_level2': self.category_level2,
+            'enabled': self.enabled,
+            'modified_at': dump_datetime(self.modified_at),
+            'modified_by': self.modified_by
+        }
+
+
+ROLLUP_NULL_KEY = ''
+
+
+class DailySpendingRollupModel(db.Model):
+    """
+    Pre-aggregated transaction totals per day and (type, category, source) combination.
+    NULL keys are stored as ROLLUP_NULL_KEY so that they can be part of the primary key.
+    """
+    __tablename__ = 'daily_spending_rollup'
+    __table_args__ = {"schema": "public"}
+    day = db.Column(db.Date, primary_key=True, nullable=False)
+    type_name = db.Column(db.String(50), primary_key=True, nullable=False)
+    category_level1 = db.Column(db.String(50), primary_key=True, nullable=False)
+    category_level2 = db.Column(db.String(50), primary_key=True, nullable=False)
+    source = db.Column(db.String(50), primary_key=True, nullable=False)
+    total_amount = db.Column(db.Numeric(14, 2), nullable=False)
+    transaction_count = db.Column(db.Integer, nullable=False)
+    min_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    max_amount = db.Column(db.Numeric(10, 2), nullable=False)
+
+    def __repr__(self):
+        return f"<DailySpendingRollupModel(day={self.day}, type_name='{self.type_name}', source='{self.source}')>"
+
+
+class TableVersionModel(db.Model):
+    """Write counter per table, bumped in the same DB transaction as every write to that table."""
+    __tablename__ = 'table_version'
+    __table_args__ = {"schema": "public"}
+    table_name = db.Column(db.String(50), primary_key=True, nullable=False)
+    version = db.Column(db.BigInteger, nullable=False)
+    modified_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<TableVersionModel(table_name='{self.table_name}', version={self.version})>"
+
+
+class TransactionChangeModel(db.Model):
+    """
+    The transactions each version of the transactions write counter wrote, inserted in the same DB
+    transaction as the counter bump; a NULL transaction_id marks a version that wrote no row.
+    """
+    __tablename__ = 'transaction_change'
+    __table_args__ = {"schema": "public"}
+    change_id = db.Column(db.Integer, primary_key=True, nullable=False, autoincrement=True)
+    version = db.Column(db.BigInteger, nullable=False, index=True)
+    transaction_id = db.Column(db.Integer, nullable=True)
+
+    def __repr__(self):
+        return f"<TransactionChangeModel(version={self.version}, transaction_id={self.transaction_id})>"
@@ -0,0 +1,284 @@
+"""
+Declarative range partitioning of the transactions table by transaction_date (Postgres only).
+
+Every read endpoint bounds its query by transaction_date, so once the table is partitioned by year
+or month the planner only scans the partitions overlapping the requested period. The functions
+here take a SQLAlchemy connection or engine and are driven by app/scripts/manage_db.py:
+
+    convert_to_partitioned    rebuild the table as a partitioned one, in one DB transaction
+    create_future_partitions  add the partitions of the coming years or months (idempotent, for cron)
+    detach_partitions         detach partitions older than a date for archival, without long locks
+
+Rows whose date falls outside every range partition land in the DEFAULT partition; creating the
+partition for their range later moves them there. A table converted without the DEFAULT partition
+rejects such rows instead, but lets detach_partitions detach concurrently.
+"""
+import re
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import AddConstraint
+
+from app.db.models.models import TransactionModel
+
+PARTITION_INTERVALS = ['year', 'month']
+# Partitions kept ahead of the current year or month by create_future_partitions
+PARTITIONS_AHEAD = {'year': 1, 'month': 3}
+UNPARTITIONED_SUFFIX = '_unpartitioned'
+
+# DDL on the parent waits at most this long for its lock and is retried, so that it never queues
+# the endpoints behind it for long
+LOCK_TIMEOUT = '2s'
+LOCK_ATTEMPTS = 30
+LOCK_RETRY_SECONDS = 1
+
+TABLE = TransactionModel.__table__
+QUALIFIED_TABLE = f"{TABLE.schema}.{TABLE.name}"
+DEFAULT_PARTITION = f"{TABLE.name}_default"
+
+# SQLSTATE of lock_not_available, raised when lock_timeout expires
+_LOCK_NOT_AVAILABLE = '55P03'
+_RANGE_BOUND = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+Partition = namedtuple('Partition', ['name', 'start', 'end'])
+
+
+def interval_start(value, interval):
+    """The first instant of the year or month containing value."""
+    return datetime(value.year, 1 if interval == 'year' else value.month, 1)
+
+
+def next_start(start, interval):
+    """The first instant of the year or month after the one starting at start."""
+    if interval == 'year':
+        return datetime(start.year + 1, 1, 1)
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def partition_name(start, interval):
+    return f"{TABLE.name}_y{start:%Y}" if interval == 'year' else f"{TABLE.name}_m{start:%Y_%m}"
+
+
+def _bound(value):
+    return f"'{value:%Y-%m-%d %H:%M:%S}'"
+
+
+def _table_exists(connection, name):
+    return connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"),
+                              {'name': f"{TABLE.schema}.{name}"}).scalar()
+
+
+def is_partitioned(connection):
+    return connection.execute(text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                                   "WHERE partrelid = to_regclass(:name))"), {'name': QUALIFIED_TABLE}).scalar()
+
+
+def partitions(connection):
+    """
+    The partitions of the transactions table in ascending date order, as Partition tuples.
+    The DEFAULT partition comes last, with None bounds.
+    """
+    rows = connection.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:name)"""), {'name': QUALIFIED_TABLE})
+    ranges, default = [], []
+    for name, bound in rows:
+        match = _RANGE_BOUND.search(bound)
+        if match:
+            ranges.append(Partition(name, *(datetime.fromisoformat(v) for v in match.groups())))
+        else:
+            default.append(Partition(name, None, None))
+    return sorted(ranges, key=lambda p: p.start) + default
+
+
+def partition_interval(existing):
+    """Whether the range partitions are yearly or monthly, judged by the first one."""
+    first = next((p for p in existing if p.start is not None), None)
+    if first is None:
+        raise ValueError(f"{QUALIFIED_TABLE} has no range partitions.")
+    return 'year' if (first.end - first.start).days > 31 else 'month'
+
+
+def _lock_with_retries(connection, statement, attempts=LOCK_ATTEMPTS):
+    """
+    Runs a DDL statement in its own DB transaction with lock_timeout set, retrying when the lock
+    could not be taken in time. A waiting ALTER TABLE blocks every query queued behind it, so it
+    is better to give up quickly and try again than to wait out a long-running reader.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            with connection.begin():
+                connection.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+                statement(connection)
+            return attempt
+        except OperationalError as e:
+            if getattr(e.orig, 'sqlstate', None) != _LOCK_NOT_AVAILABLE or attempt == attempts:
+                raise
+            time.sleep(LOCK_RETRY_SECONDS)
+
+
+def _create_range_partition(connection, start, end, interval):
+    """
+    Adds the partition [start, end). Rows of that range sitting in the DEFAULT partition are moved
+    into the new table first, and a CHECK constraint matching the bounds lets ATTACH PARTITION skip
+    its validation scan, so the parent is only locked for the catalog update.
+    """
+    name = partition_name(start, interval)
+    bounds = f"FROM ({_bound(start)}) TO ({_bound(end)})"
+
+    def attach(c):
+        c.execute(text(f"CREATE TABLE {TABLE.schema}.{name} "
+                       f"(LIKE {QUALIFIED_TABLE} INCLUDING DEFAULTS INCLUDING STORAGE)"))
+        c.execute(text(f"ALTER TABLE {TABLE.schema}.{name} ADD CONSTRAINT {name}_bounds "
+                       f"CHECK (transaction_date >= {_bound(start)} AND transaction_date < {_bound(end)})"))
+        if _table_exists(c, DEFAULT_PARTITION):
+            c.execute(text(f"""
+                WITH moved AS (
+                    DELETE FROM {TABLE.schema}.{DEFAULT_PARTITION}
+                    WHERE transaction_date >= {_bound(start)} AND transaction_date < {_bound(end)}
+                    RETURNING *)
+                INSERT INTO {TABLE.schema}.{name} SELECT * FROM moved"""))
+        c.execute(text(f"ALTER TABLE {QUALIFIED_TABLE} ATTACH PARTITION {TABLE.schema}.{name} FOR VALUES {bounds}"))
+        c.execute(text(f"ALTER TABLE {TABLE.schema}.{name} DROP CONSTRAINT {name}_bounds"))
+
+    _lock_with_retries(connection, attach)
+    return name
+
+
+def _partition_starts(first, last, interval):
+    start = interval_start(first, interval)
+    while start <= last:
+        yield start
+        start = next_start(start, interval)
+
+
+def convert_to_partitioned(connection, interval='year', ahead=None, default=True):
+    """
+    Rebuilds the transactions table as a table partitioned by range of transaction_date, with one
+    partition per year or month from the oldest transaction up to 'ahead' intervals past the
+    current one, plus a DEFAULT partition unless 'default' is false. Without it, inserting a
+    transaction dated outside every partition fails.
+
+    Runs in one DB transaction holding an exclusive lock on the table: the old table is renamed to
+    transactions_unpartitioned (its indexes get the same suffix), the new one created LIKE it and
+    the rows copied over. The ID sequence moves to the new table. The primary key becomes
+    (transaction_id, transaction_date), since Postgres requires the partition key in every unique
+    constraint. The old table is kept for verification and must be dropped by hand.
+    Returns the names of the partitions created.
+    """
+    if interval not in PARTITION_INTERVALS:
+        raise ValueError(f"'interval' can be one of {PARTITION_INTERVALS}.")
+    ahead = PARTITIONS_AHEAD[interval] if ahead is None else ahead
+    old = f"{TABLE.name}{UNPARTITIONED_SUFFIX}"
+    with connection.begin():
+        if is_partitioned(connection):
+            raise ValueError(f"{QUALIFIED_TABLE} is already partitioned.")
+        if _table_exists(connection, old):
+            raise ValueError(f"{TABLE.schema}.{old} exists; drop it before converting again.")
+        connection.execute(text(f"LOCK TABLE {QUALIFIED_TABLE} IN ACCESS EXCLUSIVE MODE"))
+        sequence = connection.execute(text("SELECT pg_get_serial_sequence(:name, 'transaction_id')"),
+                                      {'name': QUALIFIED_TABLE}).scalar()
+        first, last = connection.execute(text(f"SELECT min(transaction_date), max(transaction_date) "
+                                               f"FROM {QUALIFIED_TABLE}")).one()
+
+        # Index and primary key names are unique per schema, so the old ones make way for the new
+        connection.execute(text(f"ALTER TABLE {QUALIFIED_TABLE} RENAME TO {old}"))
+        for index, in connection.execute(text("SELECT indexname FROM pg_indexes "
+                                              "WHERE schemaname = :schema AND tablename = :table"),
+                                         {'schema': TABLE.schema, 'table': old}).all():
+            renamed = f"{index[:63 - len(UNPARTITIONED_SUFFIX)]}{UNPARTITIONED_SUFFIX}"
+            connection.execute(text(f'ALTER INDEX {TABLE.schema}."{index}" RENAME TO "{renamed}"'))
+
+        connection.execute(text(f"CREATE TABLE {QUALIFIED_TABLE} "
+                                f"(LIKE {TABLE.schema}.{old} INCLUDING DEFAULTS INCLUDING STORAGE) "
+                                f"PARTITION BY RANGE (transaction_date)"))
+        connection.execute(text(f"ALTER TABLE {QUALIFIED_TABLE} ADD PRIMARY KEY (transaction_id, transaction_date)"))
+        for constraint in sorted(TABLE.foreign_key_constraints, key=lambda c: c.column_keys):
+            connection.execute(AddConstraint(constraint))
+        if sequence:
+            connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {QUALIFIED_TABLE}.transaction_id"))
+
+        now = datetime.now()
+        last = max(filter(None, [last, now]))
+        for _ in range(ahead):
+            last = next_start(interval_start(last, interval), interval)
+        created = []
+        for start in _partition_starts(first or now, last, interval):
+            name = partition_name(start, interval)
+            connection.execute(text(f"CREATE TABLE {TABLE.schema}.{name} PARTITION OF {QUALIFIED_TABLE} "
+                                    f"FOR VALUES FROM ({_bound(start)}) TO ({_bound(next_start(start, interval))})"))
+            created.append(name)
+        if default:
+            connection.execute(text(f"CREATE TABLE {TABLE.schema}.{DEFAULT_PARTITION} "
+                                    f"PARTITION OF {QUALIFIED_TABLE} DEFAULT"))
+            created.append(DEFAULT_PARTITION)
+
+        columns = ', '.join(c.name for c in TABLE.columns)
+        connection.execute(text(f"INSERT INTO {QUALIFIED_TABLE} ({columns}) "
+                                f"SELECT {columns} FROM {TABLE.schema}.{old}"))
+        # Indexes on the parent are created on every partition, now and when attached later
+        for index in sorted(TABLE.indexes, key=lambda i: i.name):
+            index.create(connection)
+    connection.execute(text(f"ANALYZE {QUALIFIED_TABLE}"))
+    connection.commit()
+    return created
+
+
+def create_future_partitions(connection, ahead=None):
+    """
+    Creates the missing partitions from the end of the last one up to 'ahead' years or months past
+    the current one. Safe to run repeatedly, e.g. from a daily cron job. Returns the names created.
+    """
+    with connection.begin():
+        if not is_partitioned(connection):
+            raise ValueError(f"{QUALIFIED_TABLE} is not partitioned; run the partition command first.")
+        existing = partitions(connection)
+    interval = partition_interval(existing)
+    ahead = PARTITIONS_AHEAD[interval] if ahead is None else ahead
+    target = interval_start(datetime.now(), interval)
+    for _ in range(ahead + 1):
+        target = next_start(target, interval)
+    start = max(p.end for p in existing if p.end is not None)
+    created = []
+    while start < target:
+        end = next_start(start, interval)
+        created.append(_create_range_partition(connection, start, end, interval))
+        start = end
+    return created
+
+
+def detach_partitions(engine, before):
+    """
+    Detaches the range partitions that end on or before the given datetime. They stay in the
+    database as plain tables, to be archived (e.g. with pg_dump -t) and dropped.
+
+    Without a DEFAULT partition (see convert_to_partitioned) on Postgres 14+ this uses DETACH
+    PARTITION CONCURRENTLY, which only takes a SHARE UPDATE EXCLUSIVE lock and so never blocks reads
+    or writes. Otherwise every detach takes a brief ACCESS EXCLUSIVE lock on the table, in a short
+    transaction with lock_timeout that is retried until the lock is granted.
+    Returns the names of the detached partitions.
+    """
+    with engine.connect() as connection:
+        with connection.begin():
+            if not is_partitioned(connection):
+                raise ValueError(f"{QUALIFIED_TABLE} is not partitioned.")
+            existing = partitions(connection)
+            server_version = int(connection.execute(text("SHOW server_version_num")).scalar())
+        concurrently = server_version >= 140000 and not any(p.start is None for p in existing)
+        detached = []
+        for partition in existing:
+            if partition.end is None or partition.end > before:
+                continue
+            statement = f"ALTER TABLE {QUALIFIED_TABLE} DETACH PARTITION {TABLE.schema}.{partition.name}"
+            if concurrently:
+                # CONCURRENTLY cannot run inside a transaction block
+                with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as autocommit:
+                    autocommit.execute(text(f"{statement} CONCURRENTLY"))
+            else:
+                _lock_with_retries(connection, lambda c: c.execute(text(statement)))
+            detached.append(partition.name)
+    return detached
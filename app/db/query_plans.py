@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.controller.statistics_controller import aggregate_query
+from app.controller.transaction_controller import filter_by_period
+from app.db.models.models import TransactionModel
+
+
+def endpoint_queries(session):
+    """
+    Representative queries of the read endpoints, over the raw transactions table,
+    keyed by the request that issues them.
+    """
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+    newest_first = (TransactionModel.transaction_date.desc(), TransactionModel.transaction_id.desc())
+    return {
+        "GET /transaction?period=1Yr": filter_by_period(session.query(TransactionModel), '1Yr')
+        .order_by(TransactionModel.transaction_date.desc()),
+        "GET /transaction?limit=100": session.query(TransactionModel).order_by(*newest_first).limit(101),
+        "GET /statistics_by_date?by=month": aggregate_query(session, ['date'], start_date, end_date, by='month',
+                                                            source='transactions'),
+        "GET /statistics_by_category": aggregate_query(session, ['category_level2'], start_date, end_date,
+                                                       source='transactions'),
+        "GET /statistics_by_source": aggregate_query(session, ['source'], start_date, end_date,
+                                                     source='transactions'),
+    }
+
+
+def _literal_sql(session, query):
+    dialect = session.get_bind().dialect
+    return str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+def explain(session, query):
+    """Returns the execution plan of a query as a list of text lines."""
+    dialect = session.get_bind().dialect
+    sql = _literal_sql(session, query)
+    prefix = "EXPLAIN QUERY PLAN " if dialect.name == 'sqlite' else "EXPLAIN "
+    return [" ".join(str(column) for column in row) for row in session.execute(text(prefix + sql))]
+
+
+def explain_analyze(session, query):
+    """Runs a query under EXPLAIN (ANALYZE, FORMAT JSON) on Postgres and returns the JSON plan document."""
+    return session.execute(text("EXPLAIN (ANALYZE, FORMAT JSON) " + _literal_sql(session, query))).scalar()[0]
+
+
+def explain_endpoints(session):
+    """Collects the plans of all endpoint_queries, keyed by request."""
+    return {name: explain(session, query) for name, query in endpoint_queries(session).items()}
@@ -2,6 +2,9 @@ from flask_cors import CORS
 from flask_restx import Api
 from flask_sqlalchemy import SQLAlchemy
 
+from app.lib.response_cache import ResponseCache
+from app.utils.db_routing import RoutingSession, replica_router
+
 api = Api(version="1.0",
           title="Spending Analysis",
           description="Spending Analysis",
@@ -9,10 +12,13 @@ api = Api(version="1.0",
           doc="/swagger")
 
 cors = CORS()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+response_cache = ResponseCache()
 
 
 def init_ext(app):
     api.init_app(app)
     db.init_app(app)
-    cors.init_app(app)
\ No newline at end of file
+    replica_router.init_app(app)
+    cors.init_app(app)
+    response_cache.init_app(app)
\ No newline at end of file
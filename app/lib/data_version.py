@@ -0,0 +1,35 @@
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = 'changed_data'
+
+# Names of the versioned data sets, the tables they are read from
+TRANSACTIONS = 'transactions'
+CATEGORIES = 'category'
+TYPES = 'type_name'
+SOURCES = 'source'
+RULES = 'categorization_rule'
+DATA_SETS = (TRANSACTIONS, CATEGORIES, TYPES, SOURCES, RULES)
+
+
+def mark_changed(session, *names):
+    """
+    Records that the current DB transaction of the session writes the named data sets, until it
+    commits or rolls back. Their table_version counters are bumped by record_changes.
+    """
+    session.info.setdefault(_PENDING_KEY, set()).update(names)
+
+
+def pending_changes(session):
+    """The data sets the session's current DB transaction writes, not committed yet."""
+    return frozenset(session.info.get(_PENDING_KEY, ()))
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,18 @@
+import hashlib
+from decimal import Decimal, ROUND_HALF_UP
+
+_CENT = Decimal('0.01')
+
+
+def transaction_fingerprint(transaction_date, amount, description, source):
+    """
+    Identifies a transaction by its day, amount in cents, description and source, ignoring case and
+    runs of whitespace, so that the same bank statement line imported twice gets the same value.
+    Returns 32 hex digits.
+    """
+    normalized = '\x1f'.join([
+        transaction_date.strftime('%Y-%m-%d') if transaction_date else '',
+        str(Decimal(str(amount)).quantize(_CENT, ROUND_HALF_UP)) if amount is not None else '',
+        ' '.join((description or '').lower().split()),
+        ' '.join((source or '').lower().split())])
+    return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
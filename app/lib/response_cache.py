@@ -0,0 +1,162 @@
+import logging
+import pickle
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request
+from werkzeug.datastructures import MultiDict
+
+logger = logging.getLogger(__name__)
+
+
+def normalized_args(args):
+    """
+    Query arguments ordered by name, the values of a repeated name kept in their given order: the
+    arguments of every request that a cached response may be served to.
+    """
+    return MultiDict(sorted(args.items(multi=True), key=lambda item: item[0]))
+
+
+class LRUCache:
+    """A thread-safe least-recently-used mapping that counts its evictions."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Shared second-level cache so that workers reuse each other's responses."""
+
+    def __init__(self, client, ttl, prefix='response_cache:'):
+        self._client = client
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def get(self, key):
+        payload = self._client.get(self._prefix + key)
+        return pickle.loads(payload) if payload is not None else None
+
+    def set(self, key, entry):
+        self._client.set(self._prefix + key, pickle.dumps(entry), ex=self._ttl)
+
+
+class ResponseCache:
+    """
+    Caches whole GET responses keyed on the path and the normalized query string. Each entry
+    records the table_version write counters of the data sets it was built from, read in the
+    request's own session, and is only served while the database still holds those counters, so a
+    write committed by any worker retires every response depending on it.
+
+    With RESPONSE_CACHE_REDIS_URL set, entries are shared by all workers; otherwise each worker
+    keeps its own.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.local = LRUCache(0)
+        self.shared = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("RESPONSE_CACHE_ENABLED", False)
+        self.local = LRUCache(app.config.get("RESPONSE_CACHE_SIZE", 256))
+        redis_url = app.config.get("RESPONSE_CACHE_REDIS_URL")
+        if self.enabled and redis_url:
+            try:
+                import redis
+            except ImportError:
+                logger.warning("RESPONSE_CACHE_REDIS_URL is set but the redis package is not installed; "
+                               "using a per-process response cache")
+                return
+            client = redis.Redis.from_url(redis_url)
+            self.shared = RedisCacheBackend(client, app.config.get("RESPONSE_CACHE_TTL", 3600))
+
+    @staticmethod
+    def _key():
+        query = "&".join(f"{k}={v}" for k, v in normalized_args(request.args).items(multi=True))
+        return f"{request.path}?{query}"
+
+    def cached(self, *data_sets):
+        """
+        Decorates a GET handler whose response only depends on the request and the named data sets.
+        Anything it echoes of the query arguments must come from normalized_args.
+        """
+
+        def decorator(func):
+            @wraps(func)
+            def inner_func(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                from app.controller.change_controller import table_versions
+                from app.extension import db
+
+                key = self._key()
+                # One primary-key lookup, as conditional_get; it runs where the request's reads are
+                # routed, so the counters always describe the data the response is built from
+                version = table_versions(db.session, data_sets)
+                entry = self.local.get(key)
+                if entry is not None and entry[0] == version:
+                    self._count("hits")
+                    return Response(entry[1], status=entry[2], mimetype=entry[3])
+                if self.shared is not None:
+                    entry = self.shared.get(key)
+                    if entry is not None and entry[0] == version:
+                        self._count("shared_hits")
+                        self.local.set(key, entry)
+                        return Response(entry[1], status=entry[2], mimetype=entry[3])
+
+                self._count("misses")
+                response = func(*args, **kwargs)
+                if isinstance(response, Response) and response.status_code == 200:
+                    entry = (version, response.get_data(), response.status_code, response.mimetype)
+                    self.local.set(key, entry)
+                    if self.shared is not None:
+                        self.shared.set(key, entry)
+                return response
+
+            return inner_func
+
+        return decorator
+
+    def stats(self):
+        return {"enabled": self.enabled,
+                "backend": "redis" if self.shared is not None else "local",
+                "size": len(self.local),
+                "maxsize": self.local.maxsize,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.local.evictions}
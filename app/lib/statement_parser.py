@@ -0,0 +1,56 @@
+import csv
+import re
+from datetime import datetime
+
+_OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+_OFX_OPEN = '<STMTTRN>'
+_OFX_CLOSE = '</STMTTRN>'
+
+
+def iter_csv_rows(lines, column_map=None):
+    """
+    Reads a CSV bank statement one record at a time from an iterable of text lines.
+    The header row names the columns; column_map renames them onto transaction fields and
+    columns without a mapping are dropped. Yields (line number, transaction dict) pairs.
+    """
+    reader = csv.DictReader(lines)
+    for record in reader:
+        if column_map:
+            record = {column_map[k]: v for k, v in record.items() if k in column_map}
+        yield reader.line_num, record
+
+
+def _ofx_date(value):
+    """Converts an OFX date such as 20230105120000[-5:EST] to MM/DD/YYYY, leaving bad values as they are."""
+    try:
+        return datetime.strptime(value[:8], '%Y%m%d').strftime('%m/%d/%Y')
+    except ValueError:
+        return value
+
+
+def iter_ofx_rows(lines):
+    """
+    Reads the <STMTTRN> records of an OFX statement (SGML or XML flavour) from an iterable of
+    text lines, holding at most one record in memory. Yields (record number, transaction dict) pairs.
+    """
+    buffer = ''
+    position = 0
+    for line in lines:
+        buffer += line
+        while True:
+            start = buffer.find(_OFX_OPEN)
+            if start < 0:
+                # Keep a tail long enough to complete an opening tag split across lines
+                buffer = buffer[-len(_OFX_OPEN):]
+                break
+            end = buffer.find(_OFX_CLOSE, start)
+            if end < 0:
+                buffer = buffer[start:]
+                break
+            fields = {tag.upper(): value.strip() for tag, value in _OFX_FIELD.findall(buffer[start:end])}
+            buffer = buffer[end + len(_OFX_CLOSE):]
+            position += 1
+            yield position, {'transaction_date': _ofx_date(fields.get('DTPOSTED', '')),
+                             'amount': fields.get('TRNAMT'),
+                             'description': fields.get('NAME'),
+                             'notes': fields.get('MEMO')}
@@ -0,0 +1,152 @@
+from datetime import datetime
+from http import HTTPStatus
+
+from flask import make_response, jsonify
+from flask_restx import Resource, Namespace, fields
+
+from app.constant.system_constants import SYSTEM_USER_NAME
+from app.controller.change_controller import record_changes
+from app.controller.rule_controller import validate_rule, rerun_rules
+from app.controller.transaction_controller import ensure_lookup_values
+from app.db.models.models import CategorizationRuleModel, RULE_MATCH_TYPES
+from app.lib.data_version import RULES
+from app.namespace.transactions import transaction_filter_model
+from app.utils.conditional_get import conditional_get
+from app.utils.db_connection import DBSession
+
+categorization_rule_api = Namespace(name="Categorization Rule",
+                                    description="Operations related to the rules categorizing new transactions",
+                                    path="/categorization_rule")
+
+RULE_FIELDS = ['priority', 'description_pattern', 'match_type', 'min_amount', 'max_amount', 'source',
+               'category_level1', 'category_level2', 'enabled']
+
+rule_input_model = categorization_rule_api.model('CategorizationRuleInput', {
+    'priority': fields.Integer(default=100, description='Lower priorities are tried first', example=10),
+    'description_pattern': fields.String(description='Substring or regex searched in the description, '
+                                                     'ignoring case; empty matches every description',
+                                         example='starbucks'),
+    'match_type': fields.String(default='substring', enum=RULE_MATCH_TYPES, description='How to match the pattern'),
+    'min_amount': fields.Float(description='Smallest matching amount', example=0),
+    'max_amount': fields.Float(description='Largest matching amount', example=20),
+    'source': fields.String(description='Only transactions of this source', example='Visa'),
+    'category_level1': fields.String(description='Primary category to assign', example='Food'),
+    'category_level2': fields.String(description='Secondary category to assign', example='Coffee'),
+    'enabled': fields.Boolean(default=True),
+})
+
+rule_apply_model = categorization_rule_api.model('CategorizationRuleApply', {
+    'filter': fields.Nested(transaction_filter_model, required=False,
+                            description='Only these transactions; all of them by default'),
+    'overwrite': fields.Boolean(default=False, description='Also recategorize transactions that have a category'),
+    'dry_run': fields.Boolean(default=False, description='Only count the transactions that would change'),
+})
+
+
+def _lookup_values(rule):
+    """The categories and source a rule references, in the shape ensure_lookup_values expects."""
+    return [{'category_level1': rule.category_level1, 'category_level2': rule.category_level2,
+             'source': rule.source}]
+
+
+def _update_rule(session, rule, payload):
+    try:
+        validate_rule(dict({f: getattr(rule, f) for f in RULE_FIELDS}, **payload))
+    except ValueError as e:
+        categorization_rule_api.abort(HTTPStatus.BAD_REQUEST, str(e))
+    for field in RULE_FIELDS:
+        if field in payload:
+            value = payload[field]
+            setattr(rule, field, value if value != '' else None)
+    rule.modified_at = datetime.now()
+    rule.modified_by = SYSTEM_USER_NAME
+    ensure_lookup_values(session, _lookup_values(rule))
+    record_changes(session, RULES)
+
+
+@categorization_rule_api.route('')
+class CategorizationRuleList(Resource):
+    @conditional_get(RULES)
+    @DBSession.class_method
+    def get(self, session):
+        """Retrieves all categorization rules in the order they are tried.
+
+        Returns:
+            JSON: A list of all categorization rules.
+        """
+        rules = session.query(CategorizationRuleModel).order_by(CategorizationRuleModel.priority,
+                                                                CategorizationRuleModel.rule_id).all()
+        return make_response(jsonify([r.serialize for r in rules]), HTTPStatus.OK)
+
+    @DBSession.class_method
+    @categorization_rule_api.expect(rule_input_model, validate=True)
+    def post(self, session):
+        """Creates a categorization rule, applied to every transaction created from now on.
+
+        Categories and the source it references are created when missing. Existing transactions
+        are only categorized by POST /categorization_rule/apply.
+
+        Returns:
+            JSON: The new rule.
+        """
+        now = datetime.now()
+        rule = CategorizationRuleModel(priority=100, match_type='substring', enabled=True,
+                                       created_at=now, created_by=SYSTEM_USER_NAME)
+        _update_rule(session, rule, categorization_rule_api.payload)
+        session.add(rule)
+        session.flush()
+        return make_response(jsonify(rule.serialize), HTTPStatus.CREATED)
+
+
+@categorization_rule_api.route('/<int:rule_id>')
+class CategorizationRule(Resource):
+    @DBSession.class_method
+    @categorization_rule_api.expect(rule_input_model, validate=True)
+    def put(self, session, rule_id):
+        """Updates the given fields of a categorization rule.
+
+        Returns:
+            JSON: The updated rule.
+        """
+        rule = session.get(CategorizationRuleModel, rule_id)
+        if rule is None:
+            categorization_rule_api.abort(HTTPStatus.NOT_FOUND, f"Rule {rule_id} not found.")
+        _update_rule(session, rule, categorization_rule_api.payload)
+        return make_response(jsonify(rule.serialize), HTTPStatus.OK)
+
+    @DBSession.class_method
+    def delete(self, session, rule_id):
+        """Deletes a categorization rule. Transactions it already categorized keep their categories.
+
+        Returns:
+            JSON: A message indicating success or failure.
+        """
+        rule = session.get(CategorizationRuleModel, rule_id)
+        if rule is None:
+            categorization_rule_api.abort(HTTPStatus.NOT_FOUND, f"Rule {rule_id} not found.")
+        session.delete(rule)
+        record_changes(session, RULES)
+        return make_response(jsonify({"message": f"Rule {rule_id} deleted successfully."}), HTTPStatus.OK)
+
+
+@categorization_rule_api.route('/apply')
+class CategorizationRuleApply(Resource):
+    @DBSession.class_method
+    @categorization_rule_api.expect(rule_apply_model, validate=True)
+    def post(self, session):
+        """Re-runs the rules over existing transactions, by default only the uncategorized ones.
+
+        The transactions are scanned in chunks of ascending ID and every chunk's changes are written
+        with one UPDATE per resulting category pair.
+
+        Returns:
+            JSON: The number of rules, scanned and changed transactions, elapsed seconds and rows/s.
+        """
+        payload = categorization_rule_api.payload or {}
+        filters = {k: v for k, v in (payload.get('filter') or {}).items() if v is not None}
+        try:
+            result = rerun_rules(session, filters or None, payload.get('overwrite', False),
+                                 payload.get('dry_run', False))
+        except ValueError as e:
+            categorization_rule_api.abort(HTTPStatus.BAD_REQUEST, str(e))
+        return make_response(jsonify(result), HTTPStatus.OK)
@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+from flask import make_response, jsonify
+from flask_restx import Resource, Namespace
+
+from app.extension import db, response_cache
+from app.utils.db_pool import pool_status
+from app.utils.db_routing import replica_router
+
+diagnostics_api = Namespace(name="Diagnostics",
+                            path="/diagnostics",
+                            description="Runtime statistics of this server process")
+
+
+@diagnostics_api.route('/db_pool')
+class DBPoolStatus(Resource):
+    def get(self):
+        """Retrieves the live state of this worker's database connection pool.
+
+        Returns:
+            JSON: Pool class, size, checked in/out connections, overflow and, for the instrumented
+            QueuePool, checkout latency, wait and connection setup statistics.
+        """
+        return make_response(jsonify(pool_status(db.engine.pool)), HTTPStatus.OK)
+
+
+@diagnostics_api.route('/db_routing')
+class DBRoutingStatus(Resource):
+    def get(self):
+        """Retrieves how this worker routes reads between the primary and the read replica.
+
+        Returns:
+            JSON: Whether a replica is configured, its last measured lag, requests routed to each
+            database, fallbacks to the primary by cause and the replica's pool state.
+        """
+        return make_response(jsonify(replica_router.stats(db)), HTTPStatus.OK)
+
+
+@diagnostics_api.route('/response_cache')
+class ResponseCacheStatus(Resource):
+    def get(self):
+        """Retrieves the statistics response cache counters of this worker.
+
+        Returns:
+            JSON: Backend, size, hits, shared backend hits, misses and evictions.
+        """
+        return make_response(jsonify(response_cache.stats()), HTTPStatus.OK)
+
+
+@diagnostics_api.route('/columnar_store')
+class ColumnarStoreStatus(Resource):
+    def get(self):
+        """Retrieves the state of this worker's in-memory columnar transaction snapshot.
+
+        Returns:
+            JSON: Row count, array and dictionary memory, bytes per million rows, modified_at
+            high-water mark and the rows fetched and seconds spent by the last refresh.
+        """
+        from app.controller.columnar_store import columnar_store
+        return make_response(jsonify(columnar_store.stats()), HTTPStatus.OK)
+
+
+@diagnostics_api.route('/search_index')
+class SearchIndexStatus(Resource):
+    def get(self):
+        """Retrieves the state of this worker's in-process text search index, used without pg_trgm.
+
+        Returns:
+            JSON: Indexed transactions, distinct words and word trigrams and the rows fetched and
+            seconds spent by the last refresh.
+        """
+        from app.controller.search_index import search_index
+        return make_response(jsonify(search_index.stats()), HTTPStatus.OK)
+
+
+@diagnostics_api.route('/lookup_cache')
+class LookupCacheStatus(Resource):
+    def get(self):
+        """Retrieves the state of this worker's copy of the category, type and source tables.
+
+        Returns:
+            JSON: Cached rows and write counter per table, reloads and hits.
+        """
+        from app.controller.lookup_cache import lookup_cache
+        return make_response(jsonify(lookup_cache.stats()), HTTPStatus.OK)
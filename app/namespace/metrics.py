@@ -0,0 +1,20 @@
+from flask import Response
+from flask_restx import Resource, Namespace
+
+from app.utils.request_metrics import request_metrics
+
+metrics_api = Namespace(name="Metrics",
+                        path="/metrics",
+                        description="Request performance metrics of this server process")
+
+
+@metrics_api.route('')
+class Metrics(Resource):
+    def get(self):
+        """Retrieves the per-endpoint request metrics of this worker in the Prometheus text format.
+
+        Returns:
+            text/plain: Latency histograms, request counts by status, SQL statement count, time and rows,
+            ORM objects loaded, JSON serialization and commit time and response bytes, per endpoint and method.
+        """
+        return Response(request_metrics.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,75 @@
+import time
+from http import HTTPStatus
+
+from flask import current_app, make_response, jsonify
+from flask_restx import Resource, Namespace, fields
+
+from app.controller.batch_controller import run_batch
+from app.extension import db
+from app.namespace.statistics_by_category import statistics_by_category
+from app.namespace.statistics_by_date import statistics_by_date
+from app.namespace.statistics_by_source import statistics_by_source
+from app.namespace.statistics_pivot import statistics_pivot
+from app.utils.db_routing import replica_router
+
+statistics_batch_api = Namespace(name="StatisticsBatch",
+                                 path="/statistics_batch",
+                                 description="Operations running several statistics queries in one request")
+
+# The functions building the response bodies of the statistics endpoints from their query parameters
+STATISTICS_QUERIES = {"by_date": statistics_by_date,
+                      "by_category": statistics_by_category,
+                      "by_source": statistics_by_source,
+                      "pivot": statistics_pivot}
+
+statistics_query_model = statistics_batch_api.model('StatisticsQuery', {
+    'id': fields.String(required=False, description='Caller chosen key echoed in the result', example='ytd'),
+    'statistics': fields.String(required=True, description=f"One of {list(STATISTICS_QUERIES)}",
+                                example='by_date'),
+    'params': fields.Raw(required=False, description='Query parameters of that statistics endpoint',
+                         example={'by': 'month', 'startDate': '2023-01-01'}),
+})
+
+statistics_batch_model = statistics_batch_api.model('StatisticsBatch', {
+    'queries': fields.List(fields.Nested(statistics_query_model), required=True),
+})
+
+
+@statistics_batch_api.route('')
+class StatisticsBatch(Resource):
+    @statistics_batch_api.expect(statistics_batch_model, validate=True)
+    def post(self):
+        """Runs several statistics queries concurrently and returns all results in one response.
+
+        Each query runs the same parameter validation and aggregation as a GET to its endpoint,
+        without its response cache, on a bounded thread pool with its own session and pooled
+        connection. All of them read from the database a GET by the caller would read from.
+
+        Returns:
+            JSON: The total elapsed milliseconds and, in request order, each query's id, statistics,
+            HTTP status, elapsed milliseconds and the body the endpoint would have returned.
+        """
+        queries = statistics_batch_api.payload["queries"]
+        max_queries = current_app.config.get("STATISTICS_BATCH_MAX_QUERIES", 20)
+        if not 0 < len(queries) <= max_queries:
+            statistics_batch_api.abort(HTTPStatus.BAD_REQUEST, f"'queries' must hold 1 to {max_queries} queries.")
+        for query in queries:
+            if query["statistics"] not in STATISTICS_QUERIES:
+                statistics_batch_api.abort(HTTPStatus.BAD_REQUEST,
+                                           f"'statistics' can be one of {list(STATISTICS_QUERIES)}.")
+            if not isinstance(query.get("params") or {}, dict):
+                statistics_batch_api.abort(HTTPStatus.BAD_REQUEST, "'params' must be an object.")
+
+        started = time.perf_counter()
+        results = run_batch(current_app._get_current_object(),
+                            [(STATISTICS_QUERIES[q["statistics"]], q.get("params") or {}) for q in queries],
+                            current_app.config.get("STATISTICS_BATCH_WORKERS", 4),
+                            replica_router.read_route(db))
+        resp = {"elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+                "results": [{"id": query.get("id"),
+                             "statistics": query["statistics"],
+                             "status": status,
+                             "elapsed_ms": elapsed_ms,
+                             "data": body}
+                            for query, (status, body, elapsed_ms) in zip(queries, results)]}
+        return make_response(jsonify(resp), HTTPStatus.OK)
@@ -1,11 +1,13 @@
-from datetime import datetime
 from http import HTTPStatus
 
-import pandas as pd
 from flask import make_response, jsonify, request
 from flask_restx import Resource, Namespace
 
-from app.db.models.models import TransactionModel
+from app.controller.statistics_controller import aggregate
+from app.extension import response_cache
+from app.lib.data_version import TRANSACTIONS
+from app.lib.response_cache import normalized_args
+from app.utils.conditional_get import conditional_get
 from app.utils.db_connection import DBSession
 
 statistics_by_category_api = Namespace(name="StatisticsByCategory",
@@ -13,10 +15,28 @@ statistics_by_category_api = Namespace(name="StatisticsByCategory",
                                        description="Operations related to spending statistics by category")
 
 
+def statistics_by_category(session, args):
+    """The GET /statistics_by_category response body for the query parameters args."""
+    stats = aggregate(session, ['category_level2'],
+                      start_date=args.get("startDate", ""),
+                      end_date=args.get("endDate", ""),
+                      category=args.get("category", ""))
+    return {"total": stats["total"],
+            "count": stats["count"],
+            "max": stats["max"],
+            "min": stats["min"],
+            "query": normalized_args(args).to_dict(),
+            "data": [{"category": g["category_level2"], "amount": g["total"]}
+                     for g in stats["groups"] if g["category_level2"] is not None]}
+
+
+@statistics_by_category_api.route('')
 class StatisticsByCategory(Resource):
     def __init__(self, *args, **kwargs):
         Resource.__init__(*args, **kwargs)
 
+    @conditional_get(TRANSACTIONS)
+    @response_cache.cached(TRANSACTIONS)
     @DBSession.class_method
     def get(self, session):
         """Retrieves spending statistics grouped by category.
@@ -29,36 +49,4 @@ class StatisticsByCategory(Resource):
         Returns:
             JSON: A dictionary containing total amount, count, max/min amount, query parameters, and a list of category-wise spending.
         """
-        start_date = request.args.get("startDate", "")
-        end_date = request.args.get("endDate", "")
-        category = request.args.get("category", "")
-        trans_records = session.query(TransactionModel).filter(TransactionModel.type_name == "Sale")
-        if start_date != "":
-            trans_records = trans_records.filter(
-                TransactionModel.transaction_date > datetime.strptime(start_date, '%Y-%m-%d'))
-        if end_date != "":
-            trans_records = trans_records.filter(
-                TransactionModel.transaction_date < datetime.strptime(end_date, '%Y-%m-%d'))
-        if category != "":
-            trans_records = trans_records.filter(TransactionModel.category_level2 == category)
-
-        trans_records = trans_records.all()
-        if len(trans_records) == 0:
-            return make_response([])
-        trans_json = [i.serialize for i in trans_records]
-
-        trans_df = pd.DataFrame(trans_json)
-
-        expense_by_category = trans_df.loc[:, ["amount", "category_level2"]].groupby("category_level2",
-                                                                                     as_index=False).sum()
-        resp = {"total": trans_df.amount.sum(),
-                "count": trans_df.amount.count(),
-                "max": trans_df.amount.max(),
-                "min": trans_df.amount.min(),
-                "query": request.args.to_dict(),
-                "data": []}
-        for idx, row in expense_by_category.iterrows():
-            ele = {"category": row.category_level2,
-                   "amount": row.amount}
-            resp["data"].append(ele)
-        return make_response(jsonify(resp), HTTPStatus.OK)
+        return make_response(jsonify(statistics_by_category(session, request.args)), HTTPStatus.OK)
@@ -1,11 +1,13 @@
-from datetime import datetime
 from http import HTTPStatus
 
-import pandas as pd
 from flask import make_response, jsonify, request
 from flask_restx import Resource, Namespace
 
-from app.db.models.models import TransactionModel
+from app.controller.statistics_controller import aggregate
+from app.extension import response_cache
+from app.lib.data_version import TRANSACTIONS
+from app.lib.response_cache import normalized_args
+from app.utils.conditional_get import conditional_get
 from app.utils.db_connection import DBSession
 
 statistics_by_source_api = Namespace(name="StatisticsBySource",
@@ -13,10 +15,27 @@ statistics_by_source_api = Namespace(name="StatisticsBySource",
                                      description="Operations related to spending statistics by source")
 
 
+def statistics_by_source(session, args):
+    """The GET /statistics_by_source response body for the query parameters args."""
+    stats = aggregate(session, ['source'],
+                      start_date=args.get("startDate", ""),
+                      end_date=args.get("endDate", ""))
+    return {"total": stats["total"],
+            "count": stats["count"],
+            "max": stats["max"],
+            "min": stats["min"],
+            "query": normalized_args(args).to_dict(),
+            "data": [{"source": g["source"], "amount": g["total"]}
+                     for g in stats["groups"] if g["source"] is not None]}
+
+
+@statistics_by_source_api.route('')
 class StatisticsBySource(Resource):
     def __init__(self, *args, **kwargs):
         Resource.__init__(*args, **kwargs)
 
+    @conditional_get(TRANSACTIONS)
+    @response_cache.cached(TRANSACTIONS)
     @DBSession.class_method
     def get(self, session):
         """Retrieves spending statistics grouped by transaction source.
@@ -28,31 +47,4 @@ class StatisticsBySource(Resource):
         Returns:
             JSON: A dictionary containing total amount, count, max/min amount, query parameters, and a list of source-wise spending.
         """
-        start_date = request.args.get("startDate", "")
-        end_date = request.args.get("endDate", "")
-        trans_records = session.query(TransactionModel).filter(TransactionModel.type_name == "Sale")
-        if start_date != "":
-            trans_records = trans_records.filter(
-                TransactionModel.transaction_date > datetime.strptime(start_date, '%Y-%m-%d'))
-        if end_date != "":
-            trans_records = trans_records.filter(
-                TransactionModel.transaction_date < datetime.strptime(end_date, '%Y-%m-%d'))
-
-        trans_records = trans_records.all()
-        trans_json = [i.serialize for i in trans_records]
-
-        trans_df = pd.DataFrame(trans_json)
-
-        expense_by_category = trans_df.loc[:, ["amount", "source"]].groupby("source",
-                                                                            as_index=False).sum()
-        resp = {"total": trans_df.amount.sum(),
-                "count": trans_df.amount.count(),
-                "max": trans_df.amount.max(),
-                "min": trans_df.amount.min(),
-                "query": request.args.to_dict(),
-                "data": []}
-        for idx, row in expense_by_category.iterrows():
-            ele = {"source": row.source,
-                   "amount": row.amount}
-            resp["data"].append(ele)
-        return make_response(jsonify(resp), HTTPStatus.OK)
+        return make_response(jsonify(statistics_by_source(session, request.args)), HTTPStatus.OK)
@@ -0,0 +1,80 @@
+from http import HTTPStatus
+
+from flask import make_response, jsonify, request
+from flask_restx import Resource, Namespace
+
+from app.controller.statistics_controller import DATE_BUCKETS, DIMENSIONS, GROUPING_MODES, pivot
+from app.extension import response_cache
+from app.lib.data_version import TRANSACTIONS
+from app.lib.response_cache import normalized_args
+from app.utils.conditional_get import conditional_get
+from app.utils.db_connection import DBSession
+
+statistics_pivot_api = Namespace(name="StatisticsPivot",
+                                 path="/statistics_pivot",
+                                 description="Operations related to spending statistics cross-tabulated by several dimensions")
+
+
+def statistics_pivot(session, args):
+    """The GET /statistics_pivot response body for the query parameters args."""
+    dimensions = [d.strip() for d in args.get("dimensions", "").split(",") if d.strip()]
+    by = args.get("by", "")
+    grouping = args.get("grouping", "rollup")
+    if not dimensions:
+        statistics_pivot_api.abort(HTTPStatus.BAD_REQUEST, "'dimensions' is a required query parameter.")
+    unknown = [d for d in dimensions if d not in DIMENSIONS + ['date']]
+    if unknown or len(set(dimensions)) != len(dimensions):
+        statistics_pivot_api.abort(HTTPStatus.BAD_REQUEST,
+                                   f"'dimensions' must be distinct values of {DIMENSIONS + ['date']}.")
+    if 'date' in dimensions and by not in DATE_BUCKETS:
+        statistics_pivot_api.abort(HTTPStatus.BAD_REQUEST,
+                                   f"'by' is required with the 'date' dimension. It can be one of {DATE_BUCKETS}.")
+    if grouping not in GROUPING_MODES:
+        statistics_pivot_api.abort(HTTPStatus.BAD_REQUEST, f"'grouping' can be one of {GROUPING_MODES}.")
+
+    stats = pivot(session, dimensions,
+                  start_date=args.get("startDate", ""),
+                  end_date=args.get("endDate", ""),
+                  category=args.get("category", ""),
+                  by=by,
+                  type_name=args.get("type_name", "Sale"),
+                  grouping=grouping)
+    return {"total": stats["total"],
+            "count": stats["count"],
+            "max": stats["max"],
+            "min": stats["min"],
+            "query": normalized_args(args).to_dict(),
+            "dimensions": dimensions,
+            "data": stats["cells"]}
+
+
+@statistics_pivot_api.route('')
+class StatisticsPivot(Resource):
+    def __init__(self, *args, **kwargs):
+        Resource.__init__(*args, **kwargs)
+
+    @conditional_get(TRANSACTIONS)
+    @response_cache.cached(TRANSACTIONS)
+    @DBSession.class_method
+    def get(self, session):
+        """Retrieves spending statistics cross-tabulated by any combination of dimensions, with subtotals.
+
+        One aggregation at the finest grouping answers every subtotal, replacing separate calls
+        to the by-date, by-category and by-source endpoints.
+
+        Query Parameters:
+            dimensions (str, required): Comma separated group-by dimensions, any of 'date',
+                'category_level1', 'category_level2', 'source', 'type_name'. Subtotals roll up from the right.
+            by (str, optional): Date bucket when 'date' is a dimension. One of 'year', 'month', 'day', 'quarter'.
+            grouping (str, optional): 'rollup' (default) for GROUP BY ROLLUP subtotals, 'cube' for every
+                combination of dimensions, 'none' for the full grouping only.
+            startDate (str, optional): Start date for filtering transactions (YYYY-MM-DD).
+            endDate (str, optional): End date for filtering transactions (YYYY-MM-DD).
+            category (str, optional): Filter by a specific category level 2.
+            type_name (str, optional): Transaction type to aggregate. Defaults to 'Sale'; empty for every type.
+
+        Returns:
+            JSON: The grand total, count, max/min amount, query parameters, and one cell per group of every
+            grouping set holding the dimension values (null when rolled up), 'grouping', total, count, min and max.
+        """
+        return make_response(jsonify(statistics_pivot(session, request.args)), HTTPStatus.OK)
@@ -3,7 +3,11 @@ from http import HTTPStatus
 from flask_restx import Resource, Namespace, fields
 from sqlalchemy.exc import IntegrityError
 
+from app.controller.change_controller import record_changes
+from app.controller.lookup_cache import lookup_cache
 from app.db.models.models import TransactionCategoryModel
+from app.lib.data_version import CATEGORIES
+from app.utils.conditional_get import conditional_get
 from app.utils.db_connection import DBSession
 
 # --- API Namespace and Model Definition ---
@@ -24,11 +28,12 @@ category_model = transaction_category_api.model('TransactionCategory', {
 class TransactionCategoryList(Resource):
     """Handles listing all categories and creating new ones."""
 
+    @conditional_get(CATEGORIES)
     @DBSession.class_method
     @transaction_category_api.marshal_list_with(category_model)
     def get(self, session):
         """Retrieves a list of all transaction categories."""
-        return session.query(TransactionCategoryModel).all()
+        return lookup_cache.rows(session, CATEGORIES)
 
     @DBSession.class_method
     @transaction_category_api.expect(category_model, validate=True)
@@ -46,6 +51,7 @@ class TransactionCategoryList(Resource):
 
         try:
             session.add(new_category)
+            record_changes(session, CATEGORIES)
             session.commit()
             return new_category, HTTPStatus.CREATED
         except Exception as e:
@@ -85,6 +91,7 @@ class TransactionCategory(Resource):
         category_to_update.description = data.get('description')
 
         try:
+            record_changes(session, CATEGORIES)
             session.commit()
             return category_to_update
         except Exception as e:
@@ -102,6 +109,7 @@ class TransactionCategory(Resource):
 
         try:
             session.delete(category_to_delete)
+            record_changes(session, CATEGORIES)
             session.commit()
             # A 204 response should have no body
             return '', HTTPStatus.NO_CONTENT
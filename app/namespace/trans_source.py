@@ -4,7 +4,11 @@ from flask import make_response, jsonify
 from flask_restx import Resource, Namespace, reqparse
 from sqlalchemy.exc import IntegrityError
 
+from app.controller.change_controller import record_changes
+from app.controller.lookup_cache import lookup_cache
 from app.db.models.models import TransactionSourceModel
+from app.lib.data_version import SOURCES
+from app.utils.conditional_get import conditional_get
 from app.utils.db_connection import DBSession
 
 transaction_source_api = Namespace(name="Transaction Source",
@@ -16,10 +20,12 @@ source_parser.add_argument('source', type=str, required=True, help='Source name
 source_parser.add_argument('description', type=str, required=False, help='Description of the source')
 
 
+@transaction_source_api.route('')
 class TransactionSource(Resource):
     def __init__(self, *args, **kwargs):
         Resource.__init__(*args, **kwargs)
 
+    @conditional_get(SOURCES)
     @DBSession.class_method
     def get(self, session):
         """Retrieves all transaction sources.
@@ -27,8 +33,7 @@ class TransactionSource(Resource):
         Returns:
             JSON: A list of all transaction sources.
         """
-        source_records = session.query(TransactionSourceModel).all()
-        return make_response(jsonify([s.serialize for s in source_records]), HTTPStatus.OK)
+        return make_response(jsonify(lookup_cache.rows(session, SOURCES)), HTTPStatus.OK)
 
     @DBSession.class_method
     def post(self, session):
@@ -51,6 +56,7 @@ class TransactionSource(Resource):
         new_source = TransactionSourceModel(source=source_name, description=description)
         try:
             session.add(new_source)
+            record_changes(session, SOURCES)
             session.commit()
             return make_response(jsonify({"message": f"Source '{source_name}' created successfully."}),
                                  HTTPStatus.CREATED)
@@ -84,6 +90,7 @@ class TransactionSource(Resource):
 
         source_to_update.description = description
         try:
+            record_changes(session, SOURCES)
             session.commit()
             return make_response(jsonify({"message": f"Source '{source_name}' updated successfully."}), HTTPStatus.OK)
         except Exception as e:
@@ -110,6 +117,7 @@ class TransactionSource(Resource):
 
         try:
             session.delete(source_to_delete)
+            record_changes(session, SOURCES)
             session.commit()
             return make_response(jsonify({"message": f"Source '{source_name}' deleted successfully."}), HTTPStatus.OK)
         except IntegrityError:
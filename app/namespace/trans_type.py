@@ -4,7 +4,11 @@ from flask import make_response, jsonify
 from flask_restx import Resource, Namespace, reqparse
 from sqlalchemy.exc import IntegrityError
 
+from app.controller.change_controller import record_changes
+from app.controller.lookup_cache import lookup_cache
 from app.db.models.models import TransactionTypeModel
+from app.lib.data_version import TYPES
+from app.utils.conditional_get import conditional_get
 from app.utils.db_connection import DBSession
 
 transaction_type_api = Namespace(name="Transaction Type",
@@ -16,10 +20,12 @@ type_parser.add_argument('type_name', type=str, required=True, help='Type name c
 type_parser.add_argument('description', type=str, required=False, help='Description of the type')
 
 
+@transaction_type_api.route('')
 class TransactionType(Resource):
     def __init__(self, *args, **kwargs):
         Resource.__init__(*args, **kwargs)
 
+    @conditional_get(TYPES)
     @DBSession.class_method
     def get(self, session):
         """Retrieves all transaction types.
@@ -27,8 +33,7 @@ class TransactionType(Resource):
         Returns:
             JSON: A list of all transaction types.
         """
-        type_records = session.query(TransactionTypeModel).all()
-        return make_response(jsonify([t.serialize for t in type_records]), HTTPStatus.OK)
+        return make_response(jsonify(lookup_cache.rows(session, TYPES)), HTTPStatus.OK)
 
     @DBSession.class_method
     def post(self, session):
@@ -51,6 +56,7 @@ class TransactionType(Resource):
         new_type = TransactionTypeModel(type_name=type_name, description=description)
         try:
             session.add(new_type)
+            record_changes(session, TYPES)
             session.commit()
             return make_response(jsonify({"message": f"Type '{type_name}' created successfully."}), HTTPStatus.CREATED)
         except IntegrityError:
@@ -83,6 +89,7 @@ class TransactionType(Resource):
 
         type_to_update.description = description
         try:
+            record_changes(session, TYPES)
             session.commit()
             return make_response(jsonify({"message": f"Type '{type_name}' updated successfully."}), HTTPStatus.OK)
         except Exception as e:
@@ -109,6 +116,7 @@ class TransactionType(Resource):
 
         try:
             session.delete(type_to_delete)
+            record_changes(session, TYPES)
             session.commit()
             return make_response(jsonify({"message": f"Type '{type_name}' deleted successfully."}), HTTPStatus.OK)
         except IntegrityError:
@@ -0,0 +1,82 @@
+import codecs
+import json
+from http import HTTPStatus
+
+from flask_restx import Resource, Namespace, reqparse, inputs
+from werkzeug.datastructures import FileStorage
+
+from app.controller.import_controller import import_statement
+from app.lib.statement_parser import iter_csv_rows, iter_ofx_rows
+from app.utils.db_connection import DBSession
+
+transaction_import_api = Namespace(name="Transaction Import",
+                                   description="Import bank statement files",
+                                   path="/transaction_import")
+
+STATEMENT_FORMATS = ['csv', 'ofx']
+MAX_CHUNK_SIZE = 50000
+
+import_parser = reqparse.RequestParser()
+import_parser.add_argument('file', type=FileStorage, location='files', required=True,
+                           help='Bank statement file (CSV or OFX)')
+import_parser.add_argument('format', type=str, location='form', choices=STATEMENT_FORMATS,
+                           help='Statement format. Guessed from the file extension when omitted')
+import_parser.add_argument('column_map', type=str, location='form',
+                           help='CSV only: JSON object mapping CSV headers to transaction fields')
+import_parser.add_argument('date_format', type=str, location='form', default='%m/%d/%Y',
+                           help='CSV only: strptime format of the date column')
+import_parser.add_argument('chunk_size', type=int, location='form', default=5000,
+                           help=f'Rows inserted and committed per database transaction, at most {MAX_CHUNK_SIZE}')
+import_parser.add_argument('source', type=str, location='form', help='Source for rows that do not have one')
+import_parser.add_argument('type_name', type=str, location='form', help='Type for rows that do not have one')
+import_parser.add_argument('dedupe', type=inputs.boolean, location='form', default=False,
+                           help='Skip rows with the same date, amount, description and source as a stored transaction')
+
+
+@transaction_import_api.route('')
+class TransactionImport(Resource):
+    """Handles bank statement uploads."""
+
+    @DBSession.class_method
+    @transaction_import_api.expect(import_parser)
+    def post(self, session):
+        """Imports an uploaded CSV or OFX bank statement.
+
+        The file is parsed as a stream and written in chunks of 'chunk_size' rows through the bulk
+        insert path, each chunk in its own database transaction, so memory stays bounded regardless
+        of the file size. Invalid rows are skipped and reported. With 'dedupe' a statement overlapping
+        an earlier import only adds the transactions that are not stored yet.
+
+        Returns:
+            JSON: Rows read, inserted and failed, the first per-row errors, whether the whole file
+            could be read and the import throughput,
+            and with 'dedupe' the skipped and conflicting row counts and the first conflicts.
+        """
+        args = import_parser.parse_args()
+        upload = args['file']
+        statement_format = args['format'] or upload.filename.rsplit('.', 1)[-1].lower()
+        if statement_format not in STATEMENT_FORMATS:
+            transaction_import_api.abort(HTTPStatus.BAD_REQUEST,
+                                         f"Unknown statement format. It can be one of {STATEMENT_FORMATS}.")
+        if not 0 < args['chunk_size'] <= MAX_CHUNK_SIZE:
+            transaction_import_api.abort(HTTPStatus.BAD_REQUEST,
+                                         f"'chunk_size' must be between 1 and {MAX_CHUNK_SIZE}.")
+
+        lines = codecs.iterdecode(upload.stream, 'utf-8-sig')
+        date_format = '%m/%d/%Y'
+        if statement_format == 'csv':
+            try:
+                column_map = json.loads(args['column_map']) if args['column_map'] else None
+            except ValueError:
+                transaction_import_api.abort(HTTPStatus.BAD_REQUEST, "'column_map' must be a JSON object.")
+            records = iter_csv_rows(lines, column_map)
+            date_format = args['date_format']
+        else:
+            records = iter_ofx_rows(lines)
+
+        summary = import_statement(session, records, args['chunk_size'],
+                                   defaults={'source': args['source'], 'type_name': args['type_name']},
+                                   date_format=date_format, dedupe=args['dedupe'])
+        summary["message"] = f"Imported {summary['inserted']} of {summary['rows']} transaction(s)." + \
+            ("" if summary["complete"] else " The rest of the statement could not be read.")
+        return summary, HTTPStatus.CREATED
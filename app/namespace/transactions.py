@@ -1,15 +1,23 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from http import HTTPStatus
 
-from flask import request
-from flask_restx import Resource, Namespace, fields
+from flask import Response, current_app, request, stream_with_context
+from flask_restx import Resource, Namespace, fields, inputs, marshal
 from sqlalchemy.exc import IntegrityError
 
 from app.constant.system_constants import SYSTEM_USER_NAME
-from app.controller.transaction_controller import add_transaction
-from app.db.models.models import TransactionModel, TransactionCategoryModel, TransactionTypeModel, \
-    TransactionSourceModel
+from app.controller.rollup_controller import transaction_day
+from app.controller.rule_controller import apply_rules
+from app.controller.search_controller import search_transactions, SEARCH_MODES, SEARCH_FILTER_FIELDS
+from app.controller.transaction_controller import add_transaction, parse_transaction_date, filter_by_period, \
+    period_start, keyset_page, ensure_lookup_values, bulk_add_transactions, transactions_written, \
+    bulk_update_transactions, bulk_delete_transactions, deduplicate_rows
+from app.db.models.models import TransactionModel
+from app.extension import db
 from app.lib.log_utils import logger
+from app.lib.data_version import TRANSACTIONS
+from app.lib.fingerprint import transaction_fingerprint
+from app.utils.conditional_get import conditional_get
 from app.utils.db_connection import DBSession
 
 transaction_api = Namespace(name="Transactions",
@@ -17,6 +25,14 @@ transaction_api = Namespace(name="Transactions",
                             description="Operations related to financial transactions",
                             strict_slashes=False)
 
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+SEARCH_PAGE_SIZE = 50
+MAX_REPORTED_CONFLICTS = 100
+DEDUPE_PARAM = 'dedupe'
+DEDUPE_PARAM_DOC = {'description': "Leave out transactions with the same date, amount, description and source as a "
+                                   "stored one. Defaults to false.", 'in': 'query', 'type': 'boolean'}
+
 # Model for creating or updating a transaction
 transaction_input_model = transaction_api.model('TransactionInput', {
     'transaction_date': fields.String(required=True, description='Date of the transaction (MM/DD/YYYY)',
@@ -44,79 +60,268 @@ transaction_output_model = transaction_api.model('TransactionOutput', {
     'modified_at': fields.DateTime(description='Last modification timestamp'),
 })
 
+# Models for the filtered bulk update and delete
+transaction_filter_model = transaction_api.model('TransactionFilter', {
+    'start_date': fields.String(description='First day included (YYYY-MM-DD)', example='2023-01-01'),
+    'end_date': fields.String(description='Last day included (YYYY-MM-DD)', example='2023-12-31'),
+    'description_like': fields.String(description='Case-insensitive LIKE pattern on the description',
+                                      example='%starbucks%'),
+    'source': fields.String(description='Current source', example='Visa'),
+    'category_level1': fields.String(description='Current primary category', example='Food'),
+    'category_level2': fields.String(description='Current secondary category', example='Restaurants'),
+    'type_name': fields.String(description='Current transaction type', example='Sale'),
+})
+
+transaction_bulk_update_model = transaction_api.model('TransactionBulkUpdate', {
+    'filter': fields.Nested(transaction_filter_model, required=True),
+    'changes': fields.Raw(required=True, description='New values of description, notes, category_level1, '
+                                                     'category_level2, type_name and/or source',
+                          example={'category_level2': 'Coffee'}),
+    'dry_run': fields.Boolean(default=False, description='Only count the matching transactions'),
+})
+
+transaction_bulk_delete_model = transaction_api.model('TransactionBulkDelete', {
+    'filter': fields.Nested(transaction_filter_model, required=True),
+    'dry_run': fields.Boolean(default=False, description='Only count the matching transactions'),
+})
+
+
+def _dedupe_summary(inserted, skipped, conflicts):
+    return {'inserted': inserted,
+            'skipped': skipped,
+            'conflicting': len(conflicts),
+            'conflicts': [{'row': index, 'transaction_id': transaction_id}
+                          for index, transaction_id in conflicts[:MAX_REPORTED_CONFLICTS]]}
+
+
+def _int_arg(name, default=None):
+    """An integer query argument, the default when it is absent; anything else is a 400."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        transaction_api.abort(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer.")
+
 
 @transaction_api.route('')
 class TransactionList(Resource):
     """Handles listing transactions and creating new ones in bulk."""
 
+    @conditional_get(TRANSACTIONS, vary=lambda: period_start(request.args.get("period", "All").strip()))
     @DBSession.class_method
     @transaction_api.marshal_list_with(transaction_output_model)
     @transaction_api.doc(params={
         'period': {'description': "Filter by period ('1Mo', '3Mo', '1Yr', etc.) or 'All'. Defaults to 'All'.",
+                   'in': 'query', 'type': 'string'},
+        'limit': {'description': f"Page size, at most {MAX_PAGE_SIZE}. Without it all records are returned.",
+                  'in': 'query', 'type': 'integer'},
+        'cursor': {'description': "Opaque cursor from the X-Next-Cursor header of the previous page.",
                    'in': 'query', 'type': 'string'}
     })
     def get(self, session):
         """Retrieves transaction records, optionally filtered by period.
+
+        With 'limit' the records are returned one page at a time, newest first. The X-Next-Cursor
+        response header carries the cursor of the next page and is absent on the last page.
         """
         period = request.args.get("period", "All").strip()
-        query = session.query(TransactionModel)
+        query = filter_by_period(session.query(TransactionModel), period)
 
-        period_map_days = {
-            '1Mo': 30, '3Mo': 90, '6Mo': 180, '1Yr': 365, '3Yr': 1095, '5Yr': 1825
-        }
-        days = period_map_days.get(period)
-        if days:
-            start_date = datetime.now() - timedelta(days=days)
-            query = query.filter(TransactionModel.transaction_date >= start_date)
-
-        return query.order_by(TransactionModel.transaction_date.desc()).all()
+        limit = _int_arg("limit")
+        if limit is None:
+            return query.order_by(TransactionModel.transaction_date.desc()).all()
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            transaction_api.abort(HTTPStatus.BAD_REQUEST, f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+        try:
+            page, next_cursor = keyset_page(query, limit, request.args.get("cursor"))
+        except ValueError as e:
+            transaction_api.abort(HTTPStatus.BAD_REQUEST, str(e))
+        return page, HTTPStatus.OK, {'X-Next-Cursor': next_cursor} if next_cursor else {}
 
     @DBSession.class_method
     @transaction_api.expect([transaction_input_model], validate=True)
+    @transaction_api.doc(params={DEDUPE_PARAM: DEDUPE_PARAM_DOC})
     def post(self, session):
-        """Creates one or more new transaction records in a single batch."""
+        """Creates one or more new transaction records in a single batch.
+
+        With 'dedupe' the transactions already stored, by date, amount, description and source, are
+        left out and counted as skipped, or as conflicting when their other fields differ.
+        """
         try:
             request_body = transaction_api.payload
+            dedupe = request.args.get(DEDUPE_PARAM, False, type=inputs.boolean)
 
-            # 1. Collect all unique, non-empty foreign key values from the payload
-            categories = set(d.get('category_level1') for d in request_body if d.get('category_level1'))
-            categories.update(d.get('category_level2') for d in request_body if d.get('category_level2'))
-            types = set(d.get('type_name') for d in request_body if d.get('type_name'))
-            sources = set(d.get('source') for d in request_body if d.get('source'))
-
-            # 2. Find which ones already exist in the database
-            existing_categories = {c.category for c in session.query(TransactionCategoryModel).filter(
-                TransactionCategoryModel.category.in_(categories))}
-            existing_types = {t.type_name for t in
-                              session.query(TransactionTypeModel).filter(TransactionTypeModel.type_name.in_(types))}
-            existing_sources = {s.source for s in session.query(TransactionSourceModel).filter(
-                TransactionSourceModel.source.in_(sources))}
-
-            # 3. Determine which ones are new and add them to the session
-            new_categories = [TransactionCategoryModel(category=c) for c in categories if c not in existing_categories]
-            new_types = [TransactionTypeModel(type_name=t) for t in types if t not in existing_types]
-            new_sources = [TransactionSourceModel(source=s) for s in sources if s not in existing_sources]
-
-            if new_categories:
-                logger.info(f"Creating new categories: {[c.category for c in new_categories]}")
-                session.add_all(new_categories)
-            if new_types:
-                logger.info(f"Creating new types: {[t.type_name for t in new_types]}")
-                session.add_all(new_types)
-            if new_sources:
-                logger.info(f"Creating new sources: {[s.source for s in new_sources]}")
-                session.add_all(new_sources)
-
-            for transaction_data in request_body:
-                add_transaction(session, transaction_data)
+            apply_rules(session, request_body)
+            skipped, conflicts = 0, []
+            if dedupe:
+                for transaction_data in request_body:
+                    transaction_data['fingerprint'] = transaction_fingerprint(
+                        parse_transaction_date(transaction_data['transaction_date']), transaction_data.get('amount'),
+                        transaction_data.get('description'), transaction_data.get('source'))
+                request_body, skipped, conflicts = deduplicate_rows(session, request_body)
+            ensure_lookup_values(session, request_body)
+            new_transactions = [add_transaction(session, transaction_data) for transaction_data in request_body]
+            if new_transactions:
+                session.flush()
+                transactions_written(session, {t.transaction_date for t in new_transactions},
+                                     [t.transaction_id for t in new_transactions])
 
             # The DBSession decorator will handle the commit
-            return {'message': f"Successfully processed {len(request_body)} transaction(s)."}, HTTPStatus.CREATED
+            response = {'message': f"Successfully processed {len(new_transactions)} transaction(s)."}
+            if dedupe:
+                response.update(_dedupe_summary(len(new_transactions), skipped, conflicts))
+            return response, HTTPStatus.CREATED
         except Exception as e:
             logger.error(f"Create transaction failed: {e}")
             transaction_api.abort(HTTPStatus.INTERNAL_SERVER_ERROR, f"Could not create transaction: {e}")
 
 
+@transaction_api.route('/bulk')
+class TransactionBulk(Resource):
+    """Handles high-volume transaction imports."""
+
+    @DBSession.class_method
+    @transaction_api.expect([transaction_input_model])
+    @transaction_api.doc(params={DEDUPE_PARAM: DEDUPE_PARAM_DOC})
+    def post(self, session):
+        """Creates a large batch of transaction records with multi-row INSERT statements.
+
+        The payload is validated and converted in one vectorized pass instead of per row by the
+        request parser, so malformed rows are reported together and nothing is inserted.
+        With 'dedupe' the transactions already stored are left out, as for POST /transaction, after
+        one indexed lookup of the whole batch's fingerprints.
+
+        Returns:
+            JSON: The number of inserted transactions and their generated IDs, and with 'dedupe' the
+            inserted, skipped and conflicting counts and the first conflicts.
+        """
+        request_body = transaction_api.payload
+        if not isinstance(request_body, list):
+            transaction_api.abort(HTTPStatus.BAD_REQUEST, "Request body must be a list of transactions.")
+        dedupe = request.args.get(DEDUPE_PARAM, False, type=inputs.boolean)
+        try:
+            result = bulk_add_transactions(session, request_body, dedupe)
+        except ValueError as e:
+            transaction_api.abort(HTTPStatus.BAD_REQUEST, str(e))
+        except IntegrityError as e:
+            transaction_api.abort(HTTPStatus.CONFLICT, f"Database integrity error: {e.orig}")
+        response = {'message': f"Successfully processed {len(result.transaction_ids)} transaction(s).",
+                    'count': len(result.transaction_ids),
+                    'transaction_ids': result.transaction_ids}
+        if dedupe:
+            response.update(_dedupe_summary(len(result.transaction_ids), result.skipped, result.conflicts))
+        return response, HTTPStatus.CREATED
+
+    @DBSession.class_method
+    @transaction_api.expect(transaction_bulk_update_model, validate=True)
+    def patch(self, session):
+        """Applies the same changes to every transaction matching a filter, in one UPDATE statement.
+
+        Returns:
+            JSON: The number of matched transactions and, unless dry_run is set, their IDs.
+        """
+        payload = transaction_api.payload
+        if not isinstance(payload['changes'], dict):
+            transaction_api.abort(HTTPStatus.BAD_REQUEST, "'changes' must be an object.")
+        try:
+            return bulk_update_transactions(session, payload['filter'], payload['changes'],
+                                            payload.get('dry_run', False)), HTTPStatus.OK
+        except ValueError as e:
+            transaction_api.abort(HTTPStatus.BAD_REQUEST, str(e))
+        except IntegrityError as e:
+            transaction_api.abort(HTTPStatus.CONFLICT, f"Database integrity error: {e.orig}")
+
+    @DBSession.class_method
+    @transaction_api.expect(transaction_bulk_delete_model, validate=True)
+    def delete(self, session):
+        """Deletes every transaction matching a filter, in one DELETE statement.
+
+        Returns:
+            JSON: The number of matched transactions and, unless dry_run is set, the IDs deleted.
+        """
+        payload = transaction_api.payload
+        try:
+            return bulk_delete_transactions(session, payload['filter'], payload.get('dry_run', False)), HTTPStatus.OK
+        except ValueError as e:
+            transaction_api.abort(HTTPStatus.BAD_REQUEST, str(e))
+
+
+@transaction_api.route('/search')
+class TransactionSearch(Resource):
+    """Handles text search over transaction descriptions and notes."""
+
+    @conditional_get(TRANSACTIONS)
+    @DBSession.class_method
+    @transaction_api.doc(params={
+        'q': {'description': "Text to find in the description or notes.", 'in': 'query', 'type': 'string',
+              'required': True},
+        'mode': {'description': f"One of {SEARCH_MODES}: words starting with the query words, the query "
+                                "anywhere, or words similar to the query words. Defaults to 'substring'.",
+                 'in': 'query', 'type': 'string'},
+        'start_date': {'description': "First day included (YYYY-MM-DD).", 'in': 'query', 'type': 'string'},
+        'end_date': {'description': "Last day included (YYYY-MM-DD).", 'in': 'query', 'type': 'string'},
+        'category_level1': {'description': "Primary category.", 'in': 'query', 'type': 'string'},
+        'category_level2': {'description': "Secondary category.", 'in': 'query', 'type': 'string'},
+        'source': {'description': "Source of funds.", 'in': 'query', 'type': 'string'},
+        'type_name': {'description': "Transaction type.", 'in': 'query', 'type': 'string'},
+        'limit': {'description': f"Page size, at most {MAX_PAGE_SIZE}. Defaults to {SEARCH_PAGE_SIZE}.",
+                  'in': 'query', 'type': 'integer'},
+        'offset': {'description': "Number of matches to skip.", 'in': 'query', 'type': 'integer'}
+    })
+    def get(self, session):
+        """Searches transactions by description and notes, best match first, then newest first.
+
+        Returns:
+            JSON: The total number of matches and the requested page of transactions with their
+            trigram similarity score to the query.
+        """
+        limit = _int_arg("limit", SEARCH_PAGE_SIZE)
+        offset = _int_arg("offset", 0)
+        if not 0 < limit <= MAX_PAGE_SIZE or offset < 0:
+            transaction_api.abort(HTTPStatus.BAD_REQUEST,
+                                  f"'limit' must be between 1 and {MAX_PAGE_SIZE} and 'offset' not negative.")
+        filters = {name: request.args.get(name) for name in SEARCH_FILTER_FIELDS}
+        try:
+            total, page = search_transactions(session, request.args.get("q", ""), request.args.get("mode", "substring"),
+                                              filters, limit, offset)
+        except ValueError as e:
+            transaction_api.abort(HTTPStatus.BAD_REQUEST, str(e))
+        return {'total': total,
+                'limit': limit,
+                'offset': offset,
+                'results': [dict(marshal(transaction, transaction_output_model), score=round(score, 4))
+                            for transaction, score in page]}, HTTPStatus.OK
+
+
+@transaction_api.route('/stream')
+class TransactionStream(Resource):
+    """Streams transactions as newline-delimited JSON."""
+
+    @transaction_api.doc(params={
+        'period': {'description': "Filter by period ('1Mo', '3Mo', '1Yr', etc.) or 'All'. Defaults to 'All'.",
+                   'in': 'query', 'type': 'string'}
+    })
+    def get(self):
+        """Streams transaction records, newest first, one JSON object per line.
+
+        Rows are read from a server-side cursor in batches of STREAM_BATCH_SIZE and written as they
+        arrive, so memory stays flat and the first bytes go out before the whole history is read.
+        """
+        period = request.args.get("period", "All").strip()
+        columns = [getattr(TransactionModel, name) for name in transaction_output_model]
+        query = filter_by_period(db.session.query(*columns), period)
+        query = query.order_by(TransactionModel.transaction_date.desc(), TransactionModel.transaction_id.desc())
+        query = query.execution_options(yield_per=STREAM_BATCH_SIZE)
+
+        def generate():
+            for row in query:
+                yield current_app.json.dumps(marshal(row, transaction_output_model)) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @transaction_api.route('/<int:transaction_id>')
 @transaction_api.response(HTTPStatus.NOT_FOUND, 'Transaction not found.')
 @transaction_api.param('transaction_id', 'The unique identifier of the transaction.')
@@ -141,14 +346,22 @@ class Transaction(Resource):
         if not transaction_to_update:
             transaction_api.abort(HTTPStatus.NOT_FOUND, f"Transaction with id {transaction_id} not found.")
 
+        previous_day = transaction_day(transaction_to_update.transaction_date)
         data = transaction_api.payload
         for key, value in data.items():
+            if key == 'transaction_date':
+                try:
+                    value = parse_transaction_date(value)
+                except ValueError:
+                    transaction_api.abort(HTTPStatus.BAD_REQUEST, f"Invalid transaction_date '{value}', "
+                                                                  f"expected MM/DD/YYYY.")
             setattr(transaction_to_update, key, value)
 
         transaction_to_update.modified_at = datetime.now()
         transaction_to_update.modified_by = SYSTEM_USER_NAME
 
         try:
+            transactions_written(session, {previous_day, transaction_to_update.transaction_date}, [transaction_id])
             session.commit()
             return transaction_to_update
         except IntegrityError as e:
@@ -165,6 +378,7 @@ class Transaction(Resource):
             transaction_api.abort(HTTPStatus.NOT_FOUND, f"Transaction with id {transaction_id} not found.")
         try:
             session.delete(transaction_to_delete)
+            transactions_written(session, {transaction_to_delete.transaction_date}, [transaction_id])
             return {"message": f"Transaction with id {transaction_id} deleted successfully."}, HTTPStatus.OK
         except Exception as e:
             transaction_api.abort(HTTPStatus.INTERNAL_SERVER_ERROR, f"Could not delete transaction: {e}")
@@ -1,7 +1,22 @@
+import argparse
+from datetime import datetime, timedelta
+from inspect import signature
+
 from dotenv import load_dotenv
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.schema import CreateIndex
 
 load_dotenv(dotenv_path='../../.env.local')
+from app.controller.change_controller import record_changes
+from app.controller.rollup_controller import rebuild_rollup, refresh_rollup
+from app.controller.rule_controller import rerun_rules
+from app.db.models.models import TransactionModel
+from app.db.partitioning import (PARTITION_INTERVALS, convert_to_partitioned, create_future_partitions,
+                                 detach_partitions, is_partitioned, partitions)
+from app.db.query_plans import explain_endpoints
 from app.extension import db
+from app.lib.data_version import TRANSACTIONS
+from app.lib.fingerprint import transaction_fingerprint
 from app.main import app
 
 
@@ -20,9 +35,225 @@ def drop_all_tables():
             print(f"An error occurred: {e}")
 
 
+def rebuild_spending_rollup():
+    """
+    Recomputes the daily_spending_rollup table from the transactions table in one DB transaction.
+    Run it once after creating the table, or whenever the rollup is suspected to be out of date.
+    """
+    with app.app_context():
+        try:
+            row_count = rebuild_rollup(db.session)
+            record_changes(db.session, TRANSACTIONS)
+            db.session.commit()
+            print(f"Rebuilt spending rollup with {row_count} row(s).")
+        except Exception as e:
+            db.session.rollback()
+            print(f"An error occurred: {e}")
+
+
+def _print_plans(title, plans):
+    print(f"===== {title} =====")
+    for name, plan in plans.items():
+        print(f"--- {name}")
+        for line in plan:
+            print(f"    {line}")
+
+
+def _created_on(index, dialect_name):
+    """Whether create_all builds the index on the dialect, i.e. its ddl_if(dialect=...), if any, names it."""
+    ddl_if = index._ddl_if
+    if ddl_if is None or ddl_if.dialect is None:
+        return True
+    return dialect_name == ddl_if.dialect if isinstance(ddl_if.dialect, str) else dialect_name in ddl_if.dialect
+
+
+def migrate_indexes():
+    """
+    Creates the indexes declared on TransactionModel that the database does not have yet, leaving
+    out the ones declared for another dialect only, and prints the EXPLAIN plan of every read
+    endpoint's query before and after.
+    On Postgres the indexes are built CONCURRENTLY so the table stays writable meanwhile, except on
+    a partitioned table, which does not support it.
+    """
+    with app.app_context():
+        try:
+            _print_plans("Plans before migration", explain_endpoints(db.session))
+            db.session.rollback()
+
+            engine = db.engine
+            is_postgres = engine.dialect.name == 'postgresql'
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                concurrently = is_postgres and not is_partitioned(connection)
+                if is_postgres:
+                    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                for index in sorted(TransactionModel.__table__.indexes, key=lambda i: i.name):
+                    if not _created_on(index, connection.dialect.name):
+                        print(f"Skipping index {index.name}, not used on {connection.dialect.name}")
+                        continue
+                    print(f"Creating index {index.name} if missing")
+                    create = CreateIndex(index, if_not_exists=True)
+                    if concurrently:
+                        # Added to the compiled statement, since flagging the Index itself would also make
+                        # create_all and the partition conversion build it CONCURRENTLY
+                        statement = str(create.compile(dialect=connection.dialect))
+                        connection.exec_driver_sql(statement.replace("INDEX ", "INDEX CONCURRENTLY ", 1))
+                    else:
+                        connection.execute(create)
+                connection.execute(text("ANALYZE public.transactions" if is_postgres else "ANALYZE"))
+
+            _print_plans("Plans after migration", explain_endpoints(db.session))
+        except Exception as e:
+            db.session.rollback()
+            print(f"An error occurred: {e}")
+
+
+def backfill_fingerprints(chunk_size=10000):
+    """
+    Adds the fingerprint column to an existing transactions table and fills it in for the rows that
+    have none, chunk by chunk in ascending ID order, committing every chunk. Run migrate_indexes
+    afterwards to add its index.
+    """
+    with app.app_context():
+        try:
+            table = TransactionModel.__table__
+            columns = {c['name'] for c in inspect(db.engine).get_columns(table.name, schema=table.schema)}
+            if 'fingerprint' not in columns:
+                db.session.execute(text(f"ALTER TABLE {table.schema}.{table.name} ADD COLUMN fingerprint VARCHAR(32)"))
+                db.session.commit()
+                print("Added column transactions.fingerprint")
+
+            model = TransactionModel
+            filled, last_id = 0, 0
+            statement = update(table).where(model.transaction_id == bindparam('b_transaction_id')) \
+                .values(fingerprint=bindparam('b_fingerprint'))
+            while True:
+                rows = db.session.execute(
+                    select(model.transaction_id, model.transaction_date, model.amount, model.description,
+                           model.source)
+                    .where(model.fingerprint.is_(None), model.transaction_id > last_id)
+                    .order_by(model.transaction_id).limit(chunk_size)).all()
+                if not rows:
+                    break
+                db.session.execute(statement, [{'b_transaction_id': transaction_id,
+                                                'b_fingerprint': transaction_fingerprint(*values)}
+                                               for transaction_id, *values in rows])
+                db.session.commit()
+                filled += len(rows)
+                last_id = rows[-1][0]
+            print(f"Filled in the fingerprint of {filled} transaction(s).")
+        except Exception as e:
+            db.session.rollback()
+            print(f"An error occurred: {e}")
+
+
+def apply_categorization_rules():
+    """
+    Re-runs the categorization rules over every uncategorized transaction, e.g. after adding rules,
+    and prints how many rows were scanned and changed and the rows/s achieved.
+    """
+    with app.app_context():
+        try:
+            result = rerun_rules(db.session)
+            db.session.commit()
+            print(f"Categorized {result['changed']} of {result['scanned']} transaction(s) with {result['rules']} "
+                  f"rule(s) in {result['seconds']}s ({result['rows_per_second']} rows/s).")
+        except Exception as e:
+            db.session.rollback()
+            print(f"An error occurred: {e}")
+
+
+def _require_postgres():
+    if db.engine.dialect.name != 'postgresql':
+        raise RuntimeError("Partitioning needs Postgres.")
+
+
+def partition_transactions(interval='year', ahead=None, default=True):
+    """
+    Converts the transactions table to range partitions by year or month of transaction_date, with
+    partitions up to 'ahead' intervals past the current one and, unless 'default' is false, a
+    DEFAULT partition, and prints the plans of the read endpoints afterwards. Locks the table for
+    the duration of the copy; run it in a maintenance window.
+    """
+    with app.app_context():
+        try:
+            _require_postgres()
+            with db.engine.connect() as connection:
+                created = convert_to_partitioned(connection, interval, ahead, default)
+            print(f"Partitioned transactions by {interval} into {len(created)} partition(s): {', '.join(created)}")
+            print("The previous table is kept as public.transactions_unpartitioned; drop it once verified.")
+            _print_plans("Plans after partitioning", explain_endpoints(db.session))
+        except Exception as e:
+            db.session.rollback()
+            print(f"An error occurred: {e}")
+
+
+def create_partitions(ahead=None):
+    """
+    Creates the partitions of the coming years or months that do not exist yet. Idempotent; schedule
+    it (e.g. daily from cron) so that new transactions never land in the DEFAULT partition.
+    """
+    with app.app_context():
+        try:
+            _require_postgres()
+            with db.engine.connect() as connection:
+                created = create_future_partitions(connection, ahead)
+            print(f"Created {len(created)} partition(s){': ' + ', '.join(created) if created else ''}.")
+        except Exception as e:
+            print(f"An error occurred: {e}")
+
+
+def detach_old_partitions(before=None):
+    """
+    Detaches the partitions holding only transactions dated before 'before' (YYYY-MM-DD) for
+    archival, then recomputes the spending rollup of their days so the statistics stop counting them.
+    """
+    with app.app_context():
+        try:
+            _require_postgres()
+            if not before:
+                raise ValueError("--before YYYY-MM-DD is required.")
+            before = datetime.strptime(before, '%Y-%m-%d')
+            with db.engine.connect() as connection:
+                bounds = {p.name: p for p in partitions(connection)}
+            detached = detach_partitions(db.engine, before)
+            if detached:
+                first = min(bounds[name].start for name in detached).date()
+                last = max(bounds[name].end for name in detached).date()
+                refresh_rollup(db.session, {first + timedelta(days=i) for i in range((last - first).days)})
+                record_changes(db.session, TRANSACTIONS)
+                db.session.commit()
+            print(f"Detached {len(detached)} partition(s){': ' + ', '.join(detached) if detached else ''}.")
+            if detached:
+                print("Archive them, e.g. with pg_dump -t, and DROP TABLE them afterwards.")
+        except Exception as e:
+            db.session.rollback()
+            print(f"An error occurred: {e}")
+
+
+COMMANDS = {
+    "create_all": drop_all_tables,
+    "rebuild_rollup": rebuild_spending_rollup,
+    "migrate_indexes": migrate_indexes,
+    "apply_rules": apply_categorization_rules,
+    "backfill_fingerprints": backfill_fingerprints,
+    "partition": partition_transactions,
+    "create_partitions": create_partitions,
+    "detach_partitions": detach_old_partitions,
+}
+
 if __name__ == "__main__":
     """
-    This script provides a command-line interface to drop all tables.
-    It includes a confirmation step to prevent accidental data loss.
+    This script provides a command-line interface for database maintenance.
+    Without a command it creates any missing tables.
     """
-    drop_all_tables()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Database management commands.")
+    parser.add_argument("command", nargs="?", default="create_all", choices=COMMANDS.keys())
+    parser.add_argument("--interval", choices=PARTITION_INTERVALS, help="partition: size of every partition")
+    parser.add_argument("--ahead", type=int, help="partition, create_partitions: future partitions to keep")
+    parser.add_argument("--before", help="detach_partitions: detach partitions ending on or before YYYY-MM-DD")
+    parser.add_argument("--no-default", dest="default", action="store_false",
+                        help="partition: no DEFAULT partition; out-of-range rows are rejected, detaching is concurrent")
+    args = vars(parser.parse_args())
+    command = COMMANDS[args.pop("command")]
+    # Every command only receives the options it takes
+    command(**{k: v for k, v in args.items() if v is not None and k in signature(command).parameters})
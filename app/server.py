@@ -1,16 +1,49 @@
+import os
+import weakref
+
 from flask import Flask
 
 from app.apis import init_api
 from app.config import envs
-from app.extension import init_ext, api
-from app.lib.json_processor import CustomJSONProvider
+from app.extension import init_ext, api, db
+from app.lib.json_processor import CustomJSONProvider, output_json
+from app.utils.db_connection import slow_query_log
+from app.utils.request_metrics import init_request_metrics
+
+
+# The apps created in this process, for the fork hook registered once below
+_apps = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    """
+    Makes apps created before forking (e.g. gunicorn --preload) safe to use in the worker:
+    connections the parent may have opened are dropped without closing them, as they belong to
+    the parent, so each worker opens its own.
+    """
+    for app in list(_apps):
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
 
 
 def create_app(environment):
+    """
+    Builds the application. Nothing here opens a database connection or starts a thread, so the
+    app can be created once in a pre-forking server's master process and shared by its workers.
+    """
     print("create application")
     app = Flask(__name__)
-    app.config.from_object(envs.get(environment))
+    app.config.from_object(envs.get(environment)())
     app.json = CustomJSONProvider(app)
+    api.representation('application/json')(output_json)
     init_api(api)
     init_ext(app)
-    return app
\ No newline at end of file
+    init_request_metrics(app)
+    slow_query_log.init_app(app)
+    _apps.add(app)
+    return app
@@ -0,0 +1,42 @@
+import hashlib
+from functools import wraps
+
+from flask import Response, after_this_request, request
+
+from app.controller.change_controller import table_versions
+from app.extension import db
+
+
+def conditional_get(*tables, vary=None):
+    """
+    Adds an ETag to a GET handler whose response only depends on the request and the named tables.
+    The tag is derived from the tables' write counters, so a request whose If-None-Match matches
+    is answered 304 Not Modified after one primary-key lookup, without running the handler.
+
+    vary, when given, is called per request for whatever else the response depends on, e.g. the
+    start of a window relative to today; its result is part of the tag.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def inner_func(*args, **kwargs):
+            versions = table_versions(db.session, tables)
+            fingerprint = f"{request.full_path}|{versions}|{vary() if vary else None}".encode()
+            etag = hashlib.sha1(fingerprint).hexdigest()[:24]
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            @after_this_request
+            def add_etag(response):
+                if response.status_code == 200:
+                    response.set_etag(etag)
+                    response.headers['Cache-Control'] = 'no-cache'
+                return response
+
+            return func(*args, **kwargs)
+
+        return inner_func
+
+    return decorator
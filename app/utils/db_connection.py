@@ -1,14 +1,38 @@
+import json
+import logging
+import random
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
 from app.extension import db
+from app.utils.request_metrics import timed
+
+slow_query_logger = logging.getLogger('app.slow_query')
+
+_SLOW_QUERY_STARTED_KEY = 'slow_query_started'
+_EXPLAIN_SAVEPOINT = 'slow_query_explain'
 
 
 class DBSession:
+    """
+    Runs a handler with the request's session and commits after it, or rolls back when it raises.
+    The session routes itself (see app/utils/db_routing.py): with a read replica configured, the
+    reads of GET requests go to the replica unless it lags or the client just wrote, and all
+    other requests and every write go to the primary.
+    """
+
     @staticmethod
     def func(func):
         def inner_func(*args, **kwargs):
             session = db.session()
             try:
                 res = func(session, *args, **kwargs)
-                session.commit()
+                with timed('commit'):
+                    session.commit()
             except Exception:
                 session.rollback()
                 raise
@@ -22,10 +46,103 @@ class DBSession:
             session = db.session()
             try:
                 res = func(self, session, *args, **kwargs)
-                session.commit()
+                with timed('commit'):
+                    session.commit()
             except Exception:
                 session.rollback()
                 raise
             return res
 
-        return inner_func
\ No newline at end of file
+        return inner_func
+
+
+class SlowQueryLog:
+    """
+    Logs every statement slower than SLOW_QUERY_THRESHOLD_MS as one JSON line holding the SQL, its
+    bound parameters, its duration and the endpoint that ran it, to the 'app.slow_query' logger
+    and, with SLOW_QUERY_LOG_FILE, to a size-rotated file.
+
+    On Postgres a SLOW_QUERY_EXPLAIN_RATE fraction of the slow SELECTs is run again under
+    EXPLAIN (ANALYZE, BUFFERS) inside a savepoint of the same transaction and the plan is added to
+    the entry. ANALYZE executes the query a second time, so keep the rate low.
+    """
+
+    def __init__(self):
+        self.threshold = None
+        self.explain_rate = 0.0
+        self.log_parameters = True
+        self.max_parameters_length = 1000
+
+    def init_app(self, app):
+        threshold_ms = app.config.get("SLOW_QUERY_THRESHOLD_MS")
+        if threshold_ms is None or threshold_ms < 0:
+            return
+        self.threshold = threshold_ms / 1000
+        self.explain_rate = app.config.get("SLOW_QUERY_EXPLAIN_RATE", 0.0)
+        self.log_parameters = app.config.get("SLOW_QUERY_LOG_PARAMETERS", True)
+        log_file = app.config.get("SLOW_QUERY_LOG_FILE")
+        if log_file and not any(getattr(h, 'baseFilename', None) == log_file for h in slow_query_logger.handlers):
+            handler = RotatingFileHandler(log_file, maxBytes=app.config.get("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024),
+                                          backupCount=app.config.get("SLOW_QUERY_LOG_BACKUP_COUNT", 5))
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            slow_query_logger.addHandler(handler)
+        with app.app_context():
+            for engine in db.engines.values():
+                if not event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+                    event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                    event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+                    event.listen(engine, 'handle_error', self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_SLOW_QUERY_STARTED_KEY, []).append(time.perf_counter())
+
+    def _handle_error(self, exception_context):
+        started_stack = exception_context.connection.info.get(_SLOW_QUERY_STARTED_KEY) \
+            if exception_context.connection is not None else None
+        if started_stack:
+            started_stack.pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started_stack = conn.info.get(_SLOW_QUERY_STARTED_KEY)
+        if not started_stack:
+            return
+        duration = time.perf_counter() - started_stack.pop()
+        if duration < self.threshold:
+            return
+        entry = {"logged_at": datetime.now().isoformat(),
+                 "duration_ms": round(duration * 1000, 3),
+                 "endpoint": f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+                 if has_request_context() else None,
+                 "dialect": conn.dialect.name,
+                 "executemany": executemany,
+                 "rowcount": cursor.rowcount,
+                 "statement": statement}
+        if self.log_parameters:
+            entry["parameters"] = repr(parameters)[:self.max_parameters_length]
+        if self._should_explain(conn, statement, executemany):
+            entry["plan"] = self._explain(conn, statement, parameters)
+        slow_query_logger.warning(json.dumps(entry, default=str))
+
+    def _should_explain(self, conn, statement, executemany):
+        return (self.explain_rate > 0 and conn.dialect.name == 'postgresql' and not executemany
+                and conn.in_transaction() and statement.lstrip()[:6].upper() == 'SELECT'
+                and random.random() < self.explain_rate)
+
+    def _explain(self, conn, statement, parameters):
+        """Runs the statement again under EXPLAIN ANALYZE; a savepoint keeps a failure from aborting the transaction."""
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+                plan = cursor.fetchone()[0]
+                cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+                return plan
+            except Exception as e:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+                return f"EXPLAIN failed: {e}"
+        finally:
+            cursor.close()
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """Thread-safe counters describing how connections are checked out of a pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.connect_seconds_total = 0.0
+
+    def record_checkout(self, seconds, waited, timed_out):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.checkout_seconds_total += seconds
+                self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+            if waited:
+                self.waits += 1
+                self.wait_seconds_total += seconds
+
+    def record_connect(self, seconds):
+        with self._lock:
+            self.connects += 1
+            self.connect_seconds_total += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_ms_avg": 1000 * self.checkout_seconds_total / self.checkouts if self.checkouts else 0.0,
+                "checkout_ms_max": 1000 * self.checkout_seconds_max,
+                "waits": self.waits,
+                "wait_ms_total": 1000 * self.wait_seconds_total,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "connect_ms_avg": 1000 * self.connect_seconds_total / self.connects if self.connects else 0.0,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records checkout latency, time spent waiting for a free connection
+    once pool_size + max_overflow connections are in use, and new connection setup time.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        # Mirrors QueuePool._do_get: a checkout blocks only when no connection is idle and the
+        # overflow is exhausted
+        waited = self._pool.empty() and -1 < self._max_overflow <= self._overflow
+        started = time.perf_counter()
+        timed_out = True
+        try:
+            connection = super()._do_get()
+            timed_out = False
+            return connection
+        finally:
+            self.metrics.record_checkout(time.perf_counter() - started, waited, timed_out)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        connection = super()._create_connection()
+        self.metrics.record_connect(time.perf_counter() - started)
+        return connection
+
+
+def pool_status(pool):
+    """Returns the live state of an engine's pool together with its checkout metrics when instrumented."""
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({"size": pool.size(),
+                       "checked_in": pool.checkedin(),
+                       "checked_out": pool.checkedout(),
+                       "overflow": pool.overflow(),
+                       "max_overflow": pool._max_overflow,
+                       "timeout": pool.timeout()})
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.metrics.snapshot())
+    return status
@@ -0,0 +1,204 @@
+"""
+Read/write routing between the primary database and an optional read replica.
+
+With DB_REPLICA_URI set, the SQLAlchemy bind 'replica' is a second, read-only engine. The session
+class of the 'db' extension, RoutingSession, sends the reads of GET and HEAD requests there (which
+includes every statistics endpoint) and everything else, as well as every flush and
+INSERT/UPDATE/DELETE, to the primary. The route is chosen once per session, i.e. per request, so
+a request never mixes the two; the queries of a statistics batch take the batch's read_route.
+
+A request still reads from the primary when
+  - the replica lags by more than DB_REPLICA_MAX_LAG_SECONDS or cannot be reached. The lag is
+    measured at most every DB_REPLICA_LAG_CHECK_SECONDS: on a Postgres standby as the age of the
+    last replayed transaction while WAL is still waiting to be replayed; elsewhere by comparing
+    both databases' table_version counters, as the time since the replica's last applied write to
+    any table the primary has written since. Both never report less than the oldest missing write,
+    so a replica that keeps falling behind under steady ingest is detected,
+  - it carries the read-your-writes cookie, set on every response to a request that wrote and
+    valid for DB_REPLICA_STICKY_SECONDS, or the X-Read-Primary: true header.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import select, text
+from sqlalchemy.sql.dml import UpdateBase
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+PRIMARY = 'primary'
+REPLICA = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+STICKY_COOKIE = 'db_primary_until'
+READ_PRIMARY_HEADER = 'X-Read-Primary'
+
+_ROUTE_KEY = 'db_route'
+_WROTE_KEY = 'db_wrote'
+
+
+class ReplicaRouter:
+    """Decides per request whether its reads may go to the replica and keeps the replica lag current."""
+
+    def __init__(self):
+        self.enabled = False
+        self.max_lag = 5.0
+        self.check_interval = 1.0
+        self.sticky_seconds = 10.0
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self.lag = None
+        self.checked_at = None
+        self.routed = {PRIMARY: 0, REPLICA: 0}
+        self.fallbacks = {"lag": 0, "sticky": 0}
+
+    def init_app(self, app):
+        self.enabled = REPLICA_BIND in (app.config.get("SQLALCHEMY_BINDS") or {})
+        self.max_lag = app.config.get("DB_REPLICA_MAX_LAG_SECONDS", 5.0)
+        self.check_interval = app.config.get("DB_REPLICA_LAG_CHECK_SECONDS", 1.0)
+        self.sticky_seconds = app.config.get("DB_REPLICA_STICKY_SECONDS", 10.0)
+        if self.enabled:
+            app.after_request(self._set_sticky_cookie)
+
+    def route(self, db):
+        """PRIMARY or REPLICA for the session about to run the current request's first statement."""
+        if not self.enabled or not has_request_context() or request.method not in READ_METHODS:
+            return PRIMARY
+        return self.read_route(db)
+
+    def read_route(self, db):
+        """
+        PRIMARY or REPLICA for read-only work of the current request whatever its method, e.g. the
+        queries a statistics batch runs on other threads, see use_route.
+        """
+        if not self.enabled or not has_request_context():
+            return PRIMARY
+        fallback = None
+        if self._sticky():
+            fallback = "sticky"
+        elif (lag := self.lag_seconds(db)) is None or lag > self.max_lag:
+            fallback = "lag"
+        route = PRIMARY if fallback else REPLICA
+        with self._counter_lock:
+            if fallback:
+                self.fallbacks[fallback] += 1
+            self.routed[route] += 1
+        setattr(g, _ROUTE_KEY, route)
+        return route
+
+    def _sticky(self):
+        if request.headers.get(READ_PRIMARY_HEADER, '').lower() == 'true':
+            return True
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _set_sticky_cookie(self, response):
+        if g.get(_WROTE_KEY):
+            until = time.time() + self.sticky_seconds
+            response.set_cookie(STICKY_COOKIE, f"{until:.3f}", max_age=int(self.sticky_seconds) + 1,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def lag_seconds(self, db):
+        """
+        The replica lag in seconds, None when it could not be measured. Re-measured at most every
+        check_interval; a request arriving while another measures uses the previous value.
+        """
+        now = time.monotonic()
+        if (self.checked_at is None or now - self.checked_at >= self.check_interval) \
+                and self._lock.acquire(blocking=False):
+            try:
+                self._measure(db)
+                self.checked_at = now
+            finally:
+                self._lock.release()
+        return self.lag
+
+    def _measure(self, db):
+        try:
+            with db.engines[REPLICA_BIND].connect() as connection:
+                lag = _standby_lag(connection) if connection.dialect.name == 'postgresql' else None
+                if lag is None:
+                    lag = _counter_lag(db, connection)
+        except Exception as e:
+            logger.warning(f"Could not measure the replica lag: {e}")
+            lag = None
+        self.lag = lag
+
+    def stats(self, db):
+        from app.utils.db_pool import pool_status
+
+        with self._counter_lock:
+            routed, fallbacks = dict(self.routed), dict(self.fallbacks)
+        return {"enabled": self.enabled,
+                "lag_seconds": self.lag,
+                "max_lag_seconds": self.max_lag,
+                "routed": routed,
+                "primary_fallbacks": fallbacks,
+                "replica_pool": pool_status(db.engines[REPLICA_BIND].pool) if self.enabled else None}
+
+
+def _standby_lag(connection):
+    """
+    Seconds since the last transaction a Postgres hot standby replayed, 0 when every WAL record it
+    received is replayed, None when the replica is not a standby or has replayed nothing yet.
+    """
+    return connection.execute(text("""
+        SELECT CASE WHEN NOT pg_is_in_recovery() THEN NULL
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END""")).scalar()
+
+
+def _counter_lag(db, replica_connection):
+    """
+    The lag from the table_version write counters: for every table the replica has an older
+    version of, the time since the replica's own last write to it, which precedes the oldest write
+    it is missing. None when the replica lacks a table the primary has written.
+    """
+    from app.db.models.models import TableVersionModel
+
+    statement = select(TableVersionModel.table_name, TableVersionModel.version, TableVersionModel.modified_at)
+    replica = {name: (version, modified_at) for name, version, modified_at in replica_connection.execute(statement)}
+    with db.engine.connect() as connection:
+        primary = {name: version for name, version, _ in connection.execute(statement)}
+    now, lag = datetime.now(), 0.0
+    for name, version in primary.items():
+        if name not in replica:
+            return None
+        replica_version, modified_at = replica[name]
+        if replica_version < version:
+            lag = max(lag, (now - modified_at).total_seconds())
+    return lag
+
+
+replica_router = ReplicaRouter()
+
+
+def use_route(session, route):
+    """Makes every read of the session, before its first statement, go where route (PRIMARY or REPLICA) says."""
+    session.info[_ROUTE_KEY] = route
+
+
+class RoutingSession(Session):
+    """
+    The session of the 'db' extension. Flushes and INSERT/UPDATE/DELETE statements always run on
+    the primary; any other statement runs where replica_router routed the session's first one.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                if has_request_context():
+                    setattr(g, _WROTE_KEY, True)
+            else:
+                route = self.info.get(_ROUTE_KEY)
+                if route is None:
+                    route = self.info[_ROUTE_KEY] = replica_router.route(self._db)
+                if route == REPLICA:
+                    return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,212 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+# Upper bounds of the request latency histogram, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_STATEMENT_STARTED_KEY = 'request_metrics_started'
+
+
+class RequestSample:
+    """What one request spent its time on, filled in while it runs."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.orm_objects = 0
+        self.serialize_seconds = 0.0
+        self.commit_seconds = 0.0
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.statuses = {}
+        self.requests = 0
+        self.seconds = 0.0
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.orm_objects = 0
+        self.serialize_seconds = 0.0
+        self.commit_seconds = 0.0
+        self.response_bytes = 0
+
+
+class RequestMetrics:
+    """Thread-safe per-endpoint aggregates of the request samples of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, method, status, seconds, sample, response_bytes):
+        with self._lock:
+            metrics = self._endpoints.get((endpoint, method))
+            if metrics is None:
+                metrics = self._endpoints[(endpoint, method)] = EndpointMetrics()
+            metrics.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.requests += 1
+            metrics.seconds += seconds
+            metrics.statements += sample.statements
+            metrics.sql_seconds += sample.sql_seconds
+            metrics.rows += sample.rows
+            metrics.orm_objects += sample.orm_objects
+            metrics.serialize_seconds += sample.serialize_seconds
+            metrics.commit_seconds += sample.commit_seconds
+            metrics.response_bytes += response_bytes or 0
+
+    def prometheus(self):
+        """Renders the aggregates in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+        lines = []
+
+        def family(name, kind, description):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def labels(endpoint, method, **extra):
+            pairs = dict(endpoint=endpoint, method=method, **extra)
+            return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + '}'
+
+        family('http_request_duration_seconds', 'histogram', 'Request latency by endpoint.')
+        for (endpoint, method), m in endpoints:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), m.buckets):
+                cumulative += count
+                lines.append(f"http_request_duration_seconds_bucket{labels(endpoint, method, le=bound)} {cumulative}")
+            lines.append(f"http_request_duration_seconds_sum{labels(endpoint, method)} {m.seconds}")
+            lines.append(f"http_request_duration_seconds_count{labels(endpoint, method)} {m.requests}")
+
+        family('http_requests_total', 'counter', 'Requests by endpoint and status code.')
+        for (endpoint, method), m in endpoints:
+            for status, count in sorted(m.statuses.items()):
+                lines.append(f"http_requests_total{labels(endpoint, method, status=status)} {count}")
+
+        counters = [('db_statements_total', 'statements', 'SQL statements executed.'),
+                    ('db_statement_seconds_total', 'sql_seconds', 'Time spent executing SQL statements.'),
+                    ('db_rows_total', 'rows', 'Rows returned or affected, as reported by the driver.'),
+                    ('orm_objects_loaded_total', 'orm_objects', 'ORM instances hydrated from result rows.'),
+                    ('response_serialization_seconds_total', 'serialize_seconds', 'Time spent encoding JSON.'),
+                    ('db_commit_seconds_total', 'commit_seconds', 'Time spent flushing and committing sessions.'),
+                    ('http_response_bytes_total', 'response_bytes', 'Response body bytes, when known up front.')]
+        for name, attribute, description in counters:
+            family(name, 'counter', description)
+            for (endpoint, method), m in endpoints:
+                lines.append(f"{name}{labels(endpoint, method)} {getattr(m, attribute)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_metrics = RequestMetrics()
+
+
+def current_sample():
+    """Returns the sample of the request being served, or None outside of an instrumented request."""
+    if not has_request_context():
+        return None
+    return g.get('request_sample')
+
+
+@contextmanager
+def timed(phase):
+    """Adds the time spent in the block to the '<phase>_seconds' of the current request sample, if any."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample = current_sample()
+        if sample is not None:
+            setattr(sample, f"{phase}_seconds", getattr(sample, f"{phase}_seconds") + time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_STATEMENT_STARTED_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_stack = conn.info.get(_STATEMENT_STARTED_KEY)
+    if not started_stack:
+        return
+    started = started_stack.pop()
+    sample = current_sample()
+    if sample is not None:
+        sample.statements += 1
+        sample.sql_seconds += time.perf_counter() - started
+        sample.rows += max(cursor.rowcount, 0)
+
+
+def _handle_error(exception_context):
+    started_stack = exception_context.connection.info.get(_STATEMENT_STARTED_KEY) \
+        if exception_context.connection is not None else None
+    if started_stack:
+        started_stack.pop()
+
+
+def _on_load(target, context):
+    sample = current_sample()
+    if sample is not None:
+        sample.orm_objects += 1
+
+
+_listening = False
+
+
+def _listen():
+    """Attaches the SQL and ORM listeners once per process; they cover every engine and mapped class."""
+    global _listening
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+        event.listen(Mapper, 'load', _on_load)
+        _listening = True
+
+
+def init_request_metrics(app):
+    """
+    Instruments every request of the app: latency, SQL statements and their time and rows, ORM
+    objects loaded, JSON encoding and commit time and response size are aggregated per endpoint
+    for /metrics. With SERVER_TIMING_ENABLED the request's own figures are also returned in a
+    Server-Timing header.
+    """
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+    _listen()
+    server_timing = app.config.get("SERVER_TIMING_ENABLED", False)
+
+    @app.before_request
+    def start_sample():
+        g.request_sample = RequestSample()
+
+    @app.after_request
+    def record_sample(response):
+        sample = g.pop('request_sample', None)
+        if sample is None:
+            return response
+        seconds = time.perf_counter() - sample.started
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_metrics.record(endpoint, request.method, response.status_code, seconds, sample,
+                               response.calculate_content_length())
+        if server_timing:
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={sample.sql_seconds * 1000:.2f};desc="{sample.statements} statements, {sample.rows} rows"',
+                f'orm;desc="{sample.orm_objects} objects"',
+                f'serialize;dur={sample.serialize_seconds * 1000:.2f}',
+                f'commit;dur={sample.commit_seconds * 1000:.2f}',
+                f'total;dur={seconds * 1000:.2f}'])
+        return response
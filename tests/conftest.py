@@ -0,0 +1,115 @@
+"""
+The tests share one app, since the flask-restx Api and the SQLAlchemy extension are module-level,
+on SQLite files: the primary, and a replica that test_db_routing fills by copying the primary. The
+models live in the 'public' schema, so each connection attaches a second file under that name, as
+the benchmarks do.
+
+Between tests every table is emptied and every table_version counter bumped, like any other write,
+so the per-process caches validated against the counters never serve a previous test's data.
+"""
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import config
+from app.controller.change_controller import record_changes
+from app.db.models.models import TableVersionModel
+from app.extension import db
+from app.lib.data_version import DATA_SETS
+
+
+@event.listens_for(Engine, "connect")
+def _attach_public_schema(dbapi_connection, connection_record):
+    if 'sqlite' in type(dbapi_connection).__module__:
+        main = dbapi_connection.execute("PRAGMA database_list").fetchone()[2]
+        dbapi_connection.execute(f"ATTACH DATABASE '{main}-public' AS public")
+
+
+@pytest.fixture(scope='session')
+def database_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp('db')
+
+
+@pytest.fixture(scope='session')
+def app(database_dir):
+    from app.server import create_app
+    from app.utils.db_routing import replica_router
+
+    class TestConfig(config.BaseConfig):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{database_dir}/primary.db"
+        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"check_same_thread": False, "timeout": 30}}
+        SQLALCHEMY_BINDS = {"replica": {"url": f"sqlite:///{database_dir}/replica.db",
+                                        "connect_args": {"check_same_thread": False, "timeout": 30}}}
+        STATISTICS_SOURCE = 'rollup'
+        RESPONSE_CACHE_ENABLED = True
+        SLOW_QUERY_THRESHOLD_MS = -1
+
+    config.envs['test'] = TestConfig
+    app = create_app('test')
+    with app.app_context():
+        db.create_all(bind_key=None)
+    # Reads only go to the replica in the tests that ask for it, see the routing fixture of test_db_routing
+    replica_router.enabled = False
+    return app
+
+
+@pytest.fixture(autouse=True)
+def empty_database(app):
+    yield
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            if table is not TableVersionModel.__table__:
+                db.session.execute(table.delete())
+        record_changes(db.session, *DATA_SETS)
+        db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def replicate(app, database_dir):
+    """Copies the primary database files over the replica ones, i.e. lets the replica catch up."""
+
+    def copy():
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        for suffix in ('', '-public'):
+            source = sqlite3.connect(f"{database_dir}/primary.db{suffix}")
+            target = sqlite3.connect(f"{database_dir}/replica.db{suffix}")
+            source.backup(target)
+            source.close()
+            target.close()
+
+    return copy
+
+
+@pytest.fixture
+def make_transaction():
+    """Builds a POST /transaction payload row dated day (YYYY-MM-DD)."""
+
+    def factory(day, amount, description='Purchase', **fields):
+        year, month, day_of_month = day.split('-')
+        return dict({'transaction_date': f"{month}/{day_of_month}/{year}", 'description': description,
+                     'amount': amount, 'type_name': 'Sale', 'source': 'Visa'}, **fields)
+
+    return factory
+
+
+@pytest.fixture
+def rollup_groups(app):
+    """Returns the per day, category and source groups of all transactions, from the rollup and from a scan."""
+    from app.controller.statistics_controller import aggregate
+
+    def groups(source):
+        with app.app_context():
+            return aggregate(db.session, ['date', 'category_level2', 'source'], by='day', type_name=None,
+                             source=source)['groups']
+
+    return lambda: (groups('rollup'), groups('transactions'))
@@ -0,0 +1,49 @@
+import pytest
+
+from app.db.models.models import TransactionModel
+from app.extension import db
+
+
+def test_bulk_insert_returns_ids_in_order(client, make_transaction):
+    rows = [make_transaction('2024-01-02', 4.5), make_transaction('2024-01-03', 10, category_level2='Food')]
+
+    response = client.post('/transaction/bulk', json=rows)
+
+    assert response.status_code == 201
+    ids = response.get_json()['transaction_ids']
+    assert ids == sorted(ids) and len(ids) == 2
+    stored = client.get('/transaction').get_json()
+    assert sorted(t['amount'] for t in stored) == [4.5, 10.0]
+
+
+def test_bulk_insert_rejects_the_whole_batch_on_an_invalid_row(app, client, make_transaction):
+    rows = [make_transaction('2024-01-02', 4.5), dict(make_transaction('2024-01-03', 1), transaction_date='bad')]
+
+    response = client.post('/transaction/bulk', json=rows)
+
+    assert response.status_code == 400
+    with app.app_context():
+        assert db.session.query(TransactionModel).count() == 0
+
+
+@pytest.mark.parametrize('field', ['description', 'notes', 'source', 'type_name', 'category_level1',
+                                   'category_level2'])
+def test_bulk_insert_rejects_a_non_string_text_field(client, make_transaction, field):
+    rows = [make_transaction('2024-01-02', 4.5), dict(make_transaction('2024-01-03', 1), **{field: 123})]
+
+    response = client.post('/transaction/bulk', json=rows)
+
+    assert response.status_code == 400
+    assert 'row(s) [1]' in response.get_json()['message']
+    assert client.get('/transaction').get_json() == []
+
+
+def test_bulk_insert_refreshes_the_rollup(client, make_transaction, rollup_groups):
+    client.post('/transaction/bulk', json=[make_transaction('2024-01-02', 4.5, category_level2='Coffee'),
+                                           make_transaction('2024-01-02', 3, category_level2='Coffee'),
+                                           make_transaction('2024-02-01', 100, source='Amex')])
+
+    rollup, scan = rollup_groups()
+    assert rollup == scan
+    assert [(g['date'], g['category_level2'], g['total'], g['count']) for g in rollup] == \
+        [('2024-01-02', 'Coffee', 7.5, 2), ('2024-02-01', None, 100.0, 1)]
@@ -0,0 +1,78 @@
+import pytest
+
+
+@pytest.fixture
+def ledger(client, make_transaction):
+    rows = [make_transaction('2024-01-02', 4.5, 'Blue Bottle Coffee', category_level2='Coffee'),
+            make_transaction('2024-01-02', 40, 'Shell', source='Amex'),
+            make_transaction('2024-01-05', 12, 'Corner Cafe', category_level2='Coffee'),
+            make_transaction('2024-02-10', 100, 'Landlord', category_level2='Rent', source='Amex')]
+    return client.post('/transaction/bulk', json=rows).get_json()['transaction_ids']
+
+
+def _stored(client):
+    return {t['transaction_id']: t for t in client.get('/transaction').get_json()}
+
+
+def test_dry_run_counts_without_writing(client, ledger):
+    response = client.patch('/transaction/bulk', json={'filter': {'source': 'Amex'}, 'changes': {'notes': 'x'},
+                                                       'dry_run': True})
+
+    assert response.get_json() == {'matched': 2, 'dry_run': True}
+    assert all(t['notes'] is None for t in _stored(client).values())
+
+
+def test_update_changes_only_the_filtered_rows(client, ledger, rollup_groups):
+    response = client.patch('/transaction/bulk', json={'filter': {'description_like': '%coffee%'},
+                                                       'changes': {'category_level2': 'Cafes'}})
+
+    assert response.status_code == 200
+    assert response.get_json()['transaction_ids'] == [ledger[0]]
+    stored = _stored(client)
+    assert [stored[i]['category_level2'] for i in ledger] == ['Cafes', None, 'Coffee', 'Rent']
+    rollup, scan = rollup_groups()
+    assert rollup == scan
+
+
+def test_update_by_date_range_includes_both_days(client, ledger):
+    response = client.patch('/transaction/bulk', json={'filter': {'start_date': '2024-01-02', 'end_date': '2024-01-05'},
+                                                       'changes': {'notes': 'january'}})
+
+    assert response.get_json()['matched'] == 3
+
+
+@pytest.mark.parametrize('changes', [{'amount': 1}, {}])
+def test_update_rejects_fields_outside_the_allowed_set(client, ledger, changes):
+    response = client.patch('/transaction/bulk', json={'filter': {}, 'changes': changes})
+
+    assert response.status_code == 400
+
+
+def test_update_rejects_an_invalid_date_filter(client, ledger):
+    response = client.patch('/transaction/bulk', json={'filter': {'start_date': '2024-13-01'},
+                                                       'changes': {'notes': 'x'}})
+
+    assert response.status_code == 400
+
+
+def test_delete_removes_the_filtered_rows_and_their_rollup(client, ledger, rollup_groups):
+    response = client.delete('/transaction/bulk', json={'filter': {'source': 'Amex'}})
+
+    assert response.get_json() == {'matched': 2, 'dry_run': False, 'transaction_ids': [ledger[1], ledger[3]]}
+    assert sorted(_stored(client)) == [ledger[0], ledger[2]]
+    rollup, scan = rollup_groups()
+    assert rollup == scan
+    assert [g['date'] for g in rollup] == ['2024-01-02', '2024-01-05']
+
+
+def test_single_update_and_delete_refresh_the_rollup(client, ledger, make_transaction, rollup_groups):
+    # Moving a transaction to another day updates the rollup of both days
+    client.put(f'/transaction/{ledger[2]}', json=make_transaction('2024-03-01', 12, 'Corner Cafe'))
+    rollup, scan = rollup_groups()
+    assert rollup == scan
+    assert '2024-01-05' not in [g['date'] for g in rollup]
+
+    client.delete(f'/transaction/{ledger[3]}')
+    rollup, scan = rollup_groups()
+    assert rollup == scan
+    assert '2024-02-10' not in [g['date'] for g in rollup]
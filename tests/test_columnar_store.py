@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.controller import transaction_controller
+from app.controller.columnar_store import columnar_store
+from app.controller.statistics_controller import aggregate
+from app.extension import db
+
+
+@pytest.fixture
+def ledger(client, make_transaction):
+    rows = [make_transaction('2024-01-02', 4.5, 'Coffee', category_level2='Coffee'),
+            make_transaction('2024-01-03', 40, 'Shell', source='Amex'),
+            make_transaction('2024-01-05', 12, 'Corner Cafe', category_level2='Coffee')]
+    return client.post('/transaction/bulk', json=rows).get_json()['transaction_ids']
+
+
+@pytest.fixture
+def groups(app, ledger):
+    """Returns the per day, category and source groups from the columnar store and from a scan."""
+
+    def compare():
+        with app.app_context():
+            return [aggregate(db.session, ['date', 'category_level2', 'source'], by='day', type_name=None,
+                              source=source)['groups'] for source in ('columnar', 'transactions')]
+
+    # Loads the snapshot, so that the writes of the test are applied incrementally
+    compare()
+    return compare
+
+
+def test_delete_and_insert_between_refreshes(client, ledger, groups, make_transaction):
+    client.delete(f'/transaction/{ledger[1]}')
+    client.post('/transaction', json=[make_transaction('2024-01-04', 7, 'Bakery')])
+
+    columnar, scan = groups()
+
+    assert columnar == scan
+    assert [g['date'] for g in columnar] == ['2024-01-02', '2024-01-04', '2024-01-05']
+    assert columnar_store.last_refresh['full'] is False
+
+
+def test_write_committed_long_after_its_modified_at(client, ledger, groups, monkeypatch):
+    class Earlier(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) - timedelta(minutes=10)
+
+    monkeypatch.setattr(transaction_controller, 'datetime', Earlier)
+    client.patch('/transaction/bulk', json={'filter': {'source': 'Amex'}, 'changes': {'category_level2': 'Car'}})
+
+    columnar, scan = groups()
+
+    assert columnar == scan
+    assert ('2024-01-03', 'Car') in [(g['date'], g['category_level2']) for g in columnar]
+    assert columnar_store.last_refresh['full'] is False
+
+
+def test_unlogged_write_reloads_everything(app, ledger, groups):
+    from app.controller.change_controller import record_changes
+    from app.lib.data_version import TRANSACTIONS
+
+    with app.app_context():
+        record_changes(db.session, TRANSACTIONS)
+        db.session.commit()
+
+    columnar, scan = groups()
+
+    assert columnar == scan
+    assert columnar_store.last_refresh['full'] is True
@@ -0,0 +1,59 @@
+from datetime import date
+
+import pytest
+
+from app.controller import transaction_controller
+
+
+@pytest.fixture
+def ledger(client, make_transaction):
+    client.post('/transaction/bulk', json=[make_transaction('2024-01-02', 4.5)])
+
+
+def _revalidate(client, path, etag):
+    return client.get(path, headers={'If-None-Match': etag})
+
+
+@pytest.mark.parametrize('path', ['/transaction', '/transaction?limit=1', '/statistics_by_source',
+                                  '/transaction_source', '/transaction_category/'])
+def test_unchanged_resource_is_not_modified(client, ledger, path):
+    response = client.get(path)
+    etag = response.headers['ETag'].strip('"')
+
+    revalidated = _revalidate(client, path, etag)
+
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+
+def test_a_write_changes_the_etag(client, ledger, make_transaction):
+    etag = client.get('/statistics_by_source').headers['ETag'].strip('"')
+
+    client.post('/transaction', json=[make_transaction('2024-01-03', 1)])
+
+    assert _revalidate(client, '/statistics_by_source', etag).status_code == 200
+
+
+def test_a_lookup_write_only_changes_that_lookup_etag(client, ledger):
+    sources = client.get('/transaction_source').headers['ETag'].strip('"')
+    transactions = client.get('/transaction').headers['ETag'].strip('"')
+
+    client.post('/transaction_source', data={'source': 'Other'})
+
+    assert _revalidate(client, '/transaction_source', sources).status_code == 200
+    assert _revalidate(client, '/transaction', transactions).status_code == 304
+
+
+def test_period_etag_changes_with_the_date(client, ledger, monkeypatch):
+    etag = client.get('/transaction?period=1Mo').headers['ETag'].strip('"')
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.fromordinal(date.today().toordinal() + 1)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(transaction_controller, 'date', Tomorrow)
+        assert _revalidate(client, '/transaction?period=1Mo', etag).status_code == 200
+    assert _revalidate(client, '/transaction?period=1Mo', etag).status_code == 304
@@ -0,0 +1,36 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.utils.db_pool import InstrumentedQueuePool
+
+
+@pytest.fixture
+def pool():
+    pool = InstrumentedQueuePool(lambda: sqlite3.connect(':memory:', check_same_thread=False),
+                                 pool_size=1, max_overflow=0, timeout=5)
+    yield pool
+    pool.dispose()
+
+
+def test_idle_connection_checkout_is_not_a_wait(pool):
+    for _ in range(5):
+        pool.connect().close()
+
+    metrics = pool.metrics.snapshot()
+    assert (metrics['checkouts'], metrics['waits'], metrics['connects']) == (5, 0, 1)
+
+
+def test_checkout_blocked_by_a_busy_pool_is_a_wait(pool):
+    busy = pool.connect()
+    releaser = threading.Thread(target=lambda: (time.sleep(0.1), busy.close()))
+    releaser.start()
+
+    pool.connect().close()
+    releaser.join()
+
+    metrics = pool.metrics.snapshot()
+    assert metrics['waits'] == 1
+    assert metrics['wait_ms_total'] >= 90
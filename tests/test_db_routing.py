@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from app.utils.db_routing import PRIMARY, READ_PRIMARY_HEADER, REPLICA, STICKY_COOKIE, replica_router
+
+
+@pytest.fixture
+def routing(monkeypatch, client, make_transaction, replicate):
+    """Routes reads to a replica holding one transaction, re-measuring its lag on every request."""
+    monkeypatch.setattr(replica_router, 'enabled', True)
+    monkeypatch.setattr(replica_router, 'check_interval', 0)
+    monkeypatch.setattr(replica_router, 'max_lag', 60)
+    monkeypatch.setattr(replica_router, 'lag', None)
+    monkeypatch.setattr(replica_router, 'checked_at', None)
+    client.post('/transaction', json=[make_transaction('2024-01-02', 4.5, 'Replicated')])
+    replicate()
+
+
+def _read(client, **headers):
+    """The descriptions GET /transaction returns and the database that served them."""
+    routed = dict(replica_router.routed)
+    descriptions = sorted(t['description'] for t in client.get('/transaction', headers=headers).get_json())
+    served_by = [route for route in (PRIMARY, REPLICA) if replica_router.routed[route] > routed[route]]
+    return descriptions, served_by
+
+
+def test_reads_go_to_a_current_replica(app, routing):
+    assert _read(app.test_client()) == (['Replicated'], [REPLICA])
+    assert replica_router.lag == 0
+
+
+def test_writer_reads_its_writes_from_the_primary(app, routing, make_transaction):
+    writer = app.test_client()
+
+    response = writer.post('/transaction', json=[make_transaction('2024-01-03', 1, 'Fresh')])
+
+    assert STICKY_COOKIE in response.headers['Set-Cookie']
+    assert _read(writer) == (['Fresh', 'Replicated'], [PRIMARY])
+    # Other clients may still read the replica, which does not have the write yet
+    assert _read(app.test_client()) == (['Replicated'], [REPLICA])
+
+
+def test_read_primary_header(app, routing):
+    assert _read(app.test_client(), **{READ_PRIMARY_HEADER: 'true'}) == (['Replicated'], [PRIMARY])
+
+
+def test_replica_behind_by_more_than_the_max_lag_is_skipped(app, routing, monkeypatch, make_transaction,
+                                                             replicate):
+    monkeypatch.setattr(replica_router, 'max_lag', 0)
+    app.test_client().post('/transaction', json=[make_transaction('2024-01-03', 1, 'Fresh')])
+
+    assert _read(app.test_client()) == (['Fresh', 'Replicated'], [PRIMARY])
+    assert replica_router.lag > 0
+
+    replicate()
+    assert _read(app.test_client()) == (['Fresh', 'Replicated'], [REPLICA])
+
+
+def test_replica_without_the_write_counters_is_skipped(app, routing, database_dir):
+    with sqlite3.connect(f"{database_dir}/replica.db-public") as connection:
+        connection.execute("DELETE FROM table_version WHERE table_name = 'transactions'")
+    connection.close()
+
+    assert _read(app.test_client()) == (['Replicated'], [PRIMARY])
+    assert replica_router.lag is None
+    assert app.test_client().get('/diagnostics/db_routing').get_json()['lag_seconds'] is None
+
+
+def test_writes_never_go_to_the_replica(app, routing, database_dir, make_transaction):
+    app.test_client().post('/transaction', json=[make_transaction('2024-01-03', 1, 'Fresh')])
+
+    with sqlite3.connect(f"{database_dir}/replica.db-public") as connection:
+        assert connection.execute("SELECT count(*) FROM transactions").fetchone() == (1,)
+    connection.close()
@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+
+@pytest.fixture
+def rows(make_transaction):
+    return [make_transaction('2024-01-02', 4.5, 'Coffee  Shop'),
+            make_transaction('2024-01-02', 4.5, 'Coffee Shop'),
+            make_transaction('2024-01-03', 40, 'Gas', category_level1='Car')]
+
+
+def _counts(summary):
+    return summary['inserted'], summary['skipped'], summary['conflicting']
+
+
+def test_reposting_a_batch_skips_every_row(client, rows):
+    client.post('/transaction/bulk', json=rows)
+
+    summary = client.post('/transaction/bulk?dedupe=true', json=rows).get_json()
+
+    assert _counts(summary) == (0, 3, 0)
+    assert len(client.get('/transaction').get_json()) == 3
+
+
+def test_duplicates_are_matched_as_a_multiset(client, rows):
+    # The description is normalized, so both coffee rows share one fingerprint and each stored
+    # row absorbs one of the three posted copies; the differing category makes the gas row a conflict
+    client.post('/transaction/bulk', json=rows)
+    posted = [rows[0], rows[1], rows[1], dict(rows[2], category_level1='Travel')]
+
+    summary = client.post('/transaction/bulk?dedupe=true', json=posted).get_json()
+
+    assert _counts(summary) == (1, 2, 1)
+    assert summary['conflicts'][0]['row'] == 3
+
+
+def test_single_transaction_endpoint_dedupes_too(client, rows):
+    client.post('/transaction', json=rows)
+
+    summary = client.post('/transaction?dedupe=true', json=rows[:1]).get_json()
+
+    assert _counts(summary) == (0, 1, 0)
+
+
+def test_bulk_update_refreshes_fingerprints(client, make_transaction):
+    client.post('/transaction/bulk', json=[make_transaction('2024-01-04', 1, 'New')])
+    client.patch('/transaction/bulk', json={'filter': {'description_like': 'new'},
+                                            'changes': {'description': 'Renamed'}})
+
+    renamed = [make_transaction('2024-01-04', 1, 'renamed')]
+    summary = client.post('/transaction/bulk?dedupe=true', json=renamed).get_json()
+
+    assert _counts(summary) == (0, 1, 0)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 100])
+def test_import_dedupe_does_not_depend_on_the_chunk_size(client, make_transaction, chunk_size):
+    client.post('/transaction/bulk', json=[make_transaction('2024-01-02', 4.5, 'Coffee')])
+    statement = ("transaction_date,description,amount\n"
+                 "01/02/2024,Coffee,4.5\n01/02/2024,Coffee,4.5\n01/03/2024,Tea,2\n01/02/2024,Coffee,4.5\n")
+
+    def upload():
+        return client.post('/transaction_import', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(statement.encode()), 'statement.csv'), 'source': 'Visa',
+                                 'type_name': 'Sale', 'dedupe': 'true', 'chunk_size': str(chunk_size)}).get_json()
+
+    # One of the three coffees is stored already
+    assert _counts(upload()) == (3, 1, 0)
+    assert _counts(upload()) == (0, 4, 0)
@@ -0,0 +1,64 @@
+import io
+
+CSV_STATEMENT = """Date,Payee,Amount
+01/02/2024,Blue Bottle Coffee,4.50
+01/03/2024,Shell,40
+not a date,Broken,1
+01/04/2024,Corner Cafe,12
+"""
+
+OFX_STATEMENT = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240102120000[-5:EST]<TRNAMT>-4.50<NAME>Blue Bottle Coffee<MEMO>Card 1234</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240103<TRNAMT>-40.00<NAME>Shell</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+def _upload(client, statement, filename, encoding='utf-8', **form):
+    data = dict({'file': (io.BytesIO(statement.encode(encoding)), filename), 'source': 'Visa', 'type_name': 'Sale'},
+                **form)
+    return client.post('/transaction_import', data=data, content_type='multipart/form-data')
+
+
+def test_csv_import_loads_valid_rows_and_reports_the_rest(client, rollup_groups):
+    column_map = '{"Date": "transaction_date", "Payee": "description", "Amount": "amount"}'
+
+    response = _upload(client, CSV_STATEMENT, 'statement.csv', column_map=column_map, chunk_size='2')
+
+    assert response.status_code == 201
+    summary = response.get_json()
+    assert (summary['rows'], summary['inserted'], summary['failed']) == (4, 3, 1)
+    assert summary['errors'][0]['row'] == 4
+    stored = client.get('/transaction').get_json()
+    assert sorted(t['description'] for t in stored) == ['Blue Bottle Coffee', 'Corner Cafe', 'Shell']
+    assert {t['source'] for t in stored} == {'Visa'}
+    rollup, scan = rollup_groups()
+    assert rollup == scan
+
+
+def test_ofx_import(client):
+    response = _upload(client, OFX_STATEMENT, 'statement.ofx')
+
+    assert response.get_json()['inserted'] == 2
+    stored = sorted(client.get('/transaction').get_json(), key=lambda t: t['amount'])
+    assert [(t['description'], t['amount'], t['notes']) for t in stored] == \
+        [('Shell', -40.0, None), ('Blue Bottle Coffee', -4.5, 'Card 1234')]
+
+
+def test_import_rejects_an_unknown_format_and_chunk_size(client):
+    assert _upload(client, CSV_STATEMENT, 'statement.txt').status_code == 400
+    assert _upload(client, CSV_STATEMENT, 'statement.csv', chunk_size='0').status_code == 400
+
+
+def test_undecodable_statement_is_imported_up_to_the_bad_row(client):
+    rows = ''.join(f"01/{day:02d}/2024,Cafe {day},{day}\n" for day in range(1, 6))
+    statement = "transaction_date,description,amount\n" + rows + "01/06/2024,Café,6\n01/07/2024,Tea,7\n"
+
+    response = _upload(client, statement, 'statement.csv', encoding='latin-1', chunk_size='2')
+
+    assert response.status_code == 201
+    summary = response.get_json()
+    assert (summary['inserted'], summary['failed'], summary['complete']) == (5, 1, False)
+    assert summary['errors'][0]['row'] == 7
+    assert len(client.get('/transaction').get_json()) == 5
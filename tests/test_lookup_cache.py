@@ -0,0 +1,50 @@
+from app.controller.lookup_cache import lookup_cache
+
+
+def _sources(client):
+    return {s['source']: s['description'] for s in client.get('/transaction_source').get_json()}
+
+
+def test_lookup_writes_show_in_the_next_read(client):
+    client.post('/transaction_source', data={'source': 'Visa', 'description': 'Card'})
+    assert _sources(client) == {'Visa': 'Card'}
+
+    client.put('/transaction_source', data={'source': 'Visa', 'description': 'Credit card'})
+    assert _sources(client) == {'Visa': 'Credit card'}
+
+    client.delete('/transaction_source', data={'source': 'Visa'})
+    assert _sources(client) == {}
+
+
+def test_values_created_by_transaction_writes_show_in_the_next_read(client, make_transaction):
+    assert _sources(client) == {}
+    loads = lookup_cache.loads
+
+    client.post('/transaction', json=[make_transaction('2024-01-02', 4.5, source='Amex', category_level2='Coffee')])
+    client.patch('/transaction/bulk', json={'filter': {'source': 'Amex'}, 'changes': {'category_level1': 'Food'}})
+
+    assert _sources(client) == {'Amex': None}
+    assert {c['category'] for c in client.get('/transaction_category/').get_json()} == {'Coffee', 'Food'}
+    assert [t['type_name'] for t in client.get('/transaction_type').get_json()] == ['Sale']
+    assert lookup_cache.loads > loads
+
+
+def test_unchanged_lookups_are_served_from_the_cache(client):
+    client.post('/transaction_source', data={'source': 'Visa'})
+    _sources(client)
+    hits = lookup_cache.hits
+
+    assert _sources(client) == {'Visa': None}
+    assert lookup_cache.hits == hits + 1
+
+
+def test_values_of_a_rolled_back_write_are_not_cached(client, make_transaction):
+    _sources(client)
+
+    response = client.post('/transaction', json=[make_transaction('2024-01-02', 4.5, source='Amex'),
+                                                 dict(make_transaction('2024-01-03', 1), transaction_date='bad')])
+
+    assert response.status_code == 500
+    assert _sources(client) == {}
+    client.post('/transaction', json=[make_transaction('2024-01-02', 4.5, source='Amex')])
+    assert _sources(client) == {'Amex': None}
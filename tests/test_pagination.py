@@ -0,0 +1,50 @@
+import pytest
+
+
+@pytest.fixture
+def ledger(client, make_transaction):
+    rows = [make_transaction('2024-01-02', 1), make_transaction('2024-01-03', 2),
+            make_transaction('2024-01-03', 3), make_transaction('2024-01-05', 4),
+            make_transaction('2024-01-06', 5)]
+    return client.post('/transaction/bulk', json=rows).get_json()['transaction_ids']
+
+
+def _pages(client, **params):
+    """Walks the pages of GET /transaction, following the X-Next-Cursor header to the last page."""
+    pages = []
+    while True:
+        response = client.get('/transaction', query_string=params)
+        assert response.status_code == 200
+        pages.append([t['transaction_id'] for t in response.get_json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            return pages
+        params['cursor'] = cursor
+
+
+def test_pages_cover_every_record_once_newest_first(client, ledger):
+    # Records of the same day are ordered by id, descending
+    newest_first = [ledger[4], ledger[3], max(ledger[1:3]), min(ledger[1:3]), ledger[0]]
+
+    assert _pages(client, limit=2) == [newest_first[:2], newest_first[2:4], newest_first[4:]]
+
+
+def test_last_full_page_has_no_cursor(client, ledger):
+    pages = _pages(client, limit=5)
+
+    assert len(pages) == 1 and len(pages[0]) == 5
+
+
+def test_pages_follow_the_period_filter(client, make_transaction):
+    client.post('/transaction/bulk', json=[make_transaction('2000-01-02', 1)])
+
+    assert _pages(client, limit=2, period='1Yr') == [[]]
+
+
+@pytest.mark.parametrize('params', [{'limit': 1, 'cursor': 'zzz'}, {'limit': 'ten'}, {'limit': 0}])
+def test_invalid_pages_are_rejected(client, ledger, params):
+    assert client.get('/transaction', query_string=params).status_code == 400
+
+
+def test_bad_cursor_message(client, ledger):
+    assert client.get('/transaction?limit=1&cursor=zzz').get_json() == {'message': "Invalid cursor 'zzz'"}
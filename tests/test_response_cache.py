@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import text
+
+from app.extension import db, response_cache
+
+
+@pytest.fixture
+def ledger(client, make_transaction):
+    client.post('/transaction/bulk', json=[make_transaction('2024-01-02', 4.5, source='Visa'),
+                                           make_transaction('2024-01-03', 10, source='Amex')])
+
+
+def _stats(client):
+    """The grand total of GET /statistics_by_source and the cache hits counted so far, including that request."""
+    total = client.get('/statistics_by_source').get_json()['total']
+    return response_cache.stats()['hits'], total
+
+
+def test_repeated_request_is_served_from_the_cache(client, ledger):
+    hits, total = _stats(client)
+
+    assert _stats(client) == (hits + 1, total)
+
+
+def test_a_write_retires_the_cached_response(client, ledger, make_transaction):
+    hits, total = _stats(client)
+
+    client.post('/transaction', json=[make_transaction('2024-01-04', 5.5)])
+
+    assert _stats(client) == (hits, total + 5.5)
+
+
+def test_a_write_by_another_worker_retires_the_cached_response(app, client, ledger):
+    # Another worker's write only shows in the database: its data and the table_version counter,
+    # committed together, without this process's in-memory version bump
+    hits, total = _stats(client)
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(text("UPDATE public.daily_spending_rollup SET total_amount = total_amount + 1, "
+                                "max_amount = max_amount + 1 WHERE source = 'Amex'"))
+        connection.execute(text("UPDATE public.table_version SET version = version + 1 "
+                                "WHERE table_name = 'transactions'"))
+
+    assert _stats(client) == (hits, total + 1)
+
+
+def test_a_rolled_back_write_keeps_the_cached_response(client, ledger, make_transaction):
+    hits, total = _stats(client)
+
+    response = client.post('/transaction/bulk', json=[make_transaction('2024-01-04', 1),
+                                                      dict(make_transaction('2024-01-05', 1), amount='x')])
+
+    assert response.status_code == 400
+    assert _stats(client) == (hits + 1, total)
+
+
+def test_argument_order_shares_an_entry_and_its_echoed_query(client, ledger):
+    first = client.get('/statistics_by_date?startDate=2024-01-01&by=day')
+    hits = response_cache.stats()['hits']
+
+    second = client.get('/statistics_by_date?by=day&startDate=2024-01-01')
+
+    assert response_cache.stats()['hits'] == hits + 1
+    assert second.data == first.data
+    assert list(second.get_json()['query']) == ['by', 'startDate']
+
+
+def test_repeated_argument_order_is_kept(client, ledger):
+    days = client.get('/statistics_by_date?by=day&by=month').get_json()
+
+    months = client.get('/statistics_by_date?by=month&by=day').get_json()
+
+    assert (days['query'], months['query']) == ({'by': 'day'}, {'by': 'month'})
+    assert len(days['data']) == 2 and len(months['data']) == 1
@@ -0,0 +1,71 @@
+import pytest
+
+
+@pytest.fixture
+def rules(client):
+    posted = [{'description_pattern': 'coffee', 'category_level1': 'Food', 'category_level2': 'Coffee',
+               'max_amount': 20, 'priority': 10},
+              {'description_pattern': r'^(shell|bp)\b', 'match_type': 'regex', 'category_level1': 'Car',
+               'priority': 20},
+              {'description_pattern': 'coffee', 'category_level1': 'Food', 'priority': 30}]
+    return [client.post('/categorization_rule', json=rule).get_json()['rule_id'] for rule in posted]
+
+
+def _categories(client):
+    stored = sorted(client.get('/transaction').get_json(), key=lambda t: t['transaction_id'])
+    return [(t['category_level1'], t['category_level2']) for t in stored]
+
+
+def test_rules_are_listed_by_priority(client, rules):
+    listed = client.get('/categorization_rule').get_json()
+
+    assert [r['rule_id'] for r in listed] == rules
+
+
+def test_rules_categorize_new_transactions(client, rules, make_transaction):
+    # The coffee over max_amount falls through to the lower priority coffee rule,
+    # and a category set by the client is kept
+    client.post('/transaction/bulk', json=[make_transaction('2024-01-02', 4.5, 'Blue Bottle COFFEE'),
+                                           make_transaction('2024-01-02', 45, 'Coffee beans'),
+                                           make_transaction('2024-01-03', 40, 'Shell 1234'),
+                                           make_transaction('2024-01-03', 40, 'Seashell'),
+                                           make_transaction('2024-01-04', 3, 'Coffee', category_level1='Gift')])
+    client.post('/transaction', json=[make_transaction('2024-01-05', 30, 'BP station')])
+
+    assert _categories(client) == [('Food', 'Coffee'), ('Food', None), ('Car', None), (None, None),
+                                   ('Gift', None), ('Car', None)]
+
+
+def test_rule_changes_apply_to_the_next_write(client, rules, make_transaction):
+    client.delete(f'/categorization_rule/{rules[0]}')
+    client.put(f'/categorization_rule/{rules[2]}', json={'category_level1': 'Drinks'})
+
+    client.post('/transaction', json=[make_transaction('2024-01-02', 4.5, 'Coffee')])
+
+    assert _categories(client) == [('Drinks', None)]
+
+
+@pytest.mark.parametrize('rule', [{'description_pattern': '(', 'match_type': 'regex', 'category_level1': 'Food'},
+                                  {'description_pattern': 'coffee'},
+                                  {'category_level1': 'Food', 'min_amount': 5, 'max_amount': 1}])
+def test_invalid_rules_are_rejected(client, rule):
+    response = client.post('/categorization_rule', json=rule)
+
+    assert response.status_code == 400
+    assert client.get('/categorization_rule').get_json() == []
+
+
+def test_apply_recategorizes_existing_transactions(client, make_transaction, rollup_groups):
+    client.post('/transaction/bulk', json=[make_transaction('2024-01-02', 4.5, 'Coffee'),
+                                           make_transaction('2024-01-03', 3, 'Coffee', category_level1='Gift')])
+    client.post('/categorization_rule', json={'description_pattern': 'coffee', 'category_level1': 'Food'})
+
+    dry_run = client.post('/categorization_rule/apply', json={'dry_run': True}).get_json()
+    assert (dry_run['scanned'], dry_run['changed']) == (2, 1)
+    assert _categories(client) == [(None, None), ('Gift', None)]
+
+    applied = client.post('/categorization_rule/apply', json={'overwrite': True}).get_json()
+    assert applied['changed'] == 2
+    assert _categories(client) == [('Food', None), ('Food', None)]
+    rollup, scan = rollup_groups()
+    assert rollup == scan
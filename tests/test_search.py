@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.controller import transaction_controller
+
+
+@pytest.fixture
+def ledger(client, make_transaction):
+    rows = [make_transaction('2024-01-02', 4.5, 'Blue Bottle Coffee'),
+            make_transaction('2024-01-03', 40, 'Shell', notes='road trip'),
+            make_transaction('2024-01-04', 12, 'Corner Cafe', source='Amex'),
+            make_transaction('2024-01-05', 8, 'Decaf coffee beans')]
+    return client.post('/transaction/bulk', json=rows).get_json()['transaction_ids']
+
+
+def _search(client, **params):
+    return client.get('/transaction/search', query_string=params)
+
+
+def _found(client, **params):
+    body = _search(client, **params).get_json()
+    return body['total'], sorted(t['description'] for t in body['results'])
+
+
+@pytest.mark.parametrize('params, found', [
+    ({'q': 'coff'}, ['Blue Bottle Coffee', 'Decaf coffee beans']),
+    ({'q': 'caf'}, ['Corner Cafe', 'Decaf coffee beans']),
+    ({'q': 'caf', 'mode': 'prefix'}, ['Corner Cafe']),
+    ({'q': 'coffee bea', 'mode': 'prefix'}, ['Decaf coffee beans']),
+    ({'q': 'coffe', 'mode': 'fuzzy'}, ['Blue Bottle Coffee', 'Decaf coffee beans']),
+    ({'q': 'trip'}, ['Shell']),
+    ({'q': 'coffee', 'start_date': '2024-01-03', 'end_date': '2024-01-05'}, ['Decaf coffee beans']),
+    ({'q': 'c', 'source': 'Amex'}, ['Corner Cafe']),
+])
+def test_search_modes_and_filters(client, ledger, params, found):
+    assert _found(client, **params) == (len(found), found)
+
+
+def test_results_are_paged_newest_first_among_equal_scores(client, ledger):
+    body = _search(client, q='coffee', limit=1, offset=1).get_json()
+
+    assert (body['total'], body['limit'], body['offset']) == (2, 1, 1)
+    assert [t['transaction_id'] for t in body['results']] == [ledger[0]]
+
+
+@pytest.mark.parametrize('params', [{'q': ''}, {'q': '!!!', 'mode': 'prefix'}, {'q': '!!!', 'mode': 'fuzzy'},
+                                    {'q': 'coffee', 'mode': 'exact'}, {'q': 'coffee', 'limit': 'ten'},
+                                    {'q': 'coffee', 'offset': -1}, {'q': 'coffee', 'start_date': '01/02/2024'}])
+def test_invalid_searches_are_rejected(client, ledger, params):
+    assert _search(client, **params).status_code == 400
+
+
+def test_punctuation_is_searched_as_a_substring(client, ledger):
+    assert _found(client, q='!!!') == (0, [])
+
+
+def test_index_follows_writes(client, ledger, make_transaction):
+    assert _found(client, q='tea') == (0, [])
+
+    client.post('/transaction', json=[make_transaction('2024-01-06', 3, 'Green tea')])
+    client.patch('/transaction/bulk', json={'filter': {'description_like': 'shell'},
+                                            'changes': {'description': 'Shell tea stop'}})
+    client.delete(f'/transaction/{ledger[3]}')
+
+    assert _found(client, q='tea') == (2, ['Green tea', 'Shell tea stop'])
+    assert _found(client, q='decaf') == (0, [])
+
+
+def test_index_follows_a_rename_committed_long_after_its_modified_at(client, ledger, monkeypatch):
+    class Earlier(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) - timedelta(minutes=10)
+
+    assert _found(client, q='shell') == (1, ['Shell'])
+    monkeypatch.setattr(transaction_controller, 'datetime', Earlier)
+
+    client.patch('/transaction/bulk', json={'filter': {'description_like': 'shell'},
+                                            'changes': {'description': 'Fuel station'}})
+
+    assert _found(client, q='shell') == (0, [])
+    assert _found(client, q='fuel') == (1, ['Fuel station'])
+
+
+def test_index_drops_a_row_deleted_alongside_an_insert(client, ledger, make_transaction):
+    assert _found(client, q='corner') == (1, ['Corner Cafe'])
+
+    client.delete(f'/transaction/{ledger[2]}')
+    client.post('/transaction', json=[make_transaction('2024-01-06', 3, 'Green tea')])
+
+    assert _found(client, q='corner') == (0, [])
+    assert _found(client, q='c', source='Amex') == (0, [])
@@ -0,0 +1,86 @@
+import pytest
+
+
+@pytest.fixture
+def ledger(client, make_transaction):
+    client.post('/transaction/bulk', json=[make_transaction('2024-01-02', 4.5, category_level2='Coffee'),
+                                           make_transaction('2024-02-03', 40.1, source='Amex'),
+                                           make_transaction('2024-02-04', 1, type_name='Refund')])
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/statistics_by_date?by=month',
+     b'{"total":44.6,"count":2,"max":40.1,"min":4.5,"query":{"by":"month"},'
+     b'"data":[{"date":"2024-1","amount":4.5},{"date":"2024-2","amount":40.1}]}'),
+    ('/statistics_by_category',
+     b'{"total":44.6,"count":2,"max":40.1,"min":4.5,"query":{},"data":[{"category":"Coffee","amount":4.5}]}'),
+    ('/statistics_by_source',
+     b'{"total":44.6,"count":2,"max":40.1,"min":4.5,"query":{},'
+     b'"data":[{"source":"Amex","amount":40.1},{"source":"Visa","amount":4.5}]}'),
+])
+def test_response_envelopes_are_unchanged(client, ledger, path, body):
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert response.data == body
+
+
+@pytest.mark.parametrize('by, dates', [('year', ['2024']), ('quarter', ['2024-1Q']),
+                                       ('day', ['2024-01-02', '2024-02-03'])])
+def test_by_date_buckets(client, ledger, by, dates):
+    body = client.get(f'/statistics_by_date?by={by}').get_json()
+
+    assert [d['date'] for d in body['data']] == dates
+    assert sum(d['amount'] for d in body['data']) == body['total']
+
+
+def test_date_bounds_are_exclusive(client, ledger):
+    body = client.get('/statistics_by_source?startDate=2024-01-02&endDate=2024-02-04').get_json()
+
+    assert (body['total'], body['count'], body['query']) == \
+        (40.1, 1, {'endDate': '2024-02-04', 'startDate': '2024-01-02'})
+
+
+def test_empty_statistics(client):
+    body = client.get('/statistics_by_category').get_json()
+
+    assert (body['total'], body['count'], body['data']) == (0, 0, [])
+
+
+
+def _cells(client, **params):
+    body = client.get('/statistics_pivot', query_string=dict(dimensions='source,category_level2', **params)).get_json()
+    return [(c['grouping'], c['source'], c['category_level2'], c['total'], c['count']) for c in body['data']]
+
+
+FULL = [(['source', 'category_level2'], 'Amex', None, 40.1, 1),
+        (['source', 'category_level2'], 'Visa', 'Coffee', 4.5, 1)]
+BY_SOURCE = [(['source'], 'Amex', None, 40.1, 1), (['source'], 'Visa', None, 4.5, 1)]
+BY_CATEGORY = [(['category_level2'], None, None, 40.1, 1), (['category_level2'], None, 'Coffee', 4.5, 1)]
+GRAND_TOTAL = [([], None, None, 44.6, 2)]
+
+
+@pytest.mark.parametrize('grouping, cells', [
+    ('rollup', FULL + BY_SOURCE + GRAND_TOTAL),
+    ('cube', FULL + BY_SOURCE + BY_CATEGORY + GRAND_TOTAL),
+    ('none', FULL),
+])
+def test_pivot_subtotal_rows(client, ledger, grouping, cells):
+    assert _cells(client, grouping=grouping) == cells
+
+
+def test_pivot_defaults_to_rollup(client, ledger):
+    assert _cells(client) == _cells(client, grouping='rollup')
+
+
+def test_pivot_by_date(client, ledger):
+    body = client.get('/statistics_pivot?dimensions=date&by=month').get_json()
+
+    assert [(c['grouping'], c['date'], c['total']) for c in body['data']] == \
+        [(['date'], '2024-1', 4.5), (['date'], '2024-2', 40.1), ([], None, 44.6)]
+
+
+@pytest.mark.parametrize('query', ['', 'dimensions=color', 'dimensions=source,source', 'dimensions=date',
+                                   'dimensions=date&by=week', 'dimensions=source&grouping=sets'])
+def test_invalid_pivots_are_rejected(client, ledger, query):
+    assert client.get(f'/statistics_pivot?{query}').status_code == 400
@@ -0,0 +1,47 @@
+import pytest
+
+
+@pytest.fixture
+def ledger(client, make_transaction):
+    client.post('/transaction/bulk', json=[make_transaction('2024-01-02', 4.5, category_level2='Coffee'),
+                                           make_transaction('2024-02-03', 40, source='Amex')])
+
+
+def test_batch_results_match_the_endpoints(client, ledger):
+    queries = [{'id': 'months', 'statistics': 'by_date', 'params': {'by': 'month'}},
+               {'statistics': 'by_category', 'params': {'startDate': '2024-01-01'}},
+               {'statistics': 'by_source'},
+               {'statistics': 'pivot', 'params': {'dimensions': 'source', 'grouping': 'none'}}]
+    paths = ['/statistics_by_date?by=month', '/statistics_by_category?startDate=2024-01-01', '/statistics_by_source',
+             '/statistics_pivot?dimensions=source&grouping=none']
+
+    results = client.post('/statistics_batch', json={'queries': queries}).get_json()['results']
+
+    assert [(r['id'], r['status']) for r in results] == [('months', 200), (None, 200), (None, 200), (None, 200)]
+    assert [r['data'] for r in results] == [client.get(path).get_json() for path in paths]
+
+
+def test_invalid_query_fails_alone(client, ledger):
+    queries = [{'statistics': 'by_date'}, {'statistics': 'pivot', 'params': {'dimensions': 'color'}},
+               {'statistics': 'by_source'}]
+
+    results = client.post('/statistics_batch', json={'queries': queries}).get_json()['results']
+
+    assert [r['status'] for r in results] == [400, 400, 200]
+    assert 'by' in results[0]['data']['message']
+    assert 'dimensions' in results[1]['data']['message']
+
+
+def test_batch_counts_as_one_request(client, ledger):
+    before = client.get('/metrics').get_data(as_text=True)
+
+    client.post('/statistics_batch', json={'queries': [{'statistics': 'by_source'}] * 3})
+
+    after = client.get('/metrics').get_data(as_text=True)
+    assert _requests(after, '/statistics_by_source') == _requests(before, '/statistics_by_source')
+    assert _requests(after, '/statistics_batch') == _requests(before, '/statistics_batch') + 1
+
+
+def _requests(metrics, endpoint):
+    return sum(float(line.rsplit(' ', 1)[1]) for line in metrics.splitlines()
+               if line.startswith('http_request_duration_seconds_count') and endpoint in line)